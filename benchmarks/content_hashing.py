@@ -0,0 +1,65 @@
+"""Cost of content hashing for fresh, unchanged and renamed workspace files.
+
+Writes a folder of files with random contents, hashes them all, asks again
+for the unchanged files, then renames the folder and asks for the new paths.
+Only the first pass should read any file.
+
+Run from the repository root:
+
+    python -m benchmarks.content_hashing --files 2000 --size-kib 512
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from src.quilt.hashing import QuiltContentHashStore
+
+
+def write_files(directory: str, count: int, size: int) -> list:
+    os.makedirs(directory)
+    files = []
+    for i in range(count):
+        path = os.path.join(directory, f'paper-{i:05d}.pdf')
+        with open(path, 'wb') as file:
+            file.write(os.urandom(size))
+        stat = os.stat(path)
+        files.append((os.path.relpath(path, os.path.dirname(directory)), stat.st_size, stat.st_mtime))
+    return files
+
+
+def timed(store: QuiltContentHashStore, files: list, workers: int) -> tuple:
+    started = time.perf_counter()
+    hashes = store.content_hashes(files, workers)
+    return hashes, time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--size-kib', type=int, default=512)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workspace_dir:
+        files = write_files(os.path.join(workspace_dir, 'papers'), args.files, args.size_kib * 1024)
+        store = QuiltContentHashStore(workspace_dir)
+        total = args.files * args.size_kib / 1024
+
+        hashes, elapsed = timed(store, files, args.workers)
+        print(f"Hashed {len(hashes)} files, {total:.0f} MiB in {elapsed:.2f}s ({total / elapsed:.0f} MiB/s)")
+
+        _, elapsed = timed(store, files, args.workers)
+        print(f"Unchanged: {elapsed * 1e3:.1f} ms, nothing read")
+
+        os.rename(os.path.join(workspace_dir, 'papers'), os.path.join(workspace_dir, 'library'))
+        renamed = [(file_id.replace('papers', 'library', 1), size, mtime) for file_id, size, mtime in files]
+        moved, elapsed = timed(store, renamed, args.workers)
+        reused = sum(moved[new[0]] == hashes[old[0]] for old, new in zip(files, renamed))
+        print(f"Folder renamed: {elapsed * 1e3:.1f} ms, {reused} of {len(renamed)} hashes reused by inode")
+
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Signing throughput and clustering time of near-duplicate detection.
+
+Builds a synthetic document store in which every tenth document has a
+slightly edited copy, signs it with MinHash, runs the detector a second
+time to show the signature cache, then times LSH clustering alone over a
+larger set of signatures.
+
+Run from the repository root:
+
+    python -m benchmarks.duplicate_groups --documents 5000 --signatures 100000
+"""
+import argparse
+import random
+import tempfile
+import time
+
+from types import SimpleNamespace
+
+import numpy as np
+
+from benchmarks.search_query import synthetic_documents
+from src.quilt.duplicates import PERMUTATIONS, QuiltDuplicateDetector, near_duplicate_pairs
+from src.quilt.extraction import QuiltDocument, QuiltDocumentStore
+
+
+def edited(text: str, generator: random.Random, rate: float = 0.01) -> str:
+    """Replace about `rate` of the words, like a revised version of the same paper."""
+    words = text.split()
+    for i in range(len(words)):
+        if generator.random() < rate:
+            words[i] = f'edit{generator.randrange(10**6)}'
+    return ' '.join(words)
+
+
+def build_store(directory: str, count: int) -> QuiltDocumentStore:
+    store = QuiltDocumentStore(directory)
+    generator = random.Random(2)
+    files, documents = [], []
+    for i, (file_id, document) in enumerate(synthetic_documents(count)):
+        files.append((file_id, len(document.text), 0.0, document.content_hash))
+        documents.append(document)
+        if i % 10 == 0:
+            copy = QuiltDocument(f'e{i:039x}', 'markdown', edited(document.text, generator), None, None, None)
+            files.append((file_id.replace('.md', '-v2.md'), len(copy.text), 0.0, copy.content_hash))
+            documents.append(copy)
+    store.store(files, documents)
+    return store
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--documents', type=int, default=5000)
+    parser.add_argument('--signatures', type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        workspace = SimpleNamespace(workspace_dir=directory, documents=build_store(directory, args.documents))
+        detector = QuiltDuplicateDetector(workspace)
+
+        report = detector.run()
+        stats = report.stats
+        expected = (args.documents + 9) // 10
+        print(f"Signed {stats.signed} documents in {stats.elapsed:.1f}s ({stats.documents_per_second:.0f} documents/s), "
+              f"{stats.groups} groups of {expected} edited copies")
+
+        report = detector.run()
+        stats = report.stats
+        print(f"Second run: {stats.cached} cached, {stats.signed} signed in {stats.elapsed * 1e3:.0f} ms "
+              f"({stats.clustering * 1e3:.0f} ms clustering)")
+
+        detector.close()
+        workspace.documents.close()
+
+    # Clustering alone, unrelated signatures with a copy of every thousandth one
+    signatures = np.random.default_rng(0).integers(0, 2**32, (args.signatures, PERMUTATIONS), dtype=np.uint32)
+    signatures[1::1000] = signatures[0::1000]
+    started = time.perf_counter()
+    pairs, _ = near_duplicate_pairs(signatures)
+    elapsed = time.perf_counter() - started
+    print(f"Clustered {args.signatures} signatures in {elapsed * 1e3:.0f} ms, {len(pairs)} near-duplicate pairs")
+
+
+if __name__ == '__main__':
+    main()
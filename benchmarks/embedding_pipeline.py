@@ -0,0 +1,60 @@
+"""Throughput of the embedding pipeline and latency of nearest-neighbor queries.
+
+Embeds a synthetic document store with the hashing backend, runs the
+pipeline a second time to show the content-hash cache, then times queries
+against the memory-mapped vector store.
+
+Run from the repository root:
+
+    python -m benchmarks.embedding_pipeline --documents 5000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from types import SimpleNamespace
+
+from benchmarks.search_query import build_store
+from src.quilt.embeddings import QuiltEmbeddingPipeline, QuiltHashingBackend, QuiltVectorStore
+
+QUERIES = ('binding the edges of a quilt', 'cotton fabric pattern', 'term01234 term04321')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--documents', type=int, default=5000)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        workspace = SimpleNamespace(workspace_dir=directory, documents=build_store(directory, args.documents))
+        backend = QuiltHashingBackend()
+        vectors = QuiltVectorStore(directory, backend.model_id, backend.dimensions)
+        pipeline = QuiltEmbeddingPipeline(workspace, backend, vectors, batch_size=args.batch_size)
+
+        stats = pipeline.run()
+        size = os.path.getsize(vectors.vectors_path)
+        print(f"Embedded {stats.embedded} documents, {stats.chunks} chunks in {stats.elapsed:.1f}s "
+              f"({stats.chunks_per_second:.0f} chunks/s, {size / 2**20:.0f} MiB of vectors)")
+
+        stats = pipeline.run()
+        print(f"Second run: {stats.cached} cached, {stats.embedded} embedded in {stats.elapsed * 1e3:.1f} ms")
+
+        for query in QUERIES:
+            vector = backend.embed([query])[0]
+            timings = []
+            for _ in range(args.repeats):
+                started = time.perf_counter()
+                vectors.nearest(vector, 10)
+                timings.append(time.perf_counter() - started)
+            print(f"nearest({query!r}): {statistics.median(timings) * 1e3:.2f} ms median over {len(vectors)} chunks")
+
+        vectors.close()
+        workspace.documents.close()
+
+
+if __name__ == '__main__':
+    main()
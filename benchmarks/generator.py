@@ -0,0 +1,158 @@
+"""Synthetic workspaces for the benchmarks.
+
+Writes a folder tree `depth` levels deep with `fan_out` subfolders per
+folder and `files` files in every folder, next to a .quilt manifest. Files
+are small but valid PDFs (one page with a line of text), Markdown notes and
+PNG images, mixed by the given shares. The same seed gives the same
+workspace.
+
+Run from the repository root:
+
+    python -m benchmarks.generator /tmp/quilt-workspace --depth 3 --fan-out 4 --files 20
+"""
+import argparse
+import os
+import random
+import struct
+import zlib
+
+from dataclasses import dataclass, field
+from typing import List
+
+WORDS = ('quilt', 'pattern', 'stitch', 'cotton', 'fabric', 'binding', 'block', 'border', 'thread', 'needle',
+         'batting', 'seam', 'square', 'triangle', 'applique', 'layer', 'backing', 'notes', 'draft', 'chapter')
+
+
+@dataclass
+class QuiltSyntheticWorkspace:
+    """What generate_workspace wrote. Paths are relative to `root`."""
+    root: str
+    depth: int
+    fan_out: int
+    files_per_folder: int
+    folders: List[str] = field(default_factory=list)
+    pdfs: List[str] = field(default_factory=list)
+    markdown: List[str] = field(default_factory=list)
+    images: List[str] = field(default_factory=list)
+
+    @property
+    def files(self) -> int:
+        return len(self.pdfs) + len(self.markdown) + len(self.images)
+
+    def describe(self) -> dict:
+        return {
+            'depth': self.depth,
+            'fan_out': self.fan_out,
+            'files_per_folder': self.files_per_folder,
+            'folders': len(self.folders),
+            'pdfs': len(self.pdfs),
+            'markdown': len(self.markdown),
+            'images': len(self.images),
+        }
+
+
+def pdf_data(text: str) -> bytes:
+    """Return a one-page PDF showing a line of text, with a correct cross-reference table."""
+    text = text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    stream = f'BT /F1 12 Tf 72 720 Td ({text}) Tj ET'.encode('latin-1', 'replace')
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+        b'/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>',
+        b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+
+    data = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+
+    xref = len(data)
+    data += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    data += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    data += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(data)
+
+
+def png_data(width: int, height: int, color: tuple) -> bytes:
+    """Return a PNG image of one RGB color, written without any imaging library."""
+    def chunk(kind: bytes, body: bytes) -> bytes:
+        return struct.pack('>I', len(body)) + kind + body + struct.pack('>I', zlib.crc32(kind + body))
+
+    row = b'\x00' + bytes(color) * width
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(row * height))
+            + chunk(b'IEND', b''))
+
+
+def markdown_data(title: str, generator: random.Random, words: int = 200) -> bytes:
+    body = ' '.join(generator.choice(WORDS) for _ in range(words))
+    return f'# {title}\n\n{body}\n'.encode('utf-8')
+
+
+def generate_workspace(root: str, depth: int = 3, fan_out: int = 4, files: int = 20,
+                       pdf_share: float = 0.5, markdown_share: float = 0.3, seed: int = 0,
+                       name: str = 'Benchmark Workspace') -> QuiltSyntheticWorkspace:
+    """Write a synthetic workspace into `root`, which may not contain one yet.
+
+    Every folder, the root included, gets `files` files; what is not a PDF
+    or a Markdown note by the given shares is a PNG image. File names repeat
+    across folders, as they do in real workspaces.
+    """
+    if os.path.exists(os.path.join(root, '.quilt')):
+        raise FileExistsError(f"{root} already contains a workspace")
+
+    generator = random.Random(seed)
+    workspace = QuiltSyntheticWorkspace(root, depth, fan_out, files)
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, '.quilt'), 'w') as file:
+        file.write(f'name: {name}\n')
+
+    folders = level = ['']
+    for depth_level in range(depth):
+        level = [os.path.join(parent, f'folder-{depth_level}-{child}') for parent in level for child in range(fan_out)]
+        folders = folders + level
+
+    for folder in folders:
+        os.makedirs(os.path.join(root, folder), exist_ok=True)
+        if folder:
+            workspace.folders.append(folder)
+
+        for i in range(files):
+            title = f'{generator.choice(WORDS)} {generator.choice(WORDS)} {i}'
+            share = generator.random()
+            if share < pdf_share:
+                file_name, data, written = f'paper-{i:04d}.pdf', pdf_data(title), workspace.pdfs
+            elif share < pdf_share + markdown_share:
+                file_name, data, written = f'note-{i:04d}.md', markdown_data(title, generator), workspace.markdown
+            else:
+                color = tuple(generator.randrange(256) for _ in range(3))
+                file_name, data, written = f'figure-{i:04d}.png', png_data(32, 32, color), workspace.images
+
+            with open(os.path.join(root, folder, file_name), 'wb') as file:
+                file.write(data)
+            written.append(os.path.join(folder, file_name))
+
+    return workspace
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('root')
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--fan-out', type=int, default=4)
+    parser.add_argument('--files', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    workspace = generate_workspace(args.root, args.depth, args.fan_out, args.files, seed=args.seed)
+    print(f"Wrote {workspace.files} files in {len(workspace.folders) + 1} folders to {workspace.root}: "
+          f"{len(workspace.pdfs)} PDFs, {len(workspace.markdown)} notes, {len(workspace.images)} images")
+
+
+if __name__ == '__main__':
+    main()
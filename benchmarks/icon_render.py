@@ -0,0 +1,92 @@
+"""Icon rendering: the PNG based pipeline versus painting SVG into a QImage.
+
+Times one cold icon load per bundled icon, at 1x and 2x pixel ratios, for:
+
+- cairosvg:  cairosvg PNG, PIL padding and re-encode, QPixmap.loadFromData
+             (skipped if cairosvg or its native library is unavailable)
+- png cache: QPixmap.loadFromData on an already rendered PNG
+- direct:    QSvgRenderer painting into a QImage, no PNG involved
+
+Run from the repository root (use QT_QPA_PLATFORM=offscreen without a display):
+
+    python -m benchmarks.icon_render
+"""
+import argparse
+import time
+
+from PySide6.QtCore import QBuffer, QIODevice
+from PySide6.QtGui import QGuiApplication, QPixmap
+
+from benchmarks.svg_recolor import load_icons
+from src.quilt.ui.colors import COLORS
+from src.quilt.ui.recolor import recolor_svg
+from src.quilt.ui.render import render_svg_image, render_svg_pixmap
+
+
+def cairosvg_backend():
+    try:
+        from src.quilt.ui.raster import render_icon
+    except (ImportError, OSError) as e:
+        print(f"cairosvg unavailable, skipping: {str(e).splitlines()[0]}")
+        return None
+
+    def load(svg_content, width, height, padding, ratio):
+        png_data = render_icon(svg_content, COLORS['dark-gray'], round(width * ratio),
+                               round(height * ratio), round(padding * ratio))
+        pixmap = QPixmap()
+        pixmap.loadFromData(png_data)
+        pixmap.setDevicePixelRatio(ratio)
+        return pixmap
+
+    return load
+
+
+def encode_png(svg_content, width, height, padding, ratio) -> bytes:
+    buffer = QBuffer()
+    buffer.open(QIODevice.WriteOnly)
+    render_svg_image(svg_content, width, height, padding, ratio).save(buffer, 'PNG')
+    return bytes(buffer.data())
+
+
+def time_per_icon(load, icons, size, ratio, repeat: int) -> float:
+    width, height, padding = size
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for icon in icons:
+            load(icon, width, height, padding, ratio)
+    return (time.perf_counter() - started) / (repeat * len(icons))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = QGuiApplication.instance() or QGuiApplication([])  # noqa: F841, QPixmap needs it
+
+    icons = [recolor_svg(icon, {'#d9d9d9': COLORS['dark-gray']}) for icon in load_icons()]
+    cairosvg_load = cairosvg_backend()
+
+    print(f"{len(icons)} icons, times per icon")
+    print(f"{'size':>12} {'ratio':>6} {'cairosvg (us)':>14} {'png cache (us)':>15} {'direct (us)':>12}")
+    for size in ((32, 32, 12), (64, 64, 0), (128, 128, 0)):
+        for ratio in (1.0, 2.0):
+            pngs = {icon: encode_png(icon, *size, ratio) for icon in icons}
+
+            def load_png(svg_content, width, height, padding, ratio):
+                pixmap = QPixmap()
+                pixmap.loadFromData(pngs[svg_content])
+                pixmap.setDevicePixelRatio(ratio)
+                return pixmap
+
+            cairosvg = time_per_icon(cairosvg_load, icons, size, ratio, args.repeat) if cairosvg_load else None
+            png_cache = time_per_icon(load_png, icons, size, ratio, args.repeat)
+            direct = time_per_icon(render_svg_pixmap, icons, size, ratio, args.repeat)
+
+            label = '{}x{}+{}'.format(*size)
+            cairosvg = f'{cairosvg * 1e6:.1f}' if cairosvg is not None else '-'
+            print(f"{label:>12} {ratio:>6} {cairosvg:>14} {png_cache * 1e6:>15.1f} {direct * 1e6:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Memory footprint of workspace metadata: per-file dicts versus QuiltEntryStore.
+
+Run from the repository root:
+
+    python -m benchmarks.metadata_memory --sizes 100000 1000000
+"""
+import argparse
+import gc
+import os
+import tracemalloc
+
+from pathlib import Path
+
+from src.quilt.entries import QuiltEntryStore
+
+KINDS = (('pdf', '.pdf'), ('markdown', '.md'), ('image', '.png'))
+
+
+def synthetic_rows(count: int, files_per_directory: int = 100):
+    """Yield index rows for a synthetic workspace with nested directories."""
+    for i in range(count):
+        directory_index = i // files_per_directory
+        directory = os.path.join(f'project-{directory_index // 100:04d}', f'chapter-{directory_index % 100:03d}')
+        kind, extension = KINDS[i % len(KINDS)]
+        name = f'document-{i:08d}{extension}'
+        yield (os.path.join(directory, name), directory, name, kind, 1024 + i, 1.7e9 + i)
+
+
+def build_dicts(workspace_dir: str, rows) -> dict:
+    """Build metadata the way QuiltWorkspace.extract_file_metadata used to."""
+    metadata = {}
+    for file_id, _, name, _, size, last_modified in rows:
+        metadata[file_id] = {
+            'name': name,
+            'path': Path(workspace_dir, file_id),
+            'size': size,
+            'last_modified': last_modified
+        }
+    return metadata
+
+
+def build_store(workspace_dir: str, rows) -> QuiltEntryStore:
+    return QuiltEntryStore(workspace_dir, rows)
+
+
+def measure(builder, count: int) -> int:
+    """Return the bytes still allocated after building metadata for `count` entries."""
+    rows = list(synthetic_rows(count))
+    gc.collect()
+
+    tracemalloc.start()
+    result = builder('/workspace', rows)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del result
+    gc.collect()
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'entries':>10} {'dicts (MB)':>12} {'store (MB)':>12} {'ratio':>8}")
+    for count in args.sizes:
+        dicts = measure(build_dicts, count)
+        store = measure(build_store, count)
+        print(f"{count:>10} {dicts / 2**20:>12.1f} {store / 2**20:>12.1f} {dicts / store:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Building the quick-open path index and answering queries as they are typed.
+
+Generates synthetic index rows for a workspace of nested folders, builds a
+QuiltPathIndex from them, then types a few queries one character at a time
+and reports the slowest answer per query. Finally applies a watcher batch
+of added and removed files. Nothing touches the file system.
+
+Run from the repository root:
+
+    python -m benchmarks.quick_open --files 200000
+"""
+import argparse
+import os
+import random
+import time
+
+from src.quilt.index import QuiltWorkspaceChanges
+from src.quilt.quickopen import QuiltPathIndex
+
+WORDS = ['paper', 'notes', 'draft', 'thesis', 'chapter', 'figure', 'report', 'review', 'survey', 'neural',
+         'graph', 'quantum', 'energy', 'model', 'data', 'lecture', 'slides', 'appendix', 'results', 'method']
+QUERIES = ['thesis draft', 'neurl grph', 'quantum12 energy pdf', 'chapter7/figure', '012345', 'lecture slides 3']
+
+
+def index_rows(count: int, generator: random.Random) -> list:
+    folders = ['/'.join(f'{generator.choice(WORDS)}{generator.randrange(20)}' for _ in range(generator.randrange(1, 5)))
+               for _ in range(max(count // 60, 1))]
+    rows = []
+    for i in range(count):
+        folder = generator.choice(folders)
+        name = f'{generator.choice(WORDS)}-{generator.choice(WORDS)}-{i:06d}.{generator.choice(["pdf", "md", "png"])}'
+        rows.append((os.path.join(folder, name), folder, name, 'pdf', 1024, 0.0))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=200000)
+    parser.add_argument('--changed', type=int, default=1000)
+    args = parser.parse_args()
+
+    generator = random.Random(0)
+    rows = index_rows(args.files, generator)
+
+    index = QuiltPathIndex()
+    started = time.perf_counter()
+    index.build(lambda: rows)
+    print(f"Indexed {len(index)} paths in {time.perf_counter() - started:.2f}s")
+
+    for query in QUERIES:
+        slowest = 0.0
+        for end in range(1, len(query) + 1):
+            results = index.search(query[:end])
+            slowest = max(slowest, results.elapsed)
+        print(f"{query!r}: slowest keystroke {slowest * 1e3:.1f} ms, {results.candidates} candidates, "
+              f"best {results.file_ids[0] if results.file_ids else None}")
+
+    added = index_rows(args.changed, generator)
+    started = time.perf_counter()
+    index.apply_changes(QuiltWorkspaceChanges(added=added, removed=rows[:args.changed]))
+    print(f"Applied {args.changed} added and {args.changed} removed files in "
+          f"{(time.perf_counter() - started) * 1e3:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Query latency of the full-text search index on a synthetic workspace.
+
+Builds a document store with generated text, then times typical queries:
+common and rare words, phrases and the prefix query of a word being typed.
+
+Run from the repository root:
+
+    python -m benchmarks.search_query --documents 50000
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from src.quilt.extraction import QuiltDocument, QuiltDocumentStore
+from src.quilt.search import QuiltSearchIndex
+
+QUERIES = ('the', 'quilt', 'zygote', 'term01234', '"binding the edges"', 'stit', 'cotton fabric',
+           'pattern quilt stitch')
+
+_COMMON_WORDS = ('the', 'of', 'and', 'a', 'to', 'in', 'is', 'for', 'on', 'with', 'as', 'by', 'that', 'this')
+_TOPIC_WORDS = ('quilt', 'pattern', 'stitch', 'cotton', 'fabric', 'binding', 'edges', 'block', 'border',
+                'thread', 'needle', 'batting', 'seam', 'square', 'triangle', 'applique', 'layer', 'backing')
+
+
+def synthetic_documents(count: int, words_per_document: int = 400, seed: int = 1):
+    """Yield (file_id, document) pairs whose words follow a Zipf distribution, like natural text."""
+    generator = random.Random(seed)
+    vocabulary = list(_COMMON_WORDS + _TOPIC_WORDS) + [f'term{i:05d}' for i in range(50000)] + ['zygote']
+    weights = list(itertools.accumulate(1 / rank ** 1.07 for rank in range(1, len(vocabulary) + 1)))
+    for i in range(count):
+        words = generator.choices(vocabulary, cum_weights=weights, k=words_per_document)
+        if i % 50 == 0:
+            words[10:10] = ['binding', 'the', 'edges']
+
+        text = ' '.join(words)
+        title = f'Notes {i} on {generator.choice(_TOPIC_WORDS)}'
+        yield f'notes/note-{i:06d}.md', QuiltDocument(f'{i:040x}', 'markdown', text, None, title, None)
+
+
+def build_store(directory: str, count: int) -> QuiltDocumentStore:
+    store = QuiltDocumentStore(directory)
+    batch_files, batch_documents = [], []
+    for file_id, document in synthetic_documents(count):
+        batch_files.append((file_id, len(document.text), 0.0, document.content_hash))
+        batch_documents.append(document)
+        if len(batch_documents) == 1000:
+            store.store(batch_files, batch_documents)
+            batch_files, batch_documents = [], []
+    store.store(batch_files, batch_documents)
+    return store
+
+
+def time_query(index: QuiltSearchIndex, query: str, repeats: int) -> tuple:
+    timings = []
+    results = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        results = index.search(query)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), max(timings), len(results.results), results.complete
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--documents', type=int, default=50000)
+    parser.add_argument('--repeats', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        store = build_store(directory, args.documents)
+        elapsed = time.perf_counter() - started
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        print(f"Indexed {args.documents} documents in {elapsed:.1f}s ({size / 2**20:.0f} MiB on disk)")
+
+        index = QuiltSearchIndex(store)
+        print(f"{'query':<24} {'median':>10} {'max':>10} {'results':>8} {'ranked':>9}")
+        for query in QUERIES:
+            median, worst, found, complete = time_query(index, query, args.repeats)
+            ranked = 'all' if complete else 'candidates'
+            print(f"{query:<24} {median * 1e3:>8.1f}ms {worst * 1e3:>8.1f}ms {found:>8} {ranked:>9}")
+
+        index.close()
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""Stylesheet polish time: per-widget full sheets versus one application sheet.
+
+Builds a widget tree shaped like the main view (title bar buttons, navigation
+tree, splitter, panes) and times building, styling and polishing it, styling
+it again once it is polished, and re-styling the tree after a theme change:
+
+- per-widget:  the full sheet set on the window, the central widget and again,
+               with the caret rules appended, on the tree
+- app-level:   the compiled sheet set once on the application, the tree only
+               carries its caret rules
+
+Run from the repository root (use QT_QPA_PLATFORM=offscreen without a display):
+
+    python -m benchmarks.stylesheet_polish
+"""
+import argparse
+import time
+
+from PySide6.QtGui import QStandardItem, QStandardItemModel
+from PySide6.QtWidgets import (
+    QApplication, QHBoxLayout, QLabel, QMainWindow, QPushButton, QSplitter, QToolButton, QTreeView,
+    QVBoxLayout, QWidget
+)
+
+from src.quilt.ui.style import compile_stylesheet
+
+CARET_STYLE = """
+    QTreeView#navigation-tree::branch:closed:has-children {
+        image: url(assets/icons/dark-gray/caret-right.png);
+    }
+
+    QTreeView#navigation-tree::branch:open:has-children {
+        image: url(assets/icons/dark-gray/caret-down.png);
+    }
+    """
+
+
+def build_window(rows: int):
+    window = QMainWindow()
+    central = QWidget()
+    layout = QVBoxLayout(central)
+
+    title_bar = QWidget()
+    title_layout = QHBoxLayout(title_bar)
+    title_layout.addWidget(QLabel("Quilt"))
+    for name in ("title-bar-small-button",) * 3 + ("title-bar-button",) * 2 + ("title-bar-close-button",):
+        button = QPushButton()
+        button.setObjectName(name)
+        title_layout.addWidget(button)
+    layout.addWidget(title_bar)
+
+    splitter = QSplitter()
+    navigation = QWidget()
+    navigation_layout = QVBoxLayout(navigation)
+    toolbar = QHBoxLayout()
+    for _ in range(4):
+        button = QToolButton()
+        button.setObjectName("toolbar-button")
+        toolbar.addWidget(button)
+    navigation_layout.addLayout(toolbar)
+
+    model = QStandardItemModel()
+    for folder in range(rows // 10):
+        item = QStandardItem(f"folder-{folder}")
+        for file in range(9):
+            item.appendRow(QStandardItem(f"file-{file}.pdf"))
+        model.appendRow(item)
+
+    tree = QTreeView()
+    tree.setObjectName("navigation-tree")
+    tree.setModel(model)
+    tree.expandAll()
+    navigation_layout.addWidget(tree)
+    splitter.addWidget(navigation)
+
+    view = QWidget()
+    view.setObjectName("view-pane")
+    splitter.addWidget(view)
+    feature = QWidget()
+    QVBoxLayout(feature).addWidget(QLabel("Features"))
+    splitter.addWidget(feature)
+    layout.addWidget(splitter)
+
+    window.setCentralWidget(central)
+    return window, central, tree
+
+
+def polish(app, window) -> None:
+    window.show()
+    for widget in window.findChildren(QWidget):
+        widget.ensurePolished()
+    tree = window.findChild(QTreeView)
+    tree.viewport().repaint()
+    app.processEvents()
+
+
+def apply_sheets(style_sheet: str, app_level: bool, window, central, tree, suffix: str = "") -> None:
+    # The suffix makes Qt treat a repeated sheet as new
+    if app_level:
+        tree.setStyleSheet(CARET_STYLE + suffix)
+    else:
+        window.setStyleSheet(style_sheet + suffix)
+        central.setStyleSheet(style_sheet + suffix)
+        tree.setStyleSheet(style_sheet + CARET_STYLE + suffix)
+
+
+def run(app, style_sheet: str, app_level: bool, rows: int, repeat: int):
+    # As at startup, the application sheet is in place before any widget exists
+    app.setStyleSheet(style_sheet if app_level else "")
+
+    startup_time = restyle_time = theme_time = 0.0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        window, central, tree = build_window(rows)
+        apply_sheets(style_sheet, app_level, window, central, tree)
+        polish(app, window)
+        startup_time += time.perf_counter() - started
+
+        # Styling widgets that are already polished, as when a view is swapped in
+        started = time.perf_counter()
+        apply_sheets(style_sheet, app_level, window, central, tree, " ")
+        polish(app, window)
+        restyle_time += time.perf_counter() - started
+
+        # A theme change only swaps the caret images
+        started = time.perf_counter()
+        tree.setStyleSheet((CARET_STYLE if app_level else style_sheet + CARET_STYLE) + "  ")
+        polish(app, window)
+        theme_time += time.perf_counter() - started
+
+        window.close()
+        window.deleteLater()
+        app.processEvents()
+
+    return startup_time / repeat, restyle_time / repeat, theme_time / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--rows', type=int, default=500)
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+    style_sheet = compile_stylesheet("quilt-style")
+
+    # Warm up style and font caches
+    run(app, style_sheet, True, args.rows, 1)
+
+    print(f"{args.rows} tree rows, times per window")
+    print(f"{'mode':>11} {'startup (ms)':>13} {'restyle (ms)':>13} {'theme change (ms)':>18}")
+    for label, app_level in (('per-widget', False), ('app-level', True)):
+        startup_time, restyle_time, theme_time = run(app, style_sheet, app_level, args.rows, args.repeat)
+        print(f"{label:>11} {startup_time * 1e3:>13.2f} {restyle_time * 1e3:>13.2f} {theme_time * 1e3:>18.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+"""Benchmark suite over a synthetic workspace, with results written as JSON.
+
+Generates a workspace with benchmarks.generator, or uses an existing one, and
+times:
+
+- workspace_open:         QuiltWorkspace construction without stores on disk (cold) and with them (warm)
+- find_pdf_from_name:     looking up every generated PDF name, plus names that do not exist
+- modify_svg_colors:      recoloring every bundled icon to every palette color
+- svg_to_png_data:        rasterizing the bundled icons, skipped without cairosvg
+- svg_to_padded_png_data: the same, centered on a padded canvas
+- load_stylesheet:        loading the stylesheet after it changed on disk (cold) and again (warm)
+
+Only public functions are timed, and the modules a benchmark needs are
+imported when it runs. A benchmark whose modules cannot be imported, because
+an optional dependency is missing or the commit under test predates them,
+is reported as skipped, so the same suite runs on every commit it compares.
+
+Every measurement is repeated and reported as min, median and max in
+milliseconds. The JSON output also records the commit, Python version and
+workspace shape, so runs on different commits can be compared with --compare.
+
+Run from the repository root:
+
+    python -m benchmarks.suite --output before.json
+    python -m benchmarks.suite --output after.json --compare before.json
+"""
+import argparse
+import glob
+import importlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+from typing import Callable, Optional
+
+from benchmarks.generator import QuiltSyntheticWorkspace, generate_workspace
+
+RASTERIZED_ICONS = ['folder', 'folder-open', 'file-pdf', 'file-md', 'file-image', 'magnifying-glass', 'gear']
+
+
+def measure(function: Callable, repeats: int, setup: Optional[Callable] = None,
+            teardown: Optional[Callable] = None) -> dict:
+    """Time `function` `repeats` times; setup and teardown run outside the timing."""
+    timings = []
+    for _ in range(repeats):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - started) * 1e3)
+        if teardown:
+            teardown(result)
+    return {
+        'min_ms': min(timings),
+        'median_ms': statistics.median(timings),
+        'max_ms': max(timings),
+        'repeats': repeats,
+    }
+
+
+def close_workspace(workspace) -> None:
+    # Workspaces of older commits keep no stores open
+    for store in ('index', 'hashes', 'documents'):
+        if hasattr(workspace, store):
+            getattr(workspace, store).close()
+
+
+def remove_stores(root: str) -> None:
+    # Index, hash and document stores, with their journal files
+    for path in glob.glob(os.path.join(root, '.quilt-*')):
+        os.remove(path)
+
+
+def unavailable(*modules: str) -> Optional[str]:
+    """Return why a benchmark is skipped if one of its modules cannot be imported, otherwise None."""
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except (ImportError, OSError) as e:
+            return f"{module} unavailable: {str(e).splitlines()[0]}"
+    return None
+
+
+def load_icons(icon_dir: str = 'assets/icons') -> list:
+    icons = []
+    for path in sorted(glob.glob(f'{icon_dir}/*.svg')):
+        with open(path, 'r', encoding='utf-8') as file:
+            icons.append(file.read())
+    return icons
+
+
+def bench_workspace_open(workspace: QuiltSyntheticWorkspace, repeats: int) -> dict:
+    from src.quilt.workspace import QuiltWorkspace
+
+    open_workspace = lambda: QuiltWorkspace(workspace.root)
+    cold = measure(open_workspace, repeats, lambda: remove_stores(workspace.root), close_workspace)
+    warm = measure(open_workspace, repeats, teardown=close_workspace)
+    return {'cold': cold, 'warm': warm}
+
+
+def bench_find_pdf_from_name(workspace: QuiltSyntheticWorkspace, repeats: int) -> dict:
+    from src.quilt.workspace import QuiltWorkspace
+
+    opened = QuiltWorkspace(workspace.root)
+    try:
+        names = [os.path.basename(path) for path in workspace.pdfs]
+        missing = [f'missing-{i:04d}.pdf' for i in range(len(names) or 1)]
+
+        def look_up(lookups: list) -> Callable:
+            return lambda: [opened.find_pdf_from_name(name) for name in lookups]
+
+        return {
+            'found': {**measure(look_up(names), repeats), 'lookups': len(names)},
+            'missing': {**measure(look_up(missing), repeats), 'lookups': len(missing)},
+        }
+    finally:
+        close_workspace(opened)
+
+
+def bench_modify_svg_colors(workspace: QuiltSyntheticWorkspace, repeats: int) -> dict:
+    reason = unavailable('src.quilt.ui.utils')
+    if reason:
+        return {'skipped': reason}
+
+    from src.quilt.ui.colors import COLORS
+    from src.quilt.ui.utils import modify_svg_colors
+
+    icons = load_icons()
+    mappings = [{'#d9d9d9': color} for color in COLORS.values()]
+
+    def recolor():
+        for mapping in mappings:
+            for svg_content in icons:
+                modify_svg_colors(svg_content, mapping)
+
+    return {'all_colors': {**measure(recolor, repeats), 'icons': len(icons), 'colors': len(mappings)}}
+
+
+def bench_svg_to_png_data(workspace: QuiltSyntheticWorkspace, repeats: int) -> dict:
+    reason = unavailable('cairosvg', 'src.quilt.ui.utils')
+    if reason:
+        return {'skipped': reason}
+
+    from src.quilt.ui.utils import svg_to_png_data
+
+    rasterize = lambda: [svg_to_png_data(name, None, 64, 64) for name in RASTERIZED_ICONS]
+    return {'icons': {**measure(rasterize, repeats), 'count': len(RASTERIZED_ICONS)}}
+
+
+def bench_svg_to_padded_png_data(workspace: QuiltSyntheticWorkspace, repeats: int) -> dict:
+    reason = unavailable('cairosvg', 'src.quilt.ui.utils')
+    if reason:
+        return {'skipped': reason}
+
+    from src.quilt.ui.utils import svg_to_padded_png_data
+
+    rasterize = lambda: [svg_to_padded_png_data(name, None, 64, 64, 12) for name in RASTERIZED_ICONS]
+    return {'icons': {**measure(rasterize, repeats), 'count': len(RASTERIZED_ICONS)}}
+
+
+def bench_load_stylesheet(workspace: QuiltSyntheticWorkspace, repeats: int) -> dict:
+    reason = unavailable('src.quilt.ui.utils')
+    if reason:
+        return {'skipped': reason}
+
+    from src.quilt.ui.utils import load_stylesheet
+
+    # A new mtime before every cold load, as if the file had been edited, restored afterwards
+    style_path = 'styles/quilt-style.qss'
+    original = os.stat(style_path)
+    edits = iter(range(1, repeats + 1))
+    touch = lambda: os.utime(style_path, ns=(original.st_atime_ns, original.st_mtime_ns + next(edits) * 10 ** 9))
+
+    load = lambda: load_stylesheet('quilt-style')
+    try:
+        cold = measure(load, repeats, touch)
+    finally:
+        os.utime(style_path, ns=(original.st_atime_ns, original.st_mtime_ns))
+    warm = measure(load, repeats)
+    return {'cold': cold, 'warm': warm}
+
+
+BENCHMARKS = {
+    'workspace_open': bench_workspace_open,
+    'find_pdf_from_name': bench_find_pdf_from_name,
+    'modify_svg_colors': bench_modify_svg_colors,
+    'svg_to_png_data': bench_svg_to_png_data,
+    'svg_to_padded_png_data': bench_svg_to_padded_png_data,
+    'load_stylesheet': bench_load_stylesheet,
+}
+
+
+def existing_workspace(root: str, depth: int, fan_out: int, files: int) -> QuiltSyntheticWorkspace:
+    """Describe a workspace that is already on disk by listing it."""
+    workspace = QuiltSyntheticWorkspace(root, depth, fan_out, files)
+    kinds = {'.pdf': workspace.pdfs, '.md': workspace.markdown, '.png': workspace.images}
+    for directory, folders, file_names in os.walk(root):
+        folders[:] = [folder for folder in folders if not folder.startswith('.')]
+        relative = os.path.relpath(directory, root)
+        if relative != '.':
+            workspace.folders.append(relative)
+        for file_name in file_names:
+            written = kinds.get(os.path.splitext(file_name)[1].lower())
+            if written is not None:
+                written.append(os.path.normpath(os.path.join(relative, file_name)))
+    return workspace
+
+
+def current_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(workspace: QuiltSyntheticWorkspace, repeats: int, only: Optional[list] = None) -> dict:
+    results = {}
+    for name, benchmark in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        print(f"{name}...", flush=True)
+        results[name] = benchmark(workspace, repeats)
+
+    return {
+        'commit': current_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'workspace': workspace.describe(),
+        'results': results,
+    }
+
+
+def compare(run: dict, previous: dict) -> None:
+    """Print the median of every measurement next to the previous run's."""
+    print(f"{'measurement':<40} {'previous':>12} {'current':>12} {'ratio':>8}")
+    for name, measurements in run['results'].items():
+        for label, current in measurements.items():
+            before = previous.get('results', {}).get(name, {}).get(label)
+            if not isinstance(current, dict) or not isinstance(before, dict):
+                continue
+            ratio = current['median_ms'] / before['median_ms'] if before['median_ms'] else float('inf')
+            print(f"{name + '.' + label:<40} {before['median_ms']:>10.2f}ms {current['median_ms']:>10.2f}ms "
+                  f"{ratio:>7.2f}x")
+
+    if previous.get('workspace') != run['workspace']:
+        print("Note: the workspaces differ, the runs are not directly comparable")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workspace', help="generate into this folder and keep it, or reuse it if it exists")
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--fan-out', type=int, default=4)
+    parser.add_argument('--files', type=int, default=20)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS))
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="JSON file of an earlier run to compare against")
+    args = parser.parse_args()
+
+    root = args.workspace or tempfile.mkdtemp(prefix='quilt-benchmark-')
+    try:
+        if os.path.exists(os.path.join(root, '.quilt')):
+            workspace = existing_workspace(root, args.depth, args.fan_out, args.files)
+            print(f"Reusing {workspace.files} files in {len(workspace.folders) + 1} folders")
+        else:
+            workspace = generate_workspace(root, args.depth, args.fan_out, args.files)
+            print(f"Generated {workspace.files} files in {len(workspace.folders) + 1} folders")
+
+        run = run_suite(workspace, args.repeats, args.only)
+    finally:
+        if not args.workspace:
+            shutil.rmtree(root, ignore_errors=True)
+
+    for name, measurements in run['results'].items():
+        for label, measurement in measurements.items():
+            if isinstance(measurement, dict):
+                print(f"{name}.{label}: median {measurement['median_ms']:.2f} ms "
+                      f"(min {measurement['min_ms']:.2f}, max {measurement['max_ms']:.2f})")
+            else:
+                print(f"{name}.{label}: {measurement}")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(run, file, indent=2)
+        print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            compare(run, json.load(file))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""SVG recoloring: the former modify_svg_colors loop versus QuiltSvgRecolorer.
+
+Runs both on the bundled icon set for growing color mappings. Run from the
+repository root:
+
+    python -m benchmarks.svg_recolor
+"""
+import argparse
+import glob
+import re
+import time
+
+from src.quilt.ui.colors import COLORS
+from src.quilt.ui.recolor import QuiltSvgRecolorer
+
+
+def legacy_modify_svg_colors(svg_content, color_mapping):
+    """The modify_svg_colors implementation this engine replaced, kept for comparison."""
+    modified_content = svg_content
+
+    for old_color, new_color in color_mapping.items():
+        patterns = [
+            old_color.lower(),
+            old_color.upper(),
+            old_color.lstrip('#').lower(),
+            old_color.lstrip('#').upper(),
+        ]
+
+        for pattern in patterns:
+            modified_content = re.sub(rf'fill\s*=\s*["\']#{pattern}["\']', f'fill="{new_color}"',
+                                      modified_content, flags=re.IGNORECASE)
+            modified_content = re.sub(rf'fill\s*=\s*["\']{pattern}["\']', f'fill="{new_color}"',
+                                      modified_content, flags=re.IGNORECASE)
+            modified_content = re.sub(rf'stroke\s*=\s*["\']#{pattern}["\']', f'stroke="{new_color}"',
+                                      modified_content, flags=re.IGNORECASE)
+            modified_content = re.sub(rf'stroke\s*=\s*["\']{pattern}["\']', f'stroke="{new_color}"',
+                                      modified_content, flags=re.IGNORECASE)
+            modified_content = re.sub(rf'fill\s*:\s*#{pattern}', f'fill:{new_color}',
+                                      modified_content, flags=re.IGNORECASE)
+            modified_content = re.sub(rf'stroke\s*:\s*#{pattern}', f'stroke:{new_color}',
+                                      modified_content, flags=re.IGNORECASE)
+
+    return modified_content
+
+
+def load_icons(icon_dir: str = 'assets/icons') -> list:
+    icons = []
+    for path in sorted(glob.glob(f'{icon_dir}/*.svg')):
+        with open(path, 'r', encoding='utf-8') as file:
+            icons.append(file.read())
+    return icons
+
+
+def make_mapping(size: int) -> dict:
+    """Map the bundled icon color plus `size - 1` palette colors onto dark gray."""
+    mapping = {'#d9d9d9': COLORS['dark-gray']}
+    for color in list(COLORS.values())[:size - 1]:
+        mapping.setdefault(color, COLORS['dark-gray'])
+    return mapping
+
+
+def time_per_icon(function, icons, mapping, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for icon in icons:
+            function(icon, mapping)
+    return (time.perf_counter() - started) / (repeat * len(icons))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--mappings', type=int, nargs='+', default=[1, 4, 8, len(COLORS)])
+    args = parser.parse_args()
+
+    icons = load_icons()
+
+    # Both engines agree on the bundled icons
+    mapping = make_mapping(1)
+    recolorer = QuiltSvgRecolorer(mapping)
+    for icon in icons:
+        assert legacy_modify_svg_colors(icon, mapping) == recolorer.recolor(icon)
+
+    print(f"{len(icons)} icons, times per icon")
+    print(f"{'mappings':>9} {'legacy (us)':>12} {'one-pass (us)':>14} {'speedup':>8}")
+    for size in args.mappings:
+        mapping = make_mapping(size)
+        recolorer = QuiltSvgRecolorer(mapping)
+
+        legacy = time_per_icon(legacy_modify_svg_colors, icons, mapping, args.repeat)
+        one_pass = time_per_icon(lambda svg, _: recolorer.recolor(svg), icons, mapping, args.repeat)
+        print(f"{len(mapping):>9} {legacy * 1e6:>12.1f} {one_pass * 1e6:>14.1f} {legacy / one_pass:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
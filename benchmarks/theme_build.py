@@ -0,0 +1,81 @@
+"""Theme build: rendering the whole icon set of a palette color serially versus on the job runtime.
+
+Times, per palette color:
+
+- serial:   render_theme_icons over every bundled icon on the calling thread
+- parallel: build_theme, chunks of icons on the thread lane of the job runtime
+
+Also reports how fast another Python thread runs while icons are painted,
+compared to running alone. If painting held the GIL, the two threads would
+take turns and the other one would get at most half its speed, even with a
+core to itself; above that, the parallel build can use more than one core.
+
+Run from the repository root (use QT_QPA_PLATFORM=offscreen without a display):
+
+    python -m benchmarks.theme_build
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+
+from src.quilt.jobs import shutdown_job_runtime
+from src.quilt.ui.colors import COLORS
+from src.quilt.ui.theme import build_theme, bundled_icon_names, render_theme_icons
+
+
+def median_time(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def spinner_rate(function) -> float:
+    """Return the iterations per second a pure Python loop makes while `function` runs."""
+    stop = threading.Event()
+    counts = []
+
+    def spin():
+        count = 0
+        while not stop.is_set():
+            count += 1
+        counts.append(count)
+
+    spinner = threading.Thread(target=spin)
+    spinner.start()
+    started = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    spinner.join()
+    return counts[0] / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--colors', nargs='+', default=['dark-red', 'light-blue'], choices=list(COLORS))
+    args = parser.parse_args()
+
+    icon_names = bundled_icon_names()
+    print(f"{len(icon_names)} icons, {os.cpu_count()} cores")
+    print(f"{'color':>16} {'serial (ms)':>12} {'parallel (ms)':>14}")
+    try:
+        for color_name in args.colors:
+            serial = median_time(lambda: render_theme_icons(color_name, icon_names), args.repeat)
+            parallel = median_time(lambda: build_theme(color_name), args.repeat)
+            print(f"{color_name:>16} {serial * 1e3:>12.1f} {parallel * 1e3:>14.1f}")
+
+        idle = spinner_rate(lambda: time.sleep(0.5))
+        painting = spinner_rate(lambda: [render_theme_icons(color_name, icon_names) for color_name in COLORS])
+        print(f"Python thread while painting: {painting / idle:.0%} of its speed alone")
+    finally:
+        shutdown_job_runtime()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Loading, expanding and updating a large folder in the navigation tree model.
+
+Feeds synthetic index rows for one folder with many files (plus a few small
+ones) to QuiltWorkspaceModel, as the workspace loader does, then times the
+first expansion of the large folder in a QTreeView, expanding it again, and
+a watcher batch adding files to it while it is expanded. Nothing touches the
+file system.
+
+Run from the repository root (use QT_QPA_PLATFORM=offscreen without a display):
+
+    python -m benchmarks.tree_expand --files 50000
+"""
+import argparse
+import os
+import random
+import time
+
+from types import SimpleNamespace
+
+from PySide6.QtWidgets import QApplication, QTreeView
+
+from src.quilt.index import QuiltWorkspaceChanges
+from src.quilt.ui.tree import QuiltWorkspaceModel
+
+
+def index_rows(directory: str, names: list) -> list:
+    return [(os.path.join(directory, name), directory, name, 'pdf', 1024, 0.0) for name in names]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=50000)
+    parser.add_argument('--added', type=int, default=1000)
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+    workspace = SimpleNamespace(workspace_dir='/workspace', entries=(), relative_path=os.path.normpath)
+
+    # The index hands out rows in path order
+    generator = random.Random(0)
+    names = sorted(f'paper-{generator.randrange(10**9):09d}.pdf' for _ in range(args.files))
+    directories = ['', 'library'] + [f'folder-{i}' for i in range(20)]
+    rows = index_rows('library', names)
+    for directory in directories[2:]:
+        rows.extend(index_rows(directory, [f'notes-{i}.pdf' for i in range(10)]))
+
+    model = QuiltWorkspaceModel(workspace)
+    tree = QTreeView()
+    tree.setUniformRowHeights(True)
+    tree.setModel(model)
+    tree.resize(400, 800)
+    tree.show()
+    app.processEvents()
+
+    started = time.perf_counter()
+    model.apply_changes(QuiltWorkspaceChanges(added=rows, added_directories=directories))
+    app.processEvents()
+    print(f"Loaded {len(rows)} rows in {(time.perf_counter() - started) * 1e3:.1f} ms")
+
+    library = model.index_for_path('library')
+    started = time.perf_counter()
+    tree.expand(library)
+    app.processEvents()
+    print(f"Expanded {args.files} files in {(time.perf_counter() - started) * 1e3:.1f} ms, "
+          f"{model.rowCount(library)} rows fetched")
+
+    tree.collapse(library)
+    app.processEvents()
+    started = time.perf_counter()
+    tree.expand(library)
+    app.processEvents()
+    print(f"Expanded again in {(time.perf_counter() - started) * 1e3:.1f} ms")
+
+    added = [f'paper-{generator.randrange(10**9):09d}-v2.pdf' for _ in range(args.added)]
+    started = time.perf_counter()
+    model.apply_changes(QuiltWorkspaceChanges(added=index_rows('library', added)))
+    app.processEvents()
+    print(f"Added {args.added} files to the expanded folder in {(time.perf_counter() - started) * 1e3:.1f} ms, "
+          f"{model.rowCount(library)} rows fetched")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,342 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.quilt.extraction import fold_term
+
+DUPLICATES_FILE_NAME = '.quilt-duplicates.db'
+DUPLICATES_SCHEMA_VERSION = 1
+
+# Signature length, split into BANDS bands for locality-sensitive hashing
+PERMUTATIONS = 128
+BANDS = 16
+
+# Shingles are runs of this many words, so rewording a sentence changes only the shingles around it
+SHINGLE_WORDS = 5
+
+# Documents whose shingles are estimated to overlap this much are near-duplicates
+SIMILARITY_THRESHOLD = 0.8
+
+# Shorter texts, like scanned PDFs with a running header, say too little to call them copies
+MIN_WORDS = 50
+
+# Fixed, signatures are cached and only comparable when hashed the same way
+SEED = 20240601
+
+# Shingles hashed against all permutations at once
+_BLOCK_SIZE = 4096
+
+_TERM_PATTERN = re.compile(r'[^\W_]+')
+
+
+@dataclass
+class QuiltDuplicateGroup:
+    """Workspace files with the same or nearly the same text.
+
+    `similarity` is the lowest estimated overlap between two documents the
+    group was joined by, 1.0 for identical contents.
+    """
+    files: List[str]
+    content_hashes: List[str]
+    similarity: float
+
+
+@dataclass
+class QuiltDuplicateStats:
+    """Outcome of a duplicate detection run."""
+    total: int = 0
+    cached: int = 0
+    signed: int = 0
+    removed: int = 0
+    groups: int = 0
+    elapsed: float = 0.0
+    clustering: float = 0.0
+
+    @property
+    def documents_per_second(self) -> float:
+        return self.signed / self.elapsed if self.elapsed > 0 else 0.0
+
+
+@dataclass
+class QuiltDuplicateReport:
+    """Duplicate groups of a workspace, largest first."""
+    groups: List[QuiltDuplicateGroup] = field(default_factory=list)
+    stats: QuiltDuplicateStats = field(default_factory=QuiltDuplicateStats)
+
+
+class QuiltMinHasher():
+    """MinHash signatures over the word shingles of a text.
+
+    The share of equal positions in two signatures estimates the Jaccard
+    similarity of the shingle sets. Each permutation is a multiply-add-shift
+    hash of the 64-bit shingle hashes, so signing is a few array operations.
+    """
+
+    def __init__(self, permutations: int = PERMUTATIONS, shingle_words: int = SHINGLE_WORDS,
+                 min_words: int = MIN_WORDS, seed: int = SEED):
+        self.permutations = permutations
+        self.shingle_words = shingle_words
+        self.min_words = min_words
+        self.seed = seed
+
+        generator = np.random.default_rng(seed)
+        self._multipliers = generator.integers(0, 2**64, permutations, dtype=np.uint64, endpoint=False) | np.uint64(1)
+        self._offsets = generator.integers(0, 2**64, permutations, dtype=np.uint64, endpoint=False)
+        self._word_multipliers = generator.integers(0, 2**64, shingle_words, dtype=np.uint64, endpoint=False) | np.uint64(1)
+
+    @property
+    def settings(self) -> str:
+        return f'{self.permutations}/{self.shingle_words}/{self.min_words}/{self.seed}'
+
+    def shingles(self, text: str) -> Optional[np.ndarray]:
+        """Return the distinct 64-bit hashes of the word shingles, None when the text is too short."""
+        words = _TERM_PATTERN.findall(fold_term(text))
+        if len(words) < self.min_words:
+            return None
+
+        # Hash each distinct word once
+        vocabulary, inverse = np.unique(np.array(words), return_inverse=True)
+        word_hashes = np.fromiter((zlib.crc32(word.encode('utf-8')) for word in vocabulary.tolist()),
+                                  dtype=np.uint64, count=len(vocabulary))
+        hashes = word_hashes[inverse.ravel()]
+
+        count = len(hashes) - self.shingle_words + 1
+        shingles = np.zeros(count, dtype=np.uint64)
+        for offset, multiplier in enumerate(self._word_multipliers):
+            shingles += hashes[offset:offset + count] * multiplier
+        return np.unique(shingles)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        shingles = self.shingles(text)
+        if shingles is None:
+            return None
+
+        signature = np.full(self.permutations, np.iinfo(np.uint32).max, dtype=np.uint32)
+        for first in range(0, len(shingles), _BLOCK_SIZE):
+            block = shingles[first:first + _BLOCK_SIZE]
+            values = (self._multipliers[:, None] * block[None, :] + self._offsets[:, None]) >> np.uint64(32)
+            np.minimum(signature, values.min(axis=1).astype(np.uint32), out=signature)
+        return signature
+
+
+class QuiltSignatureStore():
+    """MinHash signatures of the workspace documents, cached by content hash.
+
+    Documents too short to sign are stored without a signature, so they are
+    not read again either. Opening the store with other hasher settings
+    starts over.
+    """
+
+    def __init__(self, workspace_dir: str, settings: str, store_path: Optional[str] = None):
+        self.settings = settings
+        self.store_path = store_path or os.path.join(workspace_dir, DUPLICATES_FILE_NAME)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.store_path, check_same_thread=False)
+        self._create_schema()
+
+    def _create_schema(self) -> None:
+        self._connection.execute('PRAGMA journal_mode = WAL')
+
+        with self._lock, self._connection:
+            version = self._connection.execute('PRAGMA user_version').fetchone()[0]
+            settings = None
+            if version == DUPLICATES_SCHEMA_VERSION:
+                settings = self._connection.execute("SELECT value FROM settings WHERE key = 'minhash'").fetchone()
+
+            if settings is None or settings[0] != self.settings:
+                self._connection.execute('DROP TABLE IF EXISTS settings')
+                self._connection.execute('DROP TABLE IF EXISTS signatures')
+
+            self._connection.execute('CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT)')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS signatures (content_hash TEXT PRIMARY KEY, signature BLOB) WITHOUT ROWID'
+            )
+            self._connection.execute("INSERT OR REPLACE INTO settings VALUES ('minhash', ?)", (self.settings,))
+            self._connection.execute(f'PRAGMA user_version = {DUPLICATES_SCHEMA_VERSION}')
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def content_hashes(self) -> set:
+        """Return the content hash of every document that was signed or found too short."""
+        with self._lock:
+            return {row[0] for row in self._connection.execute('SELECT content_hash FROM signatures')}
+
+    def add(self, signatures: Iterable[Tuple[str, Optional[np.ndarray]]]) -> None:
+        rows = [(digest, signature.tobytes() if signature is not None else None) for digest, signature in signatures]
+        with self._lock, self._connection:
+            self._connection.executemany('INSERT OR REPLACE INTO signatures VALUES (?, ?)', rows)
+
+    def remove(self, digests: Iterable[str]) -> None:
+        with self._lock, self._connection:
+            self._connection.executemany('DELETE FROM signatures WHERE content_hash = ?', ((d,) for d in digests))
+
+    def signatures(self, permutations: int) -> Tuple[List[str], np.ndarray]:
+        """Return the signed content hashes and their signatures as the rows of one matrix."""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT content_hash, signature FROM signatures WHERE signature IS NOT NULL ORDER BY content_hash'
+            ).fetchall()
+
+        digests = [row[0] for row in rows]
+        matrix = np.frombuffer(b''.join(row[1] for row in rows), dtype=np.uint32).reshape(len(rows), permutations)
+        return digests, matrix
+
+
+def near_duplicate_pairs(signatures: np.ndarray, bands: int = BANDS,
+                         threshold: float = SIMILARITY_THRESHOLD) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (pairs, similarities) of signature rows estimated to be at least `threshold` similar.
+
+    Rows that agree on every position of some band share a bucket. Only
+    bucket members are compared, each with the first row of its bucket, so
+    the work grows with the number of rows rather than the number of pairs.
+    """
+    count, permutations = signatures.shape
+    if count < 2:
+        return np.empty((0, 2), dtype=np.int64), np.empty(0)
+
+    rows = permutations // bands
+    generator = np.random.default_rng(SEED)
+    multipliers = generator.integers(0, 2**64, rows, dtype=np.uint64, endpoint=False) | np.uint64(1)
+
+    candidates = []
+    positions = np.arange(count)
+    for band in range(bands):
+        # Collisions of the bucket key only add candidates, they are verified below
+        values = signatures[:, band * rows:(band + 1) * rows].astype(np.uint64)
+        keys = (values * multipliers).sum(axis=1)
+
+        order = np.argsort(keys, kind='stable')
+        ordered = keys[order]
+        starts = np.r_[True, ordered[1:] != ordered[:-1]]
+        leaders = order[np.maximum.accumulate(np.where(starts, positions, 0))]
+        candidates.append(np.stack([leaders[~starts], order[~starts]], axis=1))
+
+    pairs = np.unique(np.concatenate(candidates), axis=0)
+    similarities = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+    keep = similarities >= threshold
+    return pairs[keep], similarities[keep]
+
+
+class QuiltDuplicateDetector():
+    """Groups the workspace documents that have the same or nearly the same text.
+
+    Works from the document store like QuiltEmbeddingPipeline: signatures
+    are computed for documents that have none yet and cached by content
+    hash. Grouping then runs over all cached signatures with banded LSH, in
+    time linear in the number of documents.
+    """
+
+    def __init__(self, workspace, hasher: Optional[QuiltMinHasher] = None,
+                 signatures: Optional[QuiltSignatureStore] = None, bands: int = BANDS,
+                 threshold: float = SIMILARITY_THRESHOLD, batch_size: int = 256):
+        self.workspace = workspace
+        self.hasher = hasher or QuiltMinHasher()
+        if signatures is None:
+            signatures = QuiltSignatureStore(workspace.workspace_dir, self.hasher.settings)
+        self.signatures = signatures
+        self.bands = bands
+        self.threshold = threshold
+        self.batch_size = batch_size
+
+    def run(self, progress_callback: Optional[Callable[[QuiltDuplicateStats], None]] = None,
+            cancelled: Optional[Callable[[], bool]] = None) -> QuiltDuplicateReport:
+        started = time.perf_counter()
+        report = QuiltDuplicateReport()
+        stats = report.stats
+
+        documents = self.workspace.documents.content_hashes()
+        signed = self.signatures.content_hashes()
+        stats.total = len(documents)
+        stats.cached = len(documents & signed)
+
+        # Contents no file has anymore
+        stale = signed - documents
+        if stale:
+            self.signatures.remove(stale)
+            stats.removed = len(stale)
+
+        batch = []
+        for digest in sorted(documents - signed):
+            if cancelled and cancelled():
+                return report
+
+            text = self.workspace.documents.text(digest)
+            if text is None:
+                continue
+            batch.append((digest, self.hasher.signature(text)))
+            stats.signed += 1
+
+            if len(batch) >= self.batch_size:
+                self.signatures.add(batch)
+                batch = []
+                stats.elapsed = time.perf_counter() - started
+                if progress_callback:
+                    progress_callback(stats)
+
+        if batch:
+            self.signatures.add(batch)
+
+        clustering_started = time.perf_counter()
+        report.groups = self.groups()
+        stats.groups = len(report.groups)
+        stats.clustering = time.perf_counter() - clustering_started
+        stats.elapsed = time.perf_counter() - started
+        return report
+
+    def groups(self) -> List[QuiltDuplicateGroup]:
+        digests, matrix = self.signatures.signatures(self.hasher.permutations)
+        pairs, similarities = near_duplicate_pairs(matrix, self.bands, self.threshold)
+
+        # Union-find over the near-duplicate pairs, remembering the weakest link of each group
+        parents = list(range(len(digests)))
+        weakest = {}
+
+        def find(node: int) -> int:
+            while parents[node] != node:
+                parents[node] = parents[parents[node]]
+                node = parents[node]
+            return node
+
+        for (first, second), similarity in zip(pairs.tolist(), similarities.tolist()):
+            first, second = find(first), find(second)
+            if first != second:
+                parents[second] = first
+                weakest[first] = min(similarity, weakest.get(first, 1.0), weakest.pop(second, 1.0))
+
+        members = {}
+        for node in {node for pair in pairs.tolist() for node in pair}:
+            members.setdefault(find(node), []).append(digests[node])
+
+        # Files with identical contents share a document and are duplicates of each other as well
+        paths = {}
+        for file_id, (_, _, digest) in self.workspace.documents.files().items():
+            paths.setdefault(digest, []).append(file_id)
+
+        groups = [
+            QuiltDuplicateGroup(sorted(file_id for digest in group for file_id in paths.get(digest, ())),
+                                sorted(group), weakest.get(root, 1.0))
+            for root, group in members.items()
+        ]
+        grouped = {digest for group in members.values() for digest in group}
+        groups.extend(
+            QuiltDuplicateGroup(sorted(files), [digest], 1.0)
+            for digest, files in paths.items() if len(files) > 1 and digest not in grouped
+        )
+
+        groups = [group for group in groups if len(group.files) > 1]
+        groups.sort(key=lambda group: (-len(group.files), group.files[0]))
+        return groups
+
+    def close(self) -> None:
+        self.signatures.close()
@@ -0,0 +1,491 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+EMBEDDINGS_FILE_NAME = '.quilt-embeddings.db'
+VECTORS_FILE_NAME = '.quilt-embeddings.f32'
+EMBEDDINGS_SCHEMA_VERSION = 1
+
+DEFAULT_BACKEND = 'hashing'
+DEFAULT_DIMENSIONS = 384
+DEFAULT_BATCH_SIZE = 64
+
+# Chunks are windows of words that overlap, so no passage is only ever seen cut in half
+CHUNK_WORDS = 200
+CHUNK_OVERLAP = 40
+
+# Rows the vector file grows by at least
+MIN_CAPACITY = 1024
+
+_WORD_PATTERN = re.compile(r'\S+')
+_FEATURE_PATTERN = re.compile(r'[^\W_]+')
+
+
+@dataclass
+class QuiltNeighbor:
+    """A chunk found by a nearest-neighbor search, with its character span in the document text."""
+    content_hash: str
+    chunk: int
+    start: int
+    end: int
+    score: float
+
+
+@dataclass
+class QuiltEmbeddingStats:
+    """Outcome of an embedding run."""
+    total: int = 0
+    cached: int = 0
+    embedded: int = 0
+    removed: int = 0
+    chunks: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def chunk_spans(text: str, words: int = CHUNK_WORDS, overlap: int = CHUNK_OVERLAP) -> List[Tuple[int, int]]:
+    """Split a text into overlapping windows of `words` words, as (start, end) character offsets."""
+    matches = list(_WORD_PATTERN.finditer(text))
+    if not matches:
+        return []
+
+    step = max(words - overlap, 1)
+    spans = []
+    for first in range(0, len(matches), step):
+        last = min(first + words, len(matches)) - 1
+        spans.append((matches[first].start(), matches[last].end()))
+        if last == len(matches) - 1:
+            break
+    return spans
+
+
+class QuiltEmbeddingBackend():
+    """Turns texts into vectors. Subclasses set `name` and `dimensions` and implement `encode`.
+
+    `embed` normalizes what `encode` returns to unit length, so the dot
+    product of two vectors is their cosine similarity.
+    """
+    name = ''
+    dimensions = 0
+
+    @property
+    def model_id(self) -> str:
+        """Identifies the vectors a backend produces, vectors of another model_id are not comparable."""
+        return f'{self.name}-{self.dimensions}'
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.asarray(self.encode(texts), dtype=np.float32).reshape(len(texts), self.dimensions)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+
+class QuiltHashingBackend(QuiltEmbeddingBackend):
+    """Deterministic local stand-in for a language model.
+
+    Words and their character n-grams are hashed into `dimensions` buckets
+    with a sign taken from the hash, and counts are dampened logarithmically.
+    Texts sharing vocabulary and word forms end up close together. No model
+    download, no GPU, and the same text always gives the same vector.
+    """
+    name = 'hashing'
+
+    def __init__(self, dimensions: int = DEFAULT_DIMENSIONS, ngram_sizes: Tuple[int, ...] = (3, 4)):
+        self.dimensions = dimensions
+        self.ngram_sizes = tuple(ngram_sizes)
+
+    @property
+    def model_id(self) -> str:
+        return f"{self.name}-{self.dimensions}-{'.'.join(map(str, self.ngram_sizes))}"
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = []
+            for word in _FEATURE_PATTERN.findall(text.lower()):
+                features.append(word)
+                padded = f'<{word}>'
+                for size in self.ngram_sizes:
+                    features.extend(padded[i:i + size] for i in range(len(padded) - size + 1))
+            if not features:
+                continue
+
+            hashes = np.fromiter((zlib.crc32(feature.encode('utf-8')) for feature in features),
+                                 dtype=np.uint32, count=len(features))
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+            counts = np.bincount(hashes % self.dimensions, weights=signs, minlength=self.dimensions)
+            vectors[row] = np.sign(counts) * np.log1p(np.abs(counts))
+        return vectors
+
+
+class QuiltSentenceTransformerBackend(QuiltEmbeddingBackend):
+    """Embeds with a sentence-transformers model on the CPU. Needs the optional sentence-transformers package."""
+    name = 'sentence-transformers'
+
+    def __init__(self, model: str = 'all-MiniLM-L6-v2', device: str = 'cpu'):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError("The sentence-transformers backend needs the sentence-transformers package") from e
+
+        self.model_name = model
+        self.model = SentenceTransformer(model, device=device)
+        self.dimensions = self.model.get_sentence_embedding_dimension()
+
+    @property
+    def model_id(self) -> str:
+        return f'{self.name}-{self.model_name}'
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        return self.model.encode(list(texts), batch_size=len(texts), convert_to_numpy=True)
+
+
+EMBEDDING_BACKENDS: Dict[str, Callable[..., QuiltEmbeddingBackend]] = {
+    QuiltHashingBackend.name: QuiltHashingBackend,
+    QuiltSentenceTransformerBackend.name: QuiltSentenceTransformerBackend,
+}
+
+def register_backend(name: str, factory: Callable[..., QuiltEmbeddingBackend]) -> None:
+    EMBEDDING_BACKENDS[name] = factory
+
+def create_backend(backend: str = DEFAULT_BACKEND, **options) -> QuiltEmbeddingBackend:
+    """Create a backend by name, options are passed on to it. Workspaces select one in `.quilt`:
+
+        embeddings:
+          backend: sentence-transformers
+          model: all-MiniLM-L6-v2
+    """
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend}")
+    return EMBEDDING_BACKENDS[backend](**options)
+
+
+class QuiltVectorStore():
+    """Chunk vectors of the workspace documents, cached by content hash.
+
+    Vectors are the rows of a float32 matrix in a memory-mapped file, so
+    they are paged in by the OS rather than loaded, and searching them is a
+    single matrix-vector product. The rows of a document are appended
+    together and a SQLite table maps them back to content hashes and chunk
+    spans. Removed rows are masked out until `compact` rewrites the file.
+
+    The store belongs to one backend model; opening it with another one, or
+    other dimensions, starts over.
+    """
+
+    def __init__(self, workspace_dir: str, model_id: str, dimensions: int, store_path: Optional[str] = None,
+                 vectors_path: Optional[str] = None):
+        self.model_id = model_id
+        self.dimensions = dimensions
+        self.store_path = store_path or os.path.join(workspace_dir, EMBEDDINGS_FILE_NAME)
+        self.vectors_path = vectors_path or os.path.join(workspace_dir, VECTORS_FILE_NAME)
+
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(self.store_path, check_same_thread=False)
+        self._create_schema()
+
+        # Rows with a document that was not completely embedded, left by an interrupted run
+        with self._connection:
+            self._connection.execute(
+                'DELETE FROM chunks WHERE content_hash NOT IN (SELECT content_hash FROM documents)'
+            )
+
+        rows = np.array([row[0] for row in self._connection.execute('SELECT row FROM chunks')], dtype=np.int64)
+        self._count = int(rows.max()) + 1 if len(rows) else 0
+        self._alive = np.zeros(max(self._count, MIN_CAPACITY), dtype=bool)
+        self._alive[rows] = True
+        self._matrix = None
+        self._open_matrix(len(self._alive))
+
+    def _create_schema(self) -> None:
+        self._connection.execute('PRAGMA journal_mode = WAL')
+
+        with self._lock, self._connection:
+            version = self._connection.execute('PRAGMA user_version').fetchone()[0]
+            model = None
+            if version == EMBEDDINGS_SCHEMA_VERSION:
+                model = self._connection.execute("SELECT value FROM settings WHERE key = 'model'").fetchone()
+
+            if model is None or model[0] != f'{self.model_id}/{self.dimensions}':
+                self._connection.execute('DROP TABLE IF EXISTS settings')
+                self._connection.execute('DROP TABLE IF EXISTS chunks')
+                self._connection.execute('DROP TABLE IF EXISTS documents')
+                if os.path.exists(self.vectors_path):
+                    os.remove(self.vectors_path)
+
+            self._connection.execute('CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT)')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS chunks ('
+                'row INTEGER PRIMARY KEY, content_hash TEXT NOT NULL, chunk INTEGER NOT NULL, '
+                'start INTEGER NOT NULL, end INTEGER NOT NULL)'
+            )
+            self._connection.execute('CREATE INDEX IF NOT EXISTS chunks_content_hash ON chunks (content_hash)')
+
+            # A document is listed once all of its chunks are stored
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS documents (content_hash TEXT PRIMARY KEY, chunks INTEGER NOT NULL)'
+            )
+            self._connection.execute(
+                "INSERT OR REPLACE INTO settings VALUES ('model', ?)", (f'{self.model_id}/{self.dimensions}',)
+            )
+            self._connection.execute(f'PRAGMA user_version = {EMBEDDINGS_SCHEMA_VERSION}')
+
+    def _open_matrix(self, capacity: int) -> None:
+        size = capacity * self.dimensions * 4
+        with open(self.vectors_path, 'ab') as file:
+            if file.tell() < size:
+                file.truncate(size)
+
+        if self._matrix is not None:
+            self._matrix.flush()
+        self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r+', shape=(capacity, self.dimensions))
+
+    def close(self) -> None:
+        with self._lock:
+            self._matrix.flush()
+            self._matrix = None
+            self._connection.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._alive[:self._count].sum())
+
+    def content_hashes(self) -> set:
+        """Return the content hash of every completely embedded document."""
+        with self._lock:
+            return {row[0] for row in self._connection.execute('SELECT content_hash FROM documents')}
+
+    def add(self, documents: Iterable[Tuple[str, np.ndarray, List[Tuple[int, int]]]]) -> None:
+        """Store (content_hash, vectors, spans) of documents, one vector and span per chunk."""
+        with self._lock:
+            chunks = []
+            embedded = []
+            for digest, vectors, spans in documents:
+                first = self._count
+                self._reserve(first + len(vectors))
+                self._matrix[first:first + len(vectors)] = vectors
+                self._alive[first:first + len(vectors)] = True
+                self._count += len(vectors)
+
+                chunks.extend((first + chunk, digest, chunk, start, end) for chunk, (start, end) in enumerate(spans))
+                embedded.append((digest, len(spans)))
+
+            # Vectors reach the file before the rows referring to them are committed
+            self._matrix.flush()
+            with self._connection:
+                self._connection.executemany('INSERT INTO chunks VALUES (?, ?, ?, ?, ?)', chunks)
+                self._connection.executemany('INSERT OR REPLACE INTO documents VALUES (?, ?)', embedded)
+
+    def _reserve(self, rows: int) -> None:
+        if rows <= len(self._alive):
+            return
+
+        capacity = max(rows, 2 * len(self._alive), MIN_CAPACITY)
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:len(self._alive)] = self._alive
+        self._alive = alive
+        self._open_matrix(capacity)
+
+    def remove(self, digests: Iterable[str]) -> int:
+        """Forget the vectors of documents, returns how many chunks were removed."""
+        digests = [(digest,) for digest in digests]
+        with self._lock:
+            rows = []
+            for digest in digests:
+                rows.extend(row[0] for row in self._connection.execute(
+                    'SELECT row FROM chunks WHERE content_hash = ?', digest))
+            self._alive[rows] = False
+
+            with self._connection:
+                self._connection.executemany('DELETE FROM chunks WHERE content_hash = ?', digests)
+                self._connection.executemany('DELETE FROM documents WHERE content_hash = ?', digests)
+            return len(rows)
+
+    def vectors(self, digest: str) -> np.ndarray:
+        """Return the chunk vectors of a document, in chunk order."""
+        with self._lock:
+            rows = [row[0] for row in self._connection.execute(
+                'SELECT row FROM chunks WHERE content_hash = ? ORDER BY chunk', (digest,))]
+            return np.array(self._matrix[rows])
+
+    def nearest(self, vector: np.ndarray, k: int = 10, per_document: bool = True) -> List[QuiltNeighbor]:
+        """Return the `k` chunks most similar to a unit `vector`, by default only the best chunk per document."""
+        with self._lock:
+            if self._count == 0 or k <= 0:
+                return []
+
+            scores = self._matrix[:self._count] @ np.asarray(vector, dtype=np.float32)
+            scores[~self._alive[:self._count]] = -np.inf
+
+            # Documents have several chunks among the best ones, look further until enough documents are found
+            wanted = k * 8 if per_document else k
+            while True:
+                candidates = min(wanted, self._count)
+                top = np.argpartition(-scores, candidates - 1)[:candidates]
+                top = top[np.argsort(-scores[top], kind='stable')]
+                top = top[np.isfinite(scores[top])]
+
+                neighbors = self._neighbors(top, scores, k, per_document)
+                if len(neighbors) == k or candidates == self._count:
+                    return neighbors
+                wanted *= 4
+
+    def _neighbors(self, rows: np.ndarray, scores: np.ndarray, k: int, per_document: bool) -> List[QuiltNeighbor]:
+        spans = {}
+        for offset in range(0, len(rows), 500):
+            batch = [int(row) for row in rows[offset:offset + 500]]
+            spans.update((row[0], row[1:]) for row in self._connection.execute(
+                f"SELECT row, content_hash, chunk, start, end FROM chunks WHERE row IN ({','.join('?' * len(batch))})",
+                batch
+            ))
+
+        neighbors = []
+        seen = set()
+        for row in rows:
+            digest, chunk, start, end = spans[int(row)]
+            if per_document:
+                if digest in seen:
+                    continue
+                seen.add(digest)
+            neighbors.append(QuiltNeighbor(digest, chunk, start, end, float(scores[row])))
+            if len(neighbors) == k:
+                break
+        return neighbors
+
+    def dead_fraction(self) -> float:
+        with self._lock:
+            return 1.0 - self._alive[:self._count].sum() / self._count if self._count else 0.0
+
+    def compact(self) -> None:
+        """Rewrite the vector file without removed rows."""
+        with self._lock:
+            keep = np.flatnonzero(self._alive[:self._count])
+            vectors = np.array(self._matrix[keep])
+
+            with self._connection:
+                # Renumbered through negative rows, so old and new numbers never collide
+                self._connection.executemany(
+                    'UPDATE chunks SET row = ? WHERE row = ?',
+                    [(-(new + 1), int(old)) for new, old in enumerate(keep)]
+                )
+                self._connection.execute('UPDATE chunks SET row = -row - 1')
+
+            self._matrix.flush()
+            self._matrix = None
+            capacity = max(len(keep), MIN_CAPACITY)
+            with open(self.vectors_path, 'r+b') as file:
+                file.truncate(capacity * self.dimensions * 4)
+            self._open_matrix(capacity)
+
+            self._matrix[:len(keep)] = vectors
+            self._matrix.flush()
+            self._count = len(keep)
+            self._alive = np.zeros(capacity, dtype=bool)
+            self._alive[:len(keep)] = True
+
+
+class QuiltEmbeddingPipeline():
+    """Embeds the chunks of every extracted document that has no vectors yet.
+
+    Works from the document store, so it only ever sees text that
+    QuiltExtractionPipeline produced, and vectors are cached by content
+    hash: unchanged, renamed and copied files cost nothing. Chunks of
+    several documents are gathered into batches of `batch_size` for the
+    backend, and documents are stored once all their chunks are embedded.
+    """
+
+    def __init__(self, workspace, backend: Optional[QuiltEmbeddingBackend] = None,
+                 vectors: Optional[QuiltVectorStore] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                 chunk_words: int = CHUNK_WORDS, chunk_overlap: int = CHUNK_OVERLAP):
+        self.workspace = workspace
+        if backend is None:
+            backend = create_backend(**(workspace.workspace_data.get('embeddings') or {}))
+        self.backend = backend
+        if vectors is None:
+            vectors = QuiltVectorStore(workspace.workspace_dir, backend.model_id, backend.dimensions)
+        self.vectors = vectors
+        self.batch_size = batch_size
+        self.chunk_words = chunk_words
+        self.chunk_overlap = chunk_overlap
+
+    def run(self, progress_callback: Optional[Callable[[QuiltEmbeddingStats], None]] = None,
+            cancelled: Optional[Callable[[], bool]] = None) -> QuiltEmbeddingStats:
+        started = time.perf_counter()
+        stats = QuiltEmbeddingStats()
+
+        documents = self.workspace.documents.content_hashes()
+        embedded = self.vectors.content_hashes()
+        stats.total = len(documents)
+        stats.cached = len(documents & embedded)
+
+        # Contents no file has anymore
+        stale = embedded - documents
+        if stale:
+            self.vectors.remove(stale)
+            stats.removed = len(stale)
+
+        pending = []
+        pending_chunks = 0
+        for digest in sorted(documents - embedded):
+            if cancelled and cancelled():
+                break
+
+            text = self.workspace.documents.text(digest)
+            if text is None:
+                continue
+            spans = chunk_spans(text, self.chunk_words, self.chunk_overlap)
+            pending.append((digest, text, spans))
+            pending_chunks += len(spans)
+
+            if pending_chunks >= self.batch_size:
+                self._embed(pending, stats)
+                pending = []
+                pending_chunks = 0
+                stats.elapsed = time.perf_counter() - started
+                if progress_callback:
+                    progress_callback(stats)
+
+        if pending and not (cancelled and cancelled()):
+            self._embed(pending, stats)
+
+        if self.vectors.dead_fraction() > 0.5:
+            self.vectors.compact()
+
+        stats.elapsed = time.perf_counter() - started
+        return stats
+
+    def _embed(self, pending: List[Tuple[str, str, List[Tuple[int, int]]]], stats: QuiltEmbeddingStats) -> None:
+        texts = [text[start:end] for _, text, spans in pending for start, end in spans]
+        vectors = np.empty((len(texts), self.backend.dimensions), dtype=np.float32)
+        for first in range(0, len(texts), self.batch_size):
+            vectors[first:first + self.batch_size] = self.backend.embed(texts[first:first + self.batch_size])
+
+        documents = []
+        first = 0
+        for digest, _, spans in pending:
+            documents.append((digest, vectors[first:first + len(spans)], spans))
+            first += len(spans)
+
+        self.vectors.add(documents)
+        stats.embedded += len(pending)
+        stats.chunks += len(texts)
+
+    def search(self, text: str, k: int = 10) -> List[Tuple[str, QuiltNeighbor]]:
+        """Return (file_id, neighbor) pairs of the documents closest in meaning to `text`."""
+        neighbors = self.vectors.nearest(self.backend.embed([text])[0], k)
+        return [(file_id, neighbor) for neighbor in neighbors
+                for file_id in self.workspace.documents.paths(neighbor.content_hash)]
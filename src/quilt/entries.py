@@ -0,0 +1,284 @@
+import os
+
+from array import array
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+ENTRY_KINDS = ('markdown', 'pdf', 'image')
+
+# Kind id 0 marks a free slot
+_KIND_IDS = {kind: kind_id for kind_id, kind in enumerate(ENTRY_KINDS, start=1)}
+
+
+class QuiltEntryRecord(Mapping):
+    """Read-only, dict-like view of a single entry in a QuiltEntryStore.
+
+    Exposes the same keys as the former per-file metadata dicts: 'name', 'path',
+    'size' and 'last_modified'. A record is only valid until its entry is removed
+    from the store, as the slot is reused afterwards.
+    """
+    __slots__ = ('_store', '_row')
+
+    KEYS = ('name', 'path', 'size', 'last_modified')
+
+    def __init__(self, store: 'QuiltEntryStore', row: int):
+        self._store = store
+        self._row = row
+
+    def __getitem__(self, key: str):
+        if key == 'name':
+            return self.name
+        if key == 'path':
+            return self.path
+        if key == 'size':
+            return self.size
+        if key == 'last_modified':
+            return self.last_modified
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.KEYS)
+
+    def __len__(self) -> int:
+        return len(self.KEYS)
+
+    def __repr__(self) -> str:
+        return f"QuiltEntryRecord({dict(self)!r})"
+
+    @property
+    def file_id(self) -> str:
+        return self._store._file_id(self._row)
+
+    @property
+    def directory(self) -> str:
+        return self._store._directories[self._store._directory[self._row]]
+
+    @property
+    def name(self) -> str:
+        return self._store._names[self._row]
+
+    @property
+    def kind(self) -> str:
+        return ENTRY_KINDS[self._store._kind[self._row] - 1]
+
+    @property
+    def path(self) -> Path:
+        return Path(self._store.workspace_dir, self.file_id)
+
+    @property
+    def size(self) -> int:
+        return self._store._size[self._row]
+
+    @property
+    def last_modified(self) -> float:
+        return self._store._last_modified[self._row]
+
+    def row(self) -> tuple:
+        """Return the entry as an index row."""
+        return (self.file_id, self.directory, self.name, self.kind, self.size, self.last_modified)
+
+
+class QuiltMetadataView(Mapping):
+    """Dict-like view of all entries of one kind, keyed by file id."""
+    __slots__ = ('_store', '_kind_id')
+
+    def __init__(self, store: 'QuiltEntryStore', kind: str):
+        self._store = store
+        self._kind_id = _KIND_IDS[kind]
+
+    def __getitem__(self, file_id: str) -> QuiltEntryRecord:
+        row = self._store._find_row(file_id)
+        if row is None or self._store._kind[row] != self._kind_id:
+            raise KeyError(file_id)
+        return QuiltEntryRecord(self._store, row)
+
+    def __iter__(self) -> Iterator[str]:
+        store = self._store
+        for row, kind_id in enumerate(store._kind):
+            if kind_id == self._kind_id:
+                yield store._file_id(row)
+
+    def __len__(self) -> int:
+        return self._store._counts[self._kind_id]
+
+
+class QuiltEntryStore():
+    """Compact, columnar store of workspace entries.
+
+    Instead of a dict, a Path and duplicated strings per file, every entry is a
+    slot in a set of array-backed columns (directory id, kind, size, mtime) plus
+    its basename. Directory paths are interned once and referenced by id, and
+    file ids are only built on demand.
+
+    Entries can be looked up by relative path, basename, extension and parent
+    directory in constant time. Secondary keys map to insertion-ordered dicts of
+    slots, so updates are constant time as well. Basenames are nearly unique, so
+    the name key stores a bare slot and only switches to a dict on collisions.
+    """
+
+    def __init__(self, workspace_dir: str, rows: Iterable[tuple] = ()):
+        self.workspace_dir = workspace_dir
+
+        # Interned directories
+        self._directories: List[str] = []
+        self._directory_ids: Dict[str, int] = {}
+
+        # Columns, one slot per entry
+        self._names: List[Optional[str]] = []
+        self._directory = array('I')
+        self._kind = array('B')
+        self._size = array('q')
+        self._last_modified = array('d')
+        self._free: List[int] = []
+        self._counts = [0] * (len(ENTRY_KINDS) + 1)
+
+        # Lookup keys
+        self._by_parent: Dict[int, Dict[str, int]] = {}
+        self._by_name: Dict[str, Union[int, Dict[int, None]]] = {}
+        self._by_extension: Dict[str, Dict[int, None]] = {}
+
+        for row in rows:
+            self.add(row)
+
+    def __len__(self) -> int:
+        return len(self._names) - len(self._free)
+
+    def __contains__(self, file_id: str) -> bool:
+        return self._find_row(file_id) is not None
+
+    def __iter__(self) -> Iterator[QuiltEntryRecord]:
+        for row, kind_id in enumerate(self._kind):
+            if kind_id:
+                yield QuiltEntryRecord(self, row)
+
+    def view(self, kind: str) -> QuiltMetadataView:
+        return QuiltMetadataView(self, kind)
+
+    def add(self, row: tuple) -> QuiltEntryRecord:
+        """Add or replace an entry from an index row."""
+        file_id, directory, name, kind, size, last_modified = row
+        directory_id = self._intern_directory(directory)
+        kind_id = _KIND_IDS[kind]
+
+        existing = self._by_parent.get(directory_id, {}).get(name)
+        if existing is not None:
+            # Same file, only the columns change
+            self._counts[self._kind[existing]] -= 1
+            self._counts[kind_id] += 1
+            self._kind[existing] = kind_id
+            self._size[existing] = size
+            self._last_modified[existing] = last_modified
+            return QuiltEntryRecord(self, existing)
+
+        if self._free:
+            slot = self._free.pop()
+            self._names[slot] = name
+            self._directory[slot] = directory_id
+            self._kind[slot] = kind_id
+            self._size[slot] = size
+            self._last_modified[slot] = last_modified
+        else:
+            slot = len(self._names)
+            self._names.append(name)
+            self._directory.append(directory_id)
+            self._kind.append(kind_id)
+            self._size.append(size)
+            self._last_modified.append(last_modified)
+
+        self._counts[kind_id] += 1
+        self._by_parent.setdefault(directory_id, {})[name] = slot
+        self._add_name(name, slot)
+        self._by_extension.setdefault(self._extension(name), {})[slot] = None
+
+        return QuiltEntryRecord(self, slot)
+
+    def remove(self, file_id: str) -> bool:
+        slot = self._find_row(file_id)
+        if slot is None:
+            return False
+
+        name = self._names[slot]
+        directory_id = self._directory[slot]
+
+        siblings = self._by_parent[directory_id]
+        del siblings[name]
+        if not siblings:
+            del self._by_parent[directory_id]
+
+        self._remove_name(name, slot)
+        extension = self._extension(name)
+        slots = self._by_extension[extension]
+        del slots[slot]
+        if not slots:
+            del self._by_extension[extension]
+
+        self._counts[self._kind[slot]] -= 1
+        self._kind[slot] = 0
+        self._names[slot] = None
+        self._free.append(slot)
+
+        return True
+
+    def get(self, file_id: str) -> Optional[QuiltEntryRecord]:
+        slot = self._find_row(file_id)
+        return QuiltEntryRecord(self, slot) if slot is not None else None
+
+    def find_by_name(self, name: str) -> List[QuiltEntryRecord]:
+        slots = self._by_name.get(name, ())
+        if isinstance(slots, int):
+            slots = (slots,)
+        return [QuiltEntryRecord(self, slot) for slot in slots]
+
+    def find_by_extension(self, extension: str) -> List[QuiltEntryRecord]:
+        return [QuiltEntryRecord(self, slot) for slot in self._by_extension.get(extension.lower(), ())]
+
+    def children(self, directory: str) -> List[QuiltEntryRecord]:
+        """Return the entries directly inside a directory ('' is the workspace root)."""
+        directory_id = self._directory_ids.get(directory)
+        if directory_id is None:
+            return []
+        return [QuiltEntryRecord(self, slot) for slot in self._by_parent.get(directory_id, {}).values()]
+
+    def _intern_directory(self, directory: str) -> int:
+        directory_id = self._directory_ids.get(directory)
+        if directory_id is None:
+            directory_id = len(self._directories)
+            self._directories.append(directory)
+            self._directory_ids[directory] = directory_id
+        return directory_id
+
+    def _add_name(self, name: str, slot: int) -> None:
+        slots = self._by_name.get(name)
+        if slots is None:
+            self._by_name[name] = slot
+        elif isinstance(slots, int):
+            self._by_name[name] = {slots: None, slot: None}
+        else:
+            slots[slot] = None
+
+    def _remove_name(self, name: str, slot: int) -> None:
+        slots = self._by_name[name]
+        if isinstance(slots, int):
+            del self._by_name[name]
+            return
+
+        del slots[slot]
+        if len(slots) == 1:
+            self._by_name[name] = next(iter(slots))
+
+    def _find_row(self, file_id: str) -> Optional[int]:
+        directory, name = os.path.split(file_id)
+        directory_id = self._directory_ids.get(directory)
+        if directory_id is None:
+            return None
+        return self._by_parent.get(directory_id, {}).get(name)
+
+    def _file_id(self, slot: int) -> str:
+        directory = self._directories[self._directory[slot]]
+        name = self._names[slot]
+        return os.path.join(directory, name) if directory else name
+
+    @staticmethod
+    def _extension(name: str) -> str:
+        return os.path.splitext(name)[1].lower()
@@ -0,0 +1,410 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from concurrent.futures import as_completed
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from src.quilt.hashing import DEFAULT_HASH_WORKERS, QuiltContentHashStore
+
+DOCUMENTS_FILE_NAME = '.quilt-documents.db'
+DOCUMENTS_SCHEMA_VERSION = 2
+EXTRACTION_KINDS = ('markdown', 'pdf')
+
+_FRONT_MATTER_PATTERN = re.compile(r'\A---\s*\n(.*?)\n(?:---|\.\.\.)\s*(?:\n|\Z)', re.DOTALL)
+_HEADING_PATTERN = re.compile(r'^#\s+(.+?)\s*#*\s*$', re.MULTILINE)
+_TERM_PATTERN = re.compile(r'[^\W_]+')
+_DOCUMENT_COLUMNS = 'd.content_hash, d.kind, d.text, d.page_count, d.title, d.author'
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QuiltDocument:
+    """Text and metadata extracted from a workspace file."""
+    content_hash: str
+    kind: str
+    text: str
+    page_count: Optional[int] = None
+    title: Optional[str] = None
+    author: Optional[str] = None
+
+
+@dataclass
+class QuiltExtractionStats:
+    """Outcome of an extraction run."""
+    total: int = 0
+    cached: int = 0
+    extracted: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def processed(self) -> int:
+        return self.cached + self.extracted + self.failed
+
+    @property
+    def files_per_second(self) -> float:
+        return self.processed / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def fold_term(term: str) -> str:
+    """Lower-case a term and strip its diacritics, like the search index tokenizer does."""
+    term = term.lower()
+    if term.isascii():
+        return term
+    decomposed = unicodedata.normalize('NFKD', term)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+def index_terms(text: str) -> set:
+    """Return the distinct, folded terms of a text."""
+    return {fold_term(term) for term in set(_TERM_PATTERN.findall(text))}
+
+def extract_markdown(path: str) -> Tuple[str, Optional[int], Optional[str], Optional[str]]:
+    with open(path, 'r', encoding='utf-8', errors='replace') as file:
+        text = file.read()
+
+    title = author = None
+    front_matter = _FRONT_MATTER_PATTERN.match(text)
+    if front_matter:
+        import yaml
+
+        try:
+            metadata = yaml.safe_load(front_matter.group(1))
+        except yaml.YAMLError:
+            metadata = None
+        if isinstance(metadata, dict):
+            title = metadata.get('title')
+            author = metadata.get('author')
+        text = text[front_matter.end():]
+
+    if not title:
+        heading = _HEADING_PATTERN.search(text)
+        title = heading.group(1) if heading else None
+
+    return text, None, str(title) if title else None, str(author) if author else None
+
+def extract_pdf(path: str) -> Tuple[str, Optional[int], Optional[str], Optional[str]]:
+    # QtPdf works without a QApplication, so it is safe in worker processes
+    from PySide6.QtPdf import QPdfDocument
+
+    document = QPdfDocument()
+    error = document.load(path)
+    if error != QPdfDocument.Error.None_:
+        raise ValueError(f"Cannot open PDF: {error.name}")
+
+    page_count = document.pageCount()
+    text = '\f'.join(document.getAllText(page).text() for page in range(page_count))
+    title = document.metaData(QPdfDocument.MetaDataField.Title) or None
+    author = document.metaData(QPdfDocument.MetaDataField.Author) or None
+    document.close()
+
+    return text, page_count, title, author
+
+def extract_document(path: str, kind: str, digest: str) -> QuiltDocument:
+    """Extract one file. Runs in the worker processes of QuiltExtractionPipeline."""
+    extract = extract_pdf if kind == 'pdf' else extract_markdown
+    text, page_count, title, author = extract(path)
+    return QuiltDocument(digest, kind, text, page_count, title, author)
+
+
+class QuiltDocumentStore():
+    """Persistent store of extracted documents, keyed by content hash.
+
+    Lives next to the workspace index. `files` remembers the hash of every
+    file together with the size and mtime it had when it was hashed, so
+    unchanged files are neither hashed nor extracted again. Renamed or copied
+    files map to the document that is already stored for their contents.
+
+    Documents are also indexed in the `search` FTS5 table, kept in sync in
+    the same transactions, see QuiltSearchIndex. `search_terms` lists every
+    term ever indexed, so prefixes can be expanded without reading postings.
+    """
+
+    def __init__(self, workspace_dir: str, store_path: Optional[str] = None):
+        self.workspace_dir = workspace_dir
+        self.store_path = store_path or os.path.join(workspace_dir, DOCUMENTS_FILE_NAME)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.store_path, check_same_thread=False)
+        self._create_schema()
+
+    def _create_schema(self) -> None:
+        self._connection.execute('PRAGMA journal_mode = WAL')
+
+        with self._lock, self._connection:
+            version = self._connection.execute('PRAGMA user_version').fetchone()[0]
+            if version != DOCUMENTS_SCHEMA_VERSION:
+                self._connection.execute('DROP TABLE IF EXISTS search')
+                self._connection.execute('DROP TABLE IF EXISTS search_terms')
+                self._connection.execute('DROP TABLE IF EXISTS files')
+                self._connection.execute('DROP TABLE IF EXISTS documents')
+
+            # An explicit integer key, so the search index keeps pointing at the right rows after a VACUUM
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS documents ('
+                'id INTEGER PRIMARY KEY, content_hash TEXT NOT NULL UNIQUE, kind TEXT NOT NULL, '
+                'text TEXT NOT NULL, page_count INTEGER, title TEXT, author TEXT)'
+            )
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS files ('
+                'path TEXT PRIMARY KEY, size INTEGER NOT NULL, last_modified REAL NOT NULL, '
+                'content_hash TEXT NOT NULL)'
+            )
+            self._connection.execute('CREATE INDEX IF NOT EXISTS files_content_hash ON files (content_hash)')
+
+            # Full-text index over the documents table, with positions for phrase queries and snippets.
+            # Short prefixes are indexed too, the word being typed is searched as a prefix.
+            self._connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5("
+                "title, text, content='documents', content_rowid='id', "
+                "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+            self._connection.execute('CREATE TABLE IF NOT EXISTS search_terms (term TEXT PRIMARY KEY) WITHOUT ROWID')
+            self._connection.execute(f'PRAGMA user_version = {DOCUMENTS_SCHEMA_VERSION}')
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def files(self) -> dict:
+        """Return {file_id: (size, last_modified, content_hash)} for every hashed file."""
+        with self._lock:
+            return {row[0]: row[1:] for row in self._connection.execute('SELECT * FROM files')}
+
+    def has_document(self, digest: str) -> bool:
+        with self._lock:
+            return self._connection.execute(
+                'SELECT 1 FROM documents WHERE content_hash = ?', (digest,)
+            ).fetchone() is not None
+
+    def content_hashes(self) -> set:
+        """Return the content hash of every stored document."""
+        with self._lock:
+            return {row[0] for row in self._connection.execute('SELECT content_hash FROM documents')}
+
+    def text(self, digest: str) -> Optional[str]:
+        """Return the extracted text of the contents with the given hash."""
+        with self._lock:
+            row = self._connection.execute('SELECT text FROM documents WHERE content_hash = ?', (digest,)).fetchone()
+        return row[0] if row else None
+
+    def paths(self, digest: str) -> List[str]:
+        """Return the workspace files with the given contents."""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT path FROM files WHERE content_hash = ? ORDER BY path', (digest,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def document(self, file_id: str) -> Optional[QuiltDocument]:
+        """Return the extracted document of a workspace file."""
+        with self._lock:
+            row = self._connection.execute(
+                f'SELECT {_DOCUMENT_COLUMNS} FROM files f JOIN documents d ON d.content_hash = f.content_hash WHERE f.path = ?',
+                (file_id,)
+            ).fetchone()
+        return QuiltDocument(*row) if row else None
+
+    def documents(self) -> List[Tuple[str, QuiltDocument]]:
+        """Return (file_id, document) pairs for every file with extracted contents."""
+        with self._lock:
+            rows = self._connection.execute(
+                f'SELECT f.path, {_DOCUMENT_COLUMNS} FROM files f JOIN documents d ON d.content_hash = f.content_hash ORDER BY f.path'
+            ).fetchall()
+        return [(row[0], QuiltDocument(*row[1:])) for row in rows]
+
+    def store(self, files: Iterable[Tuple[str, int, float, str]], documents: Iterable[QuiltDocument] = ()) -> None:
+        """Record (file_id, size, last_modified, content_hash) rows and newly extracted documents."""
+        with self._lock, self._connection:
+            for document in documents:
+                # Equal hashes mean equal contents, a document that is already stored stays as it is
+                cursor = self._connection.execute(
+                    'INSERT OR IGNORE INTO documents (content_hash, kind, text, page_count, title, author) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (document.content_hash, document.kind, document.text, document.page_count,
+                     document.title, document.author)
+                )
+                if cursor.rowcount:
+                    self._connection.execute(
+                        'INSERT INTO search (rowid, title, text) VALUES (?, ?, ?)',
+                        (cursor.lastrowid, document.title, document.text)
+                    )
+                    self._connection.executemany(
+                        'INSERT OR IGNORE INTO search_terms VALUES (?)',
+                        [(term,) for term in index_terms(f'{document.title or ""} {document.text}')]
+                    )
+            self._connection.executemany('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)', files)
+
+    def remove(self, file_ids: Iterable[str]) -> None:
+        """Forget files, the documents are kept until `prune`."""
+        with self._lock, self._connection:
+            self._connection.executemany('DELETE FROM files WHERE path = ?', [(file_id,) for file_id in file_ids])
+
+    def prune(self) -> int:
+        """Delete documents no file refers to anymore, returns how many."""
+        with self._lock, self._connection:
+            # External content tables are told which rows go away, with the values they were indexed with
+            self._connection.execute(
+                "INSERT INTO search (search, rowid, title, text) "
+                "SELECT 'delete', id, title, text FROM documents "
+                "WHERE content_hash NOT IN (SELECT content_hash FROM files)"
+            )
+            return self._connection.execute(
+                'DELETE FROM documents WHERE content_hash NOT IN (SELECT content_hash FROM files)'
+            ).rowcount
+
+
+class QuiltExtractionPipeline():
+    """Extracts text, page count, title and author of the workspace documents.
+
+    Files whose size and mtime match the store are skipped outright. The rest
+    are looked up in the workspace's content hashes, which only reads files
+    that are new or modified; contents that were extracted before, under this
+    or another name, are only linked. Everything else is extracted on the
+    process lane of the job runtime, whose size sets the extraction concurrency,
+    and stored in batches as results complete, in whatever order the workers
+    finish. Each result is also handed to `result_callback`. Only hashing runs
+    on threads of its own, `hash_workers` of them.
+
+    Works on index rows rather than the live entry store, so it can run on a
+    background thread while the GUI thread applies changes.
+    """
+
+    def __init__(self, workspace, store: Optional[QuiltDocumentStore] = None,
+                 hash_workers: int = DEFAULT_HASH_WORKERS, batch_size: int = 64, runtime=None,
+                 hashes: Optional[QuiltContentHashStore] = None):
+        self.workspace = workspace
+        self.store = store or workspace.documents
+        self.hashes = hashes or workspace.hashes
+        self.hash_workers = hash_workers
+        self.batch_size = batch_size
+        self.runtime = runtime
+
+    def run(self, rows: Optional[Iterable[tuple]] = None,
+            result_callback: Optional[Callable[[str, QuiltDocument], None]] = None,
+            progress_callback: Optional[Callable[[QuiltExtractionStats], None]] = None,
+            cancelled: Optional[Callable[[], bool]] = None) -> QuiltExtractionStats:
+        """Extract the given index rows, by default every Markdown and PDF file in the workspace."""
+        started = time.perf_counter()
+        stats = QuiltExtractionStats()
+
+        full_run = rows is None
+        if full_run:
+            rows = self.workspace.index.entries()
+        rows = [row for row in rows if row[3] in EXTRACTION_KINDS]
+        stats.total = len(rows)
+
+        # Unchanged files need no work at all
+        known = self.store.files()
+        changed = []
+        for row in rows:
+            stored = known.get(row[0])
+            if stored and stored[:2] == (row[4], row[5]):
+                stats.cached += 1
+            else:
+                changed.append(row)
+
+        if full_run:
+            # Drop files that left the workspace
+            removed = known.keys() - {row[0] for row in rows}
+            if removed:
+                self.store.remove(removed)
+
+        def report() -> None:
+            stats.elapsed = time.perf_counter() - started
+            if progress_callback:
+                progress_callback(stats)
+
+        files = []
+        pending = {}
+        hashes = self.hashes.content_hashes(
+            [(row[0], row[4], row[5]) for row in changed], self.hash_workers, cancelled
+        )
+        for file_id, _, _, kind, size, last_modified in changed:
+            digest = hashes.get(file_id)
+            if digest is None:
+                # Unreadable, or the run was cancelled before it was hashed
+                if not (cancelled and cancelled()):
+                    stats.failed += 1
+                continue
+
+            file_row = (file_id, size, last_modified, digest)
+            if self.store.has_document(digest):
+                # Same contents as a document extracted before
+                files.append(file_row)
+                stats.cached += 1
+            else:
+                pending.setdefault(digest, (kind, []))[1].append(file_row)
+
+        if files:
+            self.store.store(files)
+        report()
+
+        if pending and not (cancelled and cancelled()):
+            self._extract(pending, stats, result_callback, report, cancelled)
+
+        if full_run and not (cancelled and cancelled()):
+            # Old versions of changed files and contents of removed ones
+            self.store.prune()
+            self.hashes.prune(row[0] for row in rows)
+
+        stats.elapsed = time.perf_counter() - started
+        return stats
+
+    def _extract(self, pending: dict, stats: QuiltExtractionStats, result_callback, report, cancelled) -> None:
+        files = []
+        documents = []
+
+        def flush() -> None:
+            self.store.store(files, documents)
+            files.clear()
+            documents.clear()
+            report()
+
+        from src.quilt.jobs import LANE_PROCESS, PRIORITY_BACKGROUND, job_runtime
+
+        runtime = self.runtime or job_runtime()
+
+        # One untracked job per document, the same contents are extracted once however many runs ask for them
+        jobs = {}
+        for digest, (kind, file_rows) in pending.items():
+            job = runtime.submit(
+                f'Extracting {file_rows[0][0]}', extract_document, self._absolute(file_rows[0][0]), kind, digest,
+                key=('extract', digest), priority=PRIORITY_BACKGROUND, lane=LANE_PROCESS, tracked=False
+            )
+            jobs[job.future] = (job, file_rows)
+
+        for future in as_completed(jobs):
+            file_rows = jobs[future][1]
+            if cancelled and cancelled():
+                for job, _ in jobs.values():
+                    job.cancel()
+                break
+
+            try:
+                document = future.result()
+            except Exception as e:
+                logger.warning("Error extracting %s: %s", file_rows[0][0], e)
+                stats.failed += len(file_rows)
+                continue
+
+            documents.append(document)
+            for file_row in file_rows:
+                files.append(file_row)
+                stats.extracted += 1
+                if result_callback:
+                    result_callback(file_row[0], document)
+
+            if len(documents) >= self.batch_size:
+                flush()
+
+        flush()
+
+    def _absolute(self, file_id: str) -> str:
+        return os.path.join(self.workspace.workspace_dir, file_id)
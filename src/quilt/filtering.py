@@ -0,0 +1,282 @@
+import os
+import re
+import threading
+import time
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+SORT_NAME = 'name'
+SORT_SIZE = 'size'
+SORT_MODIFIED = 'modified'
+SORT_KEYS = (SORT_NAME, SORT_SIZE, SORT_MODIFIED)
+
+# Name matching checks for cancellation this often
+FILTER_CHUNK_SIZE = 20000
+
+_SIZE_UNITS = {'': 1, 'b': 1, 'k': 1024, 'kb': 1024, 'm': 1024 ** 2, 'mb': 1024 ** 2, 'g': 1024 ** 3, 'gb': 1024 ** 3}
+_SIZE_PATTERN = re.compile(r'(?:size)?([<>])(\d+(?:\.\d+)?)([kmg]?b?)$')
+_DATE_PATTERN = re.compile(r'(after|before):(\d{4}-\d{2}-\d{2})$')
+
+
+@dataclass(frozen=True)
+class QuiltTreeFilter:
+    """What the navigation tree is narrowed to.
+
+    Parsed from what the user types in the filter field:
+
+    - `.pdf` or `ext:pdf` keeps files with one of the given extensions
+    - `>2mb`, `<500kb` (or `size>2mb`) bound the file size
+    - `after:2024-01-31`, `before:2024-03-01` bound the last modification day
+    - any other word must occur in the file name, case-insensitively
+    """
+    terms: Tuple[str, ...] = ()
+    extensions: FrozenSet[str] = frozenset()
+    min_size: Optional[int] = None
+    max_size: Optional[int] = None
+    modified_after: Optional[float] = None
+    modified_before: Optional[float] = None
+
+    @classmethod
+    def parse(cls, text: str) -> 'QuiltTreeFilter':
+        terms = []
+        extensions = set()
+        min_size = max_size = modified_after = modified_before = None
+
+        for word in text.casefold().split():
+            size = _SIZE_PATTERN.match(word)
+            date = _DATE_PATTERN.match(word)
+            if word.startswith('ext:') and len(word) > 4:
+                extensions.add('.' + word[4:].lstrip('.'))
+            elif word.startswith('.') and len(word) > 1 and '.' not in word[1:]:
+                extensions.add(word)
+            elif size:
+                bound = int(float(size.group(2)) * _SIZE_UNITS[size.group(3)])
+                if size.group(1) == '>':
+                    min_size = bound if min_size is None else max(min_size, bound)
+                else:
+                    max_size = bound if max_size is None else min(max_size, bound)
+            elif date:
+                try:
+                    day = datetime.strptime(date.group(2), '%Y-%m-%d').timestamp()
+                except ValueError:
+                    terms.append(word)
+                    continue
+                if date.group(1) == 'after':
+                    modified_after = day
+                else:
+                    modified_before = day
+            else:
+                terms.append(word)
+
+        return cls(tuple(dict.fromkeys(terms)), frozenset(extensions), min_size, max_size,
+                   modified_after, modified_before)
+
+    def is_empty(self) -> bool:
+        return self == QuiltTreeFilter()
+
+    def narrows(self, other: 'QuiltTreeFilter') -> bool:
+        """True if everything this filter keeps is also kept by `other`, so its results can be filtered further."""
+        def tighter(bound, other_bound, at_least: bool) -> bool:
+            if other_bound is None:
+                return True
+            if bound is None:
+                return False
+            return bound >= other_bound if at_least else bound <= other_bound
+
+        return (
+            all(any(term in own for own in self.terms) for term in other.terms)
+            and (not other.extensions or bool(self.extensions and self.extensions <= other.extensions))
+            and tighter(self.min_size, other.min_size, True)
+            and tighter(self.max_size, other.max_size, False)
+            and tighter(self.modified_after, other.modified_after, True)
+            and tighter(self.modified_before, other.modified_before, False)
+        )
+
+
+@dataclass
+class QuiltFilterResult:
+    """The navigation tree as a filter and sort order leave it.
+
+    `children` maps every folder that stays visible to its visible subfolder
+    and file names, in display order. Folders that are not listed are hidden.
+    `reused` is set when the result was narrowed down from the previous one
+    instead of filtering the whole workspace.
+    """
+    filter: QuiltTreeFilter
+    sort_key: str = SORT_NAME
+    descending: bool = False
+    children: Dict[str, Tuple[List[str], List[str]]] = field(default_factory=dict)
+    matches: int = 0
+    total: int = 0
+    reused: bool = False
+    elapsed: float = 0.0
+
+    def is_default(self) -> bool:
+        return self.filter.is_empty() and self.sort_key == SORT_NAME and not self.descending
+
+
+class QuiltTreeFilterEngine():
+    """Filters and sorts the workspace files off the GUI thread.
+
+    Works on a column snapshot of the workspace index, taken on first use and
+    again after `invalidate`. Sizes, mtimes and extensions are compared as
+    NumPy arrays, names with plain substring tests. While the user types, a
+    filter usually narrows the previous one; it is then applied to the
+    previous matches only, which are already in the requested order.
+    """
+
+    def __init__(self, workspace):
+        self.workspace = workspace
+
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._snapshot = None
+        self._previous = None
+
+    def invalidate(self) -> None:
+        """Take a new snapshot on the next run, the workspace changed."""
+        with self._lock:
+            self._generation += 1
+
+    def run(self, tree_filter: QuiltTreeFilter, sort_key: str = SORT_NAME, descending: bool = False,
+            cancelled: Optional[Callable[[], bool]] = None) -> Optional[QuiltFilterResult]:
+        """Return the tree for a filter and sort order, or None if cancelled."""
+        # Only needed once the tree is filtered or sorted
+        import numpy as np
+
+        started = time.perf_counter()
+        with self._lock:
+            generation = self._generation
+            snapshot = self._snapshot
+            previous = self._previous
+
+        if snapshot is None or snapshot.generation != generation:
+            snapshot = _QuiltFilterSnapshot(self.workspace.index, generation)
+            previous = None
+
+        reused = (previous is not None and previous[1:3] == (sort_key, descending)
+                  and tree_filter.narrows(previous[0]))
+        candidates = previous[3] if reused else np.arange(len(snapshot.names))
+
+        candidates = snapshot.filter(candidates, tree_filter, cancelled)
+        if candidates is None:
+            return None
+        if not reused:
+            candidates = snapshot.sort(candidates, sort_key, descending)
+
+        children = snapshot.children(candidates, tree_filter.is_empty(), sort_key == SORT_NAME and descending)
+        if cancelled and cancelled():
+            return None
+
+        with self._lock:
+            if self._generation == generation:
+                self._snapshot = snapshot
+                self._previous = (tree_filter, sort_key, descending, candidates)
+
+        return QuiltFilterResult(tree_filter, sort_key, descending, children, len(candidates),
+                                 len(snapshot.names), reused, time.perf_counter() - started)
+
+
+class _QuiltFilterSnapshot():
+    """Columns of the index files, one row per file in path order."""
+
+    def __init__(self, index, generation: int):
+        import numpy as np
+
+        self.generation = generation
+        rows = index.entries()
+        self.directories = index.directories()
+
+        self.names = [row[2] for row in rows]
+        self.parents = [row[1] for row in rows]
+        self.folded = [name.casefold() for name in self.names]
+        self.sizes = np.fromiter((row[4] for row in rows), dtype=np.int64, count=len(rows))
+        self.mtimes = np.fromiter((row[5] for row in rows), dtype=np.float64, count=len(rows))
+
+        # Extensions as small integer codes, so they compare as an array
+        codes = {}
+        self.extension_codes = codes
+        self.extensions = np.fromiter(
+            (codes.setdefault(os.path.splitext(name)[1], len(codes)) for name in self.folded),
+            dtype=np.int32, count=len(rows)
+        )
+
+        self._name_ranks = None
+
+    def filter(self, candidates, tree_filter: QuiltTreeFilter, cancelled: Optional[Callable[[], bool]]):
+        import numpy as np
+
+        mask = np.ones(len(candidates), dtype=bool)
+        if tree_filter.extensions:
+            wanted = [self.extension_codes[extension] for extension in tree_filter.extensions
+                      if extension in self.extension_codes]
+            mask &= np.isin(self.extensions[candidates], wanted)
+        if tree_filter.min_size is not None:
+            mask &= self.sizes[candidates] >= tree_filter.min_size
+        if tree_filter.max_size is not None:
+            mask &= self.sizes[candidates] <= tree_filter.max_size
+        if tree_filter.modified_after is not None:
+            mask &= self.mtimes[candidates] >= tree_filter.modified_after
+        if tree_filter.modified_before is not None:
+            mask &= self.mtimes[candidates] < tree_filter.modified_before
+        candidates = candidates[mask]
+
+        if not tree_filter.terms:
+            return candidates
+
+        folded = self.folded
+        terms = tree_filter.terms
+        kept = []
+        for start in range(0, len(candidates), FILTER_CHUNK_SIZE):
+            if cancelled and cancelled():
+                return None
+            kept.extend(i for i in candidates[start:start + FILTER_CHUNK_SIZE].tolist()
+                        if all(term in folded[i] for term in terms))
+        return np.array(kept, dtype=candidates.dtype)
+
+    def sort(self, candidates, sort_key: str, descending: bool):
+        import numpy as np
+
+        # Names break ties, in path order that is the order of the folder listing
+        if self._name_ranks is None:
+            order = sorted(range(len(self.folded)), key=self.folded.__getitem__)
+            self._name_ranks = np.empty(len(order), dtype=np.int64)
+            self._name_ranks[order] = np.arange(len(order))
+
+        ranks = self._name_ranks[candidates]
+        if sort_key == SORT_SIZE:
+            order = np.lexsort((ranks, self.sizes[candidates]))
+        elif sort_key == SORT_MODIFIED:
+            order = np.lexsort((ranks, self.mtimes[candidates]))
+        else:
+            order = np.argsort(ranks, kind='stable')
+        return candidates[order[::-1] if descending else order]
+
+    def children(self, candidates, everything: bool, folders_descending: bool) -> Dict[str, Tuple[List[str], List[str]]]:
+        files = {}
+        names, parents = self.names, self.parents
+        for i in candidates.tolist():
+            files.setdefault(parents[i], []).append(names[i])
+
+        # Without a filter every folder shows, otherwise only those leading to a match
+        visible = set(self.directories) if everything else set()
+        for directory in list(files):
+            while directory not in visible:
+                visible.add(directory)
+                if not directory:
+                    break
+                directory = os.path.dirname(directory)
+        visible.add('')
+
+        folders = {directory: [] for directory in visible}
+        for directory in visible:
+            if directory:
+                parent, name = os.path.split(directory)
+                folders[parent].append(name)
+
+        return {
+            directory: (sorted(names, key=str.casefold, reverse=folders_descending), files.get(directory, []))
+            for directory, names in folders.items()
+        }
@@ -0,0 +1,197 @@
+import hashlib
+import mmap
+import os
+import sqlite3
+import threading
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+HASHES_FILE_NAME = '.quilt-hashes.db'
+HASHES_SCHEMA_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024
+DEFAULT_HASH_WORKERS = 8
+
+# Smaller files are read in one go, mapping them costs more than it saves
+MMAP_THRESHOLD = 4 * HASH_CHUNK_SIZE
+
+
+def content_hash(path: str) -> str:
+    """Return the BLAKE2b digest of a file's contents.
+
+    Large files are memory-mapped and hashed in chunks straight from the page
+    cache, without copying them into Python. hashlib releases the GIL while it
+    hashes, so several files hash in parallel on a thread pool.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        if size < MMAP_THRESHOLD:
+            digest.update(file.read())
+            return digest.hexdigest()
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view:
+                for start in range(0, size, HASH_CHUNK_SIZE):
+                    digest.update(view[start:start + HASH_CHUNK_SIZE])
+    return digest.hexdigest()
+
+
+class QuiltContentHashStore():
+    """Content hashes of the workspace files, stored next to the .quilt file.
+
+    A hash is reused as long as the file's size and mtime are unchanged, so
+    unchanged files are never read twice. A file that was renamed or moved
+    keeps its inode, size and mtime, so its new path is matched to the hash
+    of the old one after a single stat rather than being read again. Only
+    files that are new or modified are hashed, on a thread pool and on
+    demand.
+
+    The store has a database of its own, so hashing never waits for a scan
+    that is writing the workspace index.
+    """
+
+    def __init__(self, workspace_dir: str, store_path: Optional[str] = None):
+        self.workspace_dir = workspace_dir
+        self.store_path = store_path or os.path.join(workspace_dir, HASHES_FILE_NAME)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.store_path, check_same_thread=False)
+        self._create_schema()
+
+        # Loaded on first use: path -> (size, last_modified, inode, hash) and (inode, size, last_modified) -> hash
+        self._entries = None
+        self._identities = None
+
+    def _create_schema(self) -> None:
+        self._connection.execute('PRAGMA journal_mode = WAL')
+
+        with self._lock, self._connection:
+            version = self._connection.execute('PRAGMA user_version').fetchone()[0]
+            if version != HASHES_SCHEMA_VERSION:
+                self._connection.execute('DROP TABLE IF EXISTS hashes')
+
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS hashes ('
+                'path TEXT PRIMARY KEY, size INTEGER NOT NULL, last_modified REAL NOT NULL, '
+                'inode INTEGER NOT NULL, content_hash TEXT NOT NULL)'
+            )
+            self._connection.execute(f'PRAGMA user_version = {HASHES_SCHEMA_VERSION}')
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def _load(self) -> None:
+        # Called with the lock held
+        if self._entries is not None:
+            return
+
+        self._entries = {}
+        self._identities = {}
+        for path, size, last_modified, inode, digest in self._connection.execute('SELECT * FROM hashes'):
+            self._entries[path] = (size, last_modified, inode, digest)
+            self._identities[(inode, size, last_modified)] = digest
+
+    def lookup(self, file_id: str, size: int, last_modified: float) -> Optional[str]:
+        """Return the stored hash of a file if its size and mtime still match, without touching the disk."""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(file_id)
+        if entry is not None and entry[:2] == (size, last_modified):
+            return entry[3]
+        return None
+
+    def content_hash(self, file_id: str, size: int, last_modified: float) -> Optional[str]:
+        """Return the hash of one file, hashing it only if needed. None if it cannot be read."""
+        return self.content_hashes([(file_id, size, last_modified)], workers=1).get(file_id)
+
+    def content_hashes(self, files: Iterable[Tuple[str, int, float]], workers: int = DEFAULT_HASH_WORKERS,
+                       cancelled: Optional[Callable[[], bool]] = None) -> Dict[str, str]:
+        """Return {file_id: hash} for (file_id, size, last_modified) triples of the index.
+
+        Files that cannot be read are left out, the error is printed.
+        """
+        hashes = {}
+        stored = []
+        pending = []
+
+        with self._lock:
+            self._load()
+            for file_id, size, last_modified in files:
+                entry = self._entries.get(file_id)
+                if entry is not None and entry[:2] == (size, last_modified):
+                    hashes[file_id] = entry[3]
+                else:
+                    pending.append((file_id, size, last_modified))
+
+        # Renamed and moved files are recognized by their inode
+        unknown = []
+        for file_id, size, last_modified in pending:
+            try:
+                inode = os.stat(self._absolute(file_id)).st_ino
+            except OSError as e:
+                print(f"Error hashing {file_id}: {e}")
+                continue
+
+            with self._lock:
+                digest = self._identities.get((inode, size, last_modified))
+            if digest is not None:
+                hashes[file_id] = digest
+                stored.append((file_id, size, last_modified, inode, digest))
+            else:
+                unknown.append((file_id, size, last_modified, inode))
+
+        if unknown and not (cancelled and cancelled()):
+            with ThreadPoolExecutor(max_workers=max(min(workers, len(unknown)), 1),
+                                    thread_name_prefix='quilt-hash') as executor:
+                futures = {executor.submit(content_hash, self._absolute(file[0])): file for file in unknown}
+                for future in as_completed(futures):
+                    file_id, size, last_modified, inode = futures[future]
+                    if cancelled and cancelled():
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        break
+
+                    try:
+                        digest = future.result()
+                    except OSError as e:
+                        print(f"Error hashing {file_id}: {e}")
+                        continue
+
+                    hashes[file_id] = digest
+                    stored.append((file_id, size, last_modified, inode, digest))
+
+        if stored:
+            self._store(stored)
+        return hashes
+
+    def prune(self, file_ids: Iterable[str]) -> int:
+        """Forget the hashes of files other than `file_ids`, once renames had a chance to reuse them."""
+        keep = set(file_ids)
+        with self._lock:
+            self._load()
+            removed = [path for path in self._entries if path not in keep]
+            if not removed:
+                return 0
+
+            for path in removed:
+                size, last_modified, inode, _ = self._entries.pop(path)
+                self._identities.pop((inode, size, last_modified), None)
+            with self._connection:
+                self._connection.executemany('DELETE FROM hashes WHERE path = ?', ((path,) for path in removed))
+
+            # Another file may still have the identity of a removed one
+            for size, last_modified, inode, digest in self._entries.values():
+                self._identities.setdefault((inode, size, last_modified), digest)
+        return len(removed)
+
+    def _store(self, rows: list) -> None:
+        with self._lock:
+            for file_id, size, last_modified, inode, digest in rows:
+                self._entries[file_id] = (size, last_modified, inode, digest)
+                self._identities[(inode, size, last_modified)] = digest
+            with self._connection:
+                self._connection.executemany('INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?)', rows)
+
+    def _absolute(self, file_id: str) -> str:
+        return os.path.join(self.workspace_dir, file_id)
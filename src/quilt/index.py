@@ -0,0 +1,304 @@
+import os
+import sqlite3
+import threading
+import time
+
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.quilt.scanner import DEFAULT_SCAN_WORKERS, QuiltScanProgress, QuiltWorkspaceScanner
+
+INDEX_FILE_NAME = '.quilt-index.db'
+INDEX_SCHEMA_VERSION = 1
+INDEX_BATCH_SIZE = 2000
+INDEX_BATCH_INTERVAL = 0.25
+
+
+@dataclass
+class QuiltWorkspaceChanges:
+    """Index rows that were added, modified, removed or renamed by an incremental refresh."""
+    added: list = field(default_factory=list)
+    modified: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+    # (old_row, new_row) pairs
+    renamed: list = field(default_factory=list)
+    added_directories: List[str] = field(default_factory=list)
+    removed_directories: List[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return any((self.added, self.modified, self.removed, self.renamed,
+                    self.added_directories, self.removed_directories))
+
+    def __len__(self) -> int:
+        return len(self.added) + len(self.modified) + len(self.removed) + len(self.renamed)
+
+    def pair_renames(self) -> None:
+        """Turn removed/added pairs with identical kind, size and mtime into renames."""
+        candidates = {}
+        for row in self.removed:
+            candidates.setdefault((row[3], row[4], row[5]), []).append(row)
+
+        added = []
+        for row in self.added:
+            matches = candidates.get((row[3], row[4], row[5]))
+            if matches:
+                self.renamed.append((matches.pop(), row))
+            else:
+                added.append(row)
+
+        renamed_from = {old_row[0] for old_row, _ in self.renamed}
+        self.removed = [row for row in self.removed if row[0] not in renamed_from]
+        self.added = added
+
+
+class QuiltWorkspaceIndex():
+    """Persistent SQLite index of the tracked files in a workspace.
+
+    The index lives next to the .quilt file. Every directory is stored with the
+    mtime it had when it was last listed; on refresh only directories whose mtime
+    changed are listed and stat'ed again, all others are served from the index.
+    Writing a file in place leaves the mtime of its directory alone, such files
+    are found per file with `modified_directories`.
+    """
+
+    def __init__(self, workspace_dir: str, index_path: Optional[str] = None):
+        self.workspace_dir = workspace_dir
+        self.index_path = index_path or os.path.join(workspace_dir, INDEX_FILE_NAME)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.index_path, check_same_thread=False)
+        self._scanner = QuiltWorkspaceScanner(workspace_dir)
+        self._create_schema()
+
+    def _create_schema(self) -> None:
+        # Keep the journal in long-lived files, so writes do not touch the workspace root's mtime
+        self._connection.execute('PRAGMA journal_mode = WAL')
+
+        with self._lock, self._connection:
+            version = self._connection.execute('PRAGMA user_version').fetchone()[0]
+            if version != INDEX_SCHEMA_VERSION:
+                # Outdated or foreign index, start from scratch
+                self._connection.execute('DROP TABLE IF EXISTS files')
+                self._connection.execute('DROP TABLE IF EXISTS directories')
+
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS directories ('
+                'path TEXT PRIMARY KEY, parent TEXT, mtime REAL NOT NULL)'
+            )
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS files ('
+                'path TEXT PRIMARY KEY, directory TEXT NOT NULL, name TEXT NOT NULL, '
+                'kind TEXT NOT NULL, size INTEGER NOT NULL, last_modified REAL NOT NULL)'
+            )
+            self._connection.execute('CREATE INDEX IF NOT EXISTS files_directory ON files (directory)')
+            self._connection.execute(f'PRAGMA user_version = {INDEX_SCHEMA_VERSION}')
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def refresh(self, workers: int = DEFAULT_SCAN_WORKERS,
+                progress_callback: Optional[Callable[[QuiltScanProgress], None]] = None,
+                batch_callback: Optional[Callable[[QuiltWorkspaceChanges], None]] = None,
+                cancelled: Optional[Callable[[], bool]] = None) -> Tuple[int, int]:
+        """Bring the index up to date with the file system.
+
+        Changes relative to the previous contents of the index are handed to
+        `batch_callback` in batches while the scan runs. A cancelled refresh keeps
+        the directories it already listed and leaves the rest untouched.
+
+        Returns the number of directories that were visited and the number that
+        had to be listed again because their mtime changed.
+        """
+        with self._lock, self._connection:
+            cached_mtimes, cached_children = self._load_directories()
+
+            def reuse(directory: str, mtime: float) -> Optional[List[str]]:
+                # Unchanged since the last listing, descend without listing
+                if cached_mtimes.get(directory) == mtime:
+                    return cached_children.get(directory, [])
+                return None
+
+            visited = set()
+            rescanned = 0
+            batch = QuiltWorkspaceChanges()
+            last_batch = time.perf_counter()
+
+            scanner = QuiltWorkspaceScanner(self.workspace_dir, workers, progress_callback)
+            for listing in scanner.scan(reuse, cancelled):
+                visited.add(listing.directory)
+                if listing.reused:
+                    continue
+
+                if listing.directory not in cached_mtimes:
+                    batch.added_directories.append(listing.directory)
+                self._diff_directory(listing.directory, listing.files, batch)
+                self._store_directory(listing.directory, listing.mtime, listing.files)
+                rescanned += 1
+
+                now = time.perf_counter()
+                if batch_callback and (len(batch) >= INDEX_BATCH_SIZE or now - last_batch >= INDEX_BATCH_INTERVAL):
+                    batch_callback(batch)
+                    batch = QuiltWorkspaceChanges()
+                    last_batch = now
+
+            if not (cancelled and cancelled()):
+                # Forget about directories that no longer exist
+                for directory in cached_mtimes:
+                    if directory not in visited:
+                        self._delete_subtree(directory, batch)
+
+            if batch_callback and batch:
+                batch_callback(batch)
+
+        return len(visited), rescanned
+
+    def refresh_directories(self, directories: List[str]) -> QuiltWorkspaceChanges:
+        """List the given directories again and return what changed in them.
+
+        New subdirectories are indexed recursively, vanished ones are dropped with
+        everything below them. Directories without changes are not written to.
+        """
+        changes = QuiltWorkspaceChanges()
+        pending = list(dict.fromkeys(directories))
+
+        with self._lock, self._connection:
+            while pending:
+                directory = pending.pop()
+                listing = self._scanner.list_directory(directory)
+                if listing is None:
+                    self._delete_subtree(directory, changes)
+                    continue
+
+                stored_children = {row[0] for row in self._connection.execute(
+                    'SELECT path FROM directories WHERE parent = ?', (directory,)
+                )}
+                listed_children = set(listing.subdirectories)
+                known = self._connection.execute(
+                    'SELECT 1 FROM directories WHERE path = ?', (directory,)
+                ).fetchone() is not None
+
+                changed = self._diff_directory(directory, listing.files, changes)
+
+                new_children = sorted(listed_children - stored_children)
+                for child in stored_children - listed_children:
+                    self._delete_subtree(child, changes)
+                pending.extend(new_children)
+
+                if not known:
+                    changes.added_directories.append(directory)
+                if not known or changed or new_children:
+                    self._store_directory(directory, listing.mtime, listing.files)
+
+        changes.pair_renames()
+        return changes
+
+    def stale_directories(self) -> List[str]:
+        """Return indexed directories whose mtime on disk no longer matches the index."""
+        with self._lock:
+            rows = self._connection.execute('SELECT path, mtime FROM directories').fetchall()
+
+        stale = []
+        for directory, mtime in rows:
+            try:
+                if os.stat(self._absolute(directory)).st_mtime != mtime:
+                    stale.append(directory)
+            except OSError:
+                stale.append(directory)
+
+        return stale
+
+    def modified_directories(self, file_ids: Optional[Iterable[str]] = None) -> List[str]:
+        """Return the directories of indexed files whose size or mtime no longer matches the index.
+
+        Catches files written in place, which leave the mtime of their directory
+        alone and so are found neither by refresh nor by stale_directories.
+        Only the given files are stat'ed, every indexed file if None.
+        """
+        with self._lock:
+            files = self._load_files(file_ids)
+
+        return [directory for directory, rows in files.items() if self._scanner.restat_files(rows) != []]
+
+    def directories(self) -> List[str]:
+        """Return all indexed directories, relative to the workspace."""
+        with self._lock:
+            return [row[0] for row in self._connection.execute('SELECT path FROM directories ORDER BY path')]
+
+    def entries(self, kind: Optional[str] = None) -> list:
+        """Return (file_id, directory, name, kind, size, last_modified) rows for all files, or those of a kind."""
+        with self._lock:
+            if kind is None:
+                return self._connection.execute('SELECT * FROM files ORDER BY path').fetchall()
+
+            return self._connection.execute(
+                'SELECT * FROM files WHERE kind = ? ORDER BY path', (kind,)
+            ).fetchall()
+
+    def _load_directories(self) -> Tuple[Dict[str, float], Dict[str, List[str]]]:
+        mtimes = {}
+        children = {}
+        for path, parent, mtime in self._connection.execute('SELECT path, parent, mtime FROM directories'):
+            mtimes[path] = mtime
+            if parent is not None:
+                children.setdefault(parent, []).append(path)
+
+        return mtimes, children
+
+    def _load_files(self, file_ids: Optional[Iterable[str]] = None) -> Dict[str, list]:
+        if file_ids is None:
+            rows = self._connection.execute('SELECT * FROM files').fetchall()
+        else:
+            file_ids = list(file_ids)
+            rows = []
+            for offset in range(0, len(file_ids), 500):
+                batch = file_ids[offset:offset + 500]
+                rows.extend(self._connection.execute(
+                    f"SELECT * FROM files WHERE path IN ({','.join('?' * len(batch))})", batch
+                ))
+
+        files = {}
+        for row in rows:
+            files.setdefault(row[1], []).append(row)
+
+        return files
+
+    def _diff_directory(self, directory: str, files: list, changes: QuiltWorkspaceChanges) -> bool:
+        stored = {row[0]: row for row in self._connection.execute(
+            'SELECT * FROM files WHERE directory = ?', (directory,)
+        )}
+        listed = {row[0]: row for row in files}
+
+        added = [row for file_id, row in listed.items() if file_id not in stored]
+        removed = [row for file_id, row in stored.items() if file_id not in listed]
+        modified = [row for file_id, row in listed.items() if file_id in stored and stored[file_id][4:] != row[4:]]
+
+        changes.added.extend(added)
+        changes.removed.extend(removed)
+        changes.modified.extend(modified)
+
+        return bool(added or removed or modified)
+
+    def _store_directory(self, directory: str, mtime: float, files: list) -> None:
+        parent = os.path.dirname(directory) if directory else None
+
+        self._connection.execute('DELETE FROM files WHERE directory = ?', (directory,))
+        self._connection.executemany('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)', files)
+        self._connection.execute('INSERT OR REPLACE INTO directories VALUES (?, ?, ?)', (directory, parent, mtime))
+
+    def _absolute(self, directory: str) -> str:
+        return os.path.join(self.workspace_dir, directory) if directory else self.workspace_dir
+
+    def _delete_subtree(self, directory: str, changes: QuiltWorkspaceChanges) -> None:
+        prefix = os.path.join(directory, '')
+        parameters = (directory, len(prefix), prefix)
+
+        changes.removed.extend(self._connection.execute(
+            'SELECT * FROM files WHERE directory = ? OR substr(directory, 1, ?) = ?', parameters
+        ))
+        changes.removed_directories.extend(row[0] for row in self._connection.execute(
+            'SELECT path FROM directories WHERE path = ? OR substr(path, 1, ?) = ?', parameters
+        ))
+
+        self._connection.execute('DELETE FROM files WHERE directory = ? OR substr(directory, 1, ?) = ?', parameters)
+        self._connection.execute('DELETE FROM directories WHERE path = ? OR substr(path, 1, ?) = ?', parameters)
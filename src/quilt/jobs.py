@@ -0,0 +1,337 @@
+import heapq
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Callable, Hashable, List, Optional
+
+from PySide6.QtCore import QCoreApplication, QObject, Signal
+
+LANE_THREAD = 'thread'
+LANE_PROCESS = 'process'
+
+# Lower runs first: work for what is on screen, then what the user asked for, then housekeeping
+PRIORITY_VISIBLE = 0
+PRIORITY_NORMAL = 10
+PRIORITY_BACKGROUND = 20
+
+DEFAULT_THREAD_WORKERS = 4
+DEFAULT_PROCESS_WORKERS = max(min(os.cpu_count() or 1, 8) - 1, 1)
+
+# Seconds of finished jobs the throughput is averaged over
+THROUGHPUT_WINDOW = 30.0
+
+
+class QuiltJobCancelled(Exception):
+    """Raised by QuiltJob.check_cancelled, ends a job as cancelled rather than failed."""
+
+
+class QuiltJob():
+    """A unit of work queued on the QuiltJobRuntime.
+
+    Thread lane functions are called with the job as their first argument,
+    so they can poll `cancelled`, call `check_cancelled` and `report`
+    progress. Process lane functions run in another process and only get
+    their own arguments; they must be picklable module-level functions.
+    `future` completes with the result once the job is done.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FINISHED = 'finished'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    def __init__(self, runtime: 'QuiltJobRuntime', name: str, function: Callable, args: tuple, kwargs: dict,
+                 key: Optional[Hashable], priority: int, lane: str, tracked: bool):
+        self.runtime = runtime
+        self.name = name
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.key = key
+        self.priority = priority
+        self.lane = lane
+        self.tracked = tracked
+
+        self.state = QuiltJob.QUEUED
+        self.progress: Optional[float] = None
+        self.message = ''
+        self.error: Optional[BaseException] = None
+        self.future = Future()
+        self.submitted = time.perf_counter()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+        self._cancelled = threading.Event()
+
+    def __repr__(self) -> str:
+        return f'QuiltJob({self.name!r}, {self.state})'
+
+    def cancel(self) -> None:
+        """Drop the job if it is still queued, otherwise ask it to stop at its next check."""
+        self._cancelled.set()
+        self.runtime._cancel(self)
+
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check_cancelled(self) -> None:
+        if self._cancelled.is_set():
+            raise QuiltJobCancelled()
+
+    def done(self) -> bool:
+        return self.state in (QuiltJob.FINISHED, QuiltJob.FAILED, QuiltJob.CANCELLED)
+
+    def report(self, progress: Optional[float] = None, message: str = '') -> None:
+        """Publish progress, a fraction between 0 and 1 or None when the total is unknown."""
+        self.progress = progress
+        self.message = message
+        if self.tracked:
+            self.runtime.job_progress.emit(self)
+
+
+@dataclass
+class QuiltJobStats:
+    """Snapshot of the runtime for status displays."""
+    queued: int = 0
+    running: int = 0
+    finished: int = 0
+    failed: int = 0
+    cancelled: int = 0
+    throughput: float = 0.0
+
+
+class QuiltJobRuntime(QObject):
+    """Shared background work queue with a thread lane and a process lane.
+
+    Each lane serves its jobs by priority, first come first served within a
+    priority. Jobs with a `key` are deduplicated: submitting a key that is
+    queued or running returns the existing job, and a more urgent priority
+    moves it ahead. The process pool is spawned on the first process job and
+    reused afterwards; its size bounds how many process jobs run at once.
+
+    Tracked jobs announce themselves through `job_started`, `job_progress`
+    and `job_finished`, delivered on the GUI thread. Untracked jobs, such as
+    the many small ones of a batch, only count towards `stats`.
+
+    Not all background work runs here. Running jobs are never preempted, so
+    the PDF view renders its page tiles on its own workers rather than wait
+    behind long jobs. The search and quick-open queries each have a worker
+    where the latest query interrupts the one being answered, the watcher
+    has its own thread, and the scanner and hasher use short-lived I/O pools
+    inside the jobs that call them.
+    """
+    job_started = Signal(object)
+    job_progress = Signal(object)
+    job_finished = Signal(object)
+
+    def __init__(self, thread_workers: int = DEFAULT_THREAD_WORKERS,
+                 process_workers: int = DEFAULT_PROCESS_WORKERS, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.process_workers = process_workers
+
+        self._condition = threading.Condition()
+        self._queues = {LANE_THREAD: [], LANE_PROCESS: []}
+        self._sequence = itertools.count()
+        self._by_key = {}
+        self._running = set()
+        self._finished_times = deque()
+        self._counts = {QuiltJob.FINISHED: 0, QuiltJob.FAILED: 0, QuiltJob.CANCELLED: 0}
+        self._process_pool = None
+        self._stopped = False
+
+        # Process lane workers only hand jobs to the pool and wait, so the pool size bounds the lane
+        self._workers = [
+            threading.Thread(target=self._work, args=(LANE_THREAD,), name=f'quilt-jobs-{worker}', daemon=True)
+            for worker in range(thread_workers)
+        ] + [
+            threading.Thread(target=self._work, args=(LANE_PROCESS,), name=f'quilt-jobs-process-{worker}', daemon=True)
+            for worker in range(process_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, name: str, function: Callable, *args, key: Optional[Hashable] = None,
+               priority: int = PRIORITY_NORMAL, lane: str = LANE_THREAD, tracked: bool = True, **kwargs) -> QuiltJob:
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError("The job runtime is shut down")
+
+            # A cancelled job is on its way out, it does not stand in for a new one
+            existing = self._by_key.get(key) if key is not None else None
+            if existing is not None and not existing.cancelled():
+                if priority < existing.priority and existing.state == QuiltJob.QUEUED:
+                    # The old heap entry goes stale and is skipped
+                    existing.priority = priority
+                    self._push(existing)
+                    self._condition.notify_all()
+                return existing
+
+            job = QuiltJob(self, name, function, args, kwargs, key, priority, lane, tracked)
+            if key is not None:
+                self._by_key[key] = job
+            self._push(job)
+            self._condition.notify_all()
+            return job
+
+    def _push(self, job: QuiltJob) -> None:
+        heapq.heappush(self._queues[job.lane], (job.priority, next(self._sequence), job))
+
+    def stats(self) -> QuiltJobStats:
+        with self._condition:
+            now = time.perf_counter()
+            while self._finished_times and now - self._finished_times[0] > THROUGHPUT_WINDOW:
+                self._finished_times.popleft()
+
+            queued = sum(1 for queue in self._queues.values() for entry in queue if self._is_current(entry))
+            return QuiltJobStats(
+                queued=queued,
+                running=len(self._running),
+                finished=self._counts[QuiltJob.FINISHED],
+                failed=self._counts[QuiltJob.FAILED],
+                cancelled=self._counts[QuiltJob.CANCELLED],
+                throughput=len(self._finished_times) / THROUGHPUT_WINDOW
+            )
+
+    def active_jobs(self) -> List[QuiltJob]:
+        """Return the tracked jobs that are running or queued, running ones first."""
+        with self._condition:
+            queued = sorted((entry for queue in self._queues.values() for entry in queue
+                             if self._is_current(entry) and entry[2].tracked), key=lambda entry: entry[:2])
+            running = sorted((job for job in self._running if job.tracked), key=lambda job: job.started)
+            return running + [entry[2] for entry in queued]
+
+    def shutdown(self) -> None:
+        """Cancel everything and stop the workers, running thread jobs are asked to stop."""
+        with self._condition:
+            self._stopped = True
+            for queue in self._queues.values():
+                for _, _, job in queue:
+                    job._cancelled.set()
+                    job.future.cancel()
+                queue.clear()
+            for job in self._running:
+                job._cancelled.set()
+            self._condition.notify_all()
+
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _is_current(entry: tuple) -> bool:
+        priority, _, job = entry
+        return job.state == QuiltJob.QUEUED and job.priority == priority
+
+    def _next(self, lane: str) -> Optional[QuiltJob]:
+        with self._condition:
+            queue = self._queues[lane]
+            while True:
+                if self._stopped:
+                    return None
+
+                while queue:
+                    entry = heapq.heappop(queue)
+                    if self._is_current(entry):
+                        job = entry[2]
+                        job.state = QuiltJob.RUNNING
+                        job.started = time.perf_counter()
+                        job.future.set_running_or_notify_cancel()
+                        self._running.add(job)
+                        return job
+
+                self._condition.wait()
+
+    def _cancel(self, job: QuiltJob) -> None:
+        with self._condition:
+            if job.state != QuiltJob.QUEUED:
+                return
+            # Its heap entry goes stale and is skipped
+            job.future.cancel()
+            self._finish(job, QuiltJob.CANCELLED)
+
+        if job.tracked:
+            self.job_finished.emit(job)
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._condition:
+            if self._process_pool is None:
+                # Spawned, as forking a process that runs Qt threads is unsafe
+                context = multiprocessing.get_context('spawn')
+                self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers, mp_context=context)
+            return self._process_pool
+
+    def _work(self, lane: str) -> None:
+        while True:
+            job = self._next(lane)
+            if job is None:
+                return
+            if job.tracked:
+                self.job_started.emit(job)
+
+            result = None
+            try:
+                job.check_cancelled()
+                if lane == LANE_THREAD:
+                    result = job.function(job, *job.args, **job.kwargs)
+                else:
+                    result = self._pool().submit(job.function, *job.args, **job.kwargs).result()
+                state = QuiltJob.CANCELLED if job.cancelled() else QuiltJob.FINISHED
+            except QuiltJobCancelled:
+                state = QuiltJob.CANCELLED
+            except BrokenProcessPool as e:
+                # A crashed worker breaks the whole pool, the next process job gets a new one
+                with self._condition:
+                    self._process_pool = None
+                job.error = e
+                state = QuiltJob.FAILED
+            except Exception as e:
+                job.error = e
+                state = QuiltJob.FAILED
+
+            with self._condition:
+                self._running.discard(job)
+                self._finish(job, state)
+
+            if state == QuiltJob.FINISHED:
+                job.future.set_result(result)
+            elif state == QuiltJob.FAILED:
+                job.future.set_exception(job.error)
+            else:
+                job.future.set_exception(QuiltJobCancelled())
+            if job.tracked:
+                self.job_finished.emit(job)
+
+    def _finish(self, job: QuiltJob, state: str) -> None:
+        job.state = state
+        job.finished = time.perf_counter()
+        self._counts[state] += 1
+        if state == QuiltJob.FINISHED:
+            self._finished_times.append(job.finished)
+        if job.key is not None and self._by_key.get(job.key) is job:
+            del self._by_key[job.key]
+
+
+_job_runtime = None
+_job_runtime_lock = threading.Lock()
+
+def job_runtime() -> QuiltJobRuntime:
+    """Return the process-wide job runtime, its signals are delivered on the application thread."""
+    global _job_runtime
+    with _job_runtime_lock:
+        if _job_runtime is None:
+            _job_runtime = QuiltJobRuntime()
+            application = QCoreApplication.instance()
+            if application is not None:
+                _job_runtime.moveToThread(application.thread())
+        return _job_runtime
+
+def shutdown_job_runtime() -> None:
+    with _job_runtime_lock:
+        if _job_runtime is not None:
+            _job_runtime.shutdown()
@@ -0,0 +1,429 @@
+import sqlite3
+import threading
+
+from typing import Optional
+
+from PySide6.QtCore import QObject, Signal, Slot
+
+from src.quilt.extraction import QuiltExtractionPipeline, QuiltExtractionStats
+from src.quilt.filtering import SORT_NAME, QuiltTreeFilter, QuiltTreeFilterEngine
+from src.quilt.index import QuiltWorkspaceChanges
+from src.quilt.jobs import PRIORITY_BACKGROUND, PRIORITY_NORMAL, PRIORITY_VISIBLE, QuiltJob, job_runtime
+from src.quilt.quickopen import DEFAULT_QUICK_OPEN_LIMIT, QuiltPathIndex
+from src.quilt.scanner import DEFAULT_SCAN_WORKERS, QuiltScanProgress
+from src.quilt.search import DEFAULT_RESULT_LIMIT, QuiltSearchIndex
+from src.quilt.workspace import QuiltWorkspace
+
+
+class _QuiltJobLoader(QObject):
+    """Base of the loaders that run their work as a job on the job runtime.
+
+    A loader listens to `job_finished` of the runtime only while its job is
+    outstanding, and hands its own job to `_job_finished` once it is done,
+    however it ended. The shared runtime thus holds no connection to loaders
+    that are idle, cancelled or stopped.
+    """
+
+    def __init__(self, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self._job = None
+        self._listening = False
+
+    def cancel(self) -> None:
+        if self._job is not None:
+            self._job.cancel()
+
+    def is_running(self) -> bool:
+        return self._job is not None and not self._job.done()
+
+    def _submit(self, name: str, function, key, priority: int) -> None:
+        if not self._listening:
+            job_runtime().job_finished.connect(self._runtime_job_finished)
+            self._listening = True
+        self._job = job_runtime().submit(name, function, key=key, priority=priority)
+
+    @Slot(object)
+    def _runtime_job_finished(self, job: QuiltJob) -> None:
+        if job is not self._job:
+            return
+        job_runtime().job_finished.disconnect(self._runtime_job_finished)
+        self._listening = False
+        self._job_finished(job)
+
+    def _job_finished(self, job: QuiltJob) -> None:
+        # Called on the GUI thread with the loader's own job, once it is done
+        pass
+
+
+class QuiltWorkspaceLoader(_QuiltJobLoader):
+    """Fills a QuiltWorkspace as a job on the job runtime.
+
+    The workspace should be created with `load=False`. The loader first emits
+    everything the persistent index already knows as one batch, then refreshes
+    the index and emits the differences as the scan progresses. Batches are
+    delivered to the GUI thread through `batch_loaded`; the receiver applies
+    them with QuiltWorkspace.apply_changes.
+    """
+    batch_loaded = Signal(object)
+    progress = Signal(object)
+    finished = Signal(bool)
+    failed = Signal(str)
+
+    def __init__(self, workspace: QuiltWorkspace, parent: Optional[QObject] = None,
+                 scan_workers: int = DEFAULT_SCAN_WORKERS):
+        super().__init__(parent)
+        self.workspace = workspace
+        self.scan_workers = scan_workers
+
+    def start(self) -> None:
+        # What is on screen comes first
+        self._submit(
+            f'Scanning {self.workspace.workspace_name}', self._run,
+            key=('scan', self.workspace.workspace_dir), priority=PRIORITY_VISIBLE
+        )
+
+    def is_cancelled(self) -> bool:
+        return self._job is not None and self._job.cancelled()
+
+    def _run(self, job: QuiltJob) -> None:
+        # Serve whatever the index already knows right away
+        cached = self.workspace.index.entries()
+        if cached:
+            self.batch_loaded.emit(QuiltWorkspaceChanges(added=cached, added_directories=self.workspace.index.directories()))
+
+        self.workspace.index.refresh(
+            self.scan_workers,
+            progress_callback=lambda progress: self._report_progress(job, progress),
+            batch_callback=self.batch_loaded.emit,
+            cancelled=job.cancelled
+        )
+
+    def _report_progress(self, job: QuiltJob, progress: QuiltScanProgress) -> None:
+        if not job.cancelled():
+            job.report(None, f'{progress.files} files')
+            self.progress.emit(progress)
+
+    def _job_finished(self, job: QuiltJob) -> None:
+        if job.state == QuiltJob.FAILED:
+            self.failed.emit(str(job.error))
+        else:
+            self.finished.emit(job.state == QuiltJob.CANCELLED)
+
+
+class QuiltExtractionLoader(_QuiltJobLoader):
+    """Runs a QuiltExtractionPipeline over the workspace as a job on the job runtime.
+
+    Documents are announced through `document_extracted` as the workers finish
+    them, `finished` carries the final QuiltExtractionStats of runs that were
+    not cancelled.
+    """
+    document_extracted = Signal(str, object)
+    progress = Signal(object)
+    finished = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, workspace: QuiltWorkspace, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.workspace = workspace
+        self.pipeline = QuiltExtractionPipeline(workspace)
+
+    def start(self) -> None:
+        self._submit(
+            'Extracting documents', self._run,
+            key=('extract', self.workspace.workspace_dir), priority=PRIORITY_NORMAL
+        )
+
+    def _run(self, job: QuiltJob) -> QuiltExtractionStats:
+        return self.pipeline.run(
+            result_callback=self.document_extracted.emit,
+            progress_callback=lambda stats: self._report_progress(job, stats),
+            cancelled=job.cancelled
+        )
+
+    def _report_progress(self, job: QuiltJob, stats: QuiltExtractionStats) -> None:
+        if not job.cancelled():
+            job.report(stats.processed / stats.total if stats.total else None,
+                       f'{stats.processed} of {stats.total} files')
+            self.progress.emit(stats)
+
+    def _job_finished(self, job: QuiltJob) -> None:
+        # The job is done by now, so receivers can start the next run right away
+        if job.state == QuiltJob.FAILED:
+            self.failed.emit(str(job.error))
+        elif job.state == QuiltJob.FINISHED:
+            self.finished.emit(job.future.result())
+
+
+class QuiltSearchLoader(QObject):
+    """Answers full-text queries on a background thread.
+
+    Only the latest query matters while the user types: a new query replaces
+    the pending one and interrupts the one being answered. `results_ready`
+    carries QuiltSearchResults of queries that were not superseded.
+    """
+    results_ready = Signal(object)
+
+    def __init__(self, workspace: QuiltWorkspace, parent: Optional[QObject] = None,
+                 limit: int = DEFAULT_RESULT_LIMIT):
+        super().__init__(parent)
+        self.index = QuiltSearchIndex(workspace.documents)
+        self.limit = limit
+
+        self._condition = threading.Condition()
+        self._query = None
+        self._busy = False
+        self._stopped = False
+        threading.Thread(target=self._run, name='quilt-search', daemon=True).start()
+
+    def search(self, query: str) -> None:
+        with self._condition:
+            self._query = query
+            if self._busy:
+                self.index.interrupt()
+            self._condition.notify()
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopped = True
+            self._query = None
+            if self._busy:
+                self.index.interrupt()
+            self._condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._query is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    self.index.close()
+                    return
+                query, self._query = self._query, None
+                self._busy = True
+
+            try:
+                results = self.index.search(query, self.limit)
+            except sqlite3.OperationalError as e:
+                # Interrupted by a newer query, anything else is worth knowing about
+                results = None
+                if 'interrupt' not in str(e):
+                    print(f"Error searching for {query!r}: {e}")
+
+            with self._condition:
+                self._busy = False
+                superseded = self._query is not None or self._stopped
+            if results is not None and not superseded:
+                self.results_ready.emit(results)
+
+
+class QuiltTreeFilterLoader(QObject):
+    """Filters and sorts the navigation tree as jobs on the job runtime.
+
+    Only the latest request matters while the user types: a new request
+    cancels the one before it. `results_ready` carries the QuiltFilterResult
+    of requests that were not superseded. Call `invalidate` when the
+    workspace changed, the next request then starts from a fresh snapshot.
+    """
+    results_ready = Signal(object)
+    _result = Signal(object, object)
+
+    def __init__(self, workspace: QuiltWorkspace, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.workspace = workspace
+        self.engine = QuiltTreeFilterEngine(workspace)
+
+        self._job = None
+        self._result.connect(self._result_ready)
+
+    def request(self, text: str, sort_key: str = SORT_NAME, descending: bool = False) -> None:
+        self.cancel()
+        # Not listed in the jobs panel, a request per keystroke would only flicker there
+        self._job = job_runtime().submit(
+            'Filtering files', self._run, QuiltTreeFilter.parse(text), sort_key, descending,
+            key=('filter', self.workspace.workspace_dir), priority=PRIORITY_VISIBLE, tracked=False
+        )
+
+    def cancel(self) -> None:
+        if self._job is not None:
+            self._job.cancel()
+            self._job = None
+
+    def invalidate(self) -> None:
+        self.engine.invalidate()
+
+    def _run(self, job: QuiltJob, tree_filter: QuiltTreeFilter, sort_key: str, descending: bool) -> None:
+        result = self.engine.run(tree_filter, sort_key, descending, cancelled=job.cancelled)
+        if result is not None and not job.cancelled():
+            self._result.emit(job, result)
+
+    @Slot(object, object)
+    def _result_ready(self, job: QuiltJob, result) -> None:
+        if job is self._job:
+            self._job = None
+            self.results_ready.emit(result)
+
+
+class QuiltQuickOpenLoader(_QuiltJobLoader):
+    """Answers quick-open queries over the workspace paths on a background thread.
+
+    The QuiltPathIndex is built as a job when the first query is asked, and
+    built again once many files changed; `apply_changes` keeps it up to date
+    in between. As with QuiltSearchLoader only the latest query matters, a
+    new query replaces the pending one. `results_ready` carries the
+    QuiltQuickOpenResults of queries that were not superseded, the latest
+    query is answered again when a build is done.
+    """
+    results_ready = Signal(object)
+
+    def __init__(self, workspace: QuiltWorkspace, parent: Optional[QObject] = None,
+                 limit: int = DEFAULT_QUICK_OPEN_LIMIT):
+        super().__init__(parent)
+        self.workspace = workspace
+        self.index = QuiltPathIndex()
+        self.limit = limit
+
+        self._condition = threading.Condition()
+        self._query = None
+        self._latest = None
+        self._stopped = False
+        threading.Thread(target=self._run, name='quilt-quick-open', daemon=True).start()
+
+    def search(self, query: str) -> None:
+        if not self.index.is_ready():
+            self._build(PRIORITY_VISIBLE)
+
+        with self._condition:
+            self._query = self._latest = query
+            self._condition.notify()
+
+    def apply_changes(self, changes: QuiltWorkspaceChanges) -> None:
+        self.index.apply_changes(changes)
+        if self.index.needs_rebuild():
+            self._build(PRIORITY_BACKGROUND)
+
+    def stop(self) -> None:
+        if self._job is not None:
+            self._job.cancel()
+        with self._condition:
+            self._stopped = True
+            self._query = None
+            self._condition.notify()
+
+    def _build(self, priority: int) -> None:
+        if self._job is None or self._job.done():
+            self._submit(
+                'Indexing file names', self._build_index,
+                key=('quick-open', self.workspace.workspace_dir), priority=priority
+            )
+
+    def _build_index(self, job: QuiltJob) -> None:
+        self.index.build(self.workspace.index.entries, cancelled=job.cancelled)
+
+    def _job_finished(self, job: QuiltJob) -> None:
+        if job.state == QuiltJob.FAILED:
+            print(f"Error indexing file names: {job.error}")
+        elif job.state == QuiltJob.FINISHED and self._latest is not None:
+            self.search(self._latest)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._query is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                query, self._query = self._query, None
+
+            results = self.index.search(query, self.limit)
+            with self._condition:
+                superseded = self._query is not None or self._stopped
+            if not superseded:
+                self.results_ready.emit(results)
+
+
+class QuiltEmbeddingLoader(_QuiltJobLoader):
+    """Runs a QuiltEmbeddingPipeline over the extracted documents as a background job.
+
+    The pipeline, and with it NumPy and the embedding backend, is only
+    created on the first run.
+    """
+    progress = Signal(object)
+    finished = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, workspace: QuiltWorkspace, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.workspace = workspace
+        self.pipeline = None
+
+    def start(self) -> None:
+        self._submit(
+            'Embedding documents', self._run,
+            key=('embed', self.workspace.workspace_dir), priority=PRIORITY_BACKGROUND
+        )
+
+    def _run(self, job: QuiltJob):
+        if self.pipeline is None:
+            from src.quilt.embeddings import QuiltEmbeddingPipeline
+
+            self.pipeline = QuiltEmbeddingPipeline(self.workspace)
+        return self.pipeline.run(
+            progress_callback=lambda stats: self._report_progress(job, stats),
+            cancelled=job.cancelled
+        )
+
+    def _report_progress(self, job: QuiltJob, stats) -> None:
+        if not job.cancelled():
+            done = stats.cached + stats.embedded
+            job.report(done / stats.total if stats.total else None, f'{done} of {stats.total} documents')
+            self.progress.emit(stats)
+
+    def _job_finished(self, job: QuiltJob) -> None:
+        if job.state == QuiltJob.FAILED:
+            self.failed.emit(str(job.error))
+        elif job.state == QuiltJob.FINISHED:
+            self.finished.emit(job.future.result())
+
+
+class QuiltDuplicatesLoader(_QuiltJobLoader):
+    """Runs a QuiltDuplicateDetector over the extracted documents as a background job.
+
+    `finished` carries the QuiltDuplicateReport. Like the embedding loader,
+    the detector and NumPy are only loaded on the first run.
+    """
+    progress = Signal(object)
+    finished = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, workspace: QuiltWorkspace, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.workspace = workspace
+        self.detector = None
+
+    def start(self) -> None:
+        self._submit(
+            'Finding duplicates', self._run,
+            key=('duplicates', self.workspace.workspace_dir), priority=PRIORITY_BACKGROUND
+        )
+
+    def _run(self, job: QuiltJob):
+        if self.detector is None:
+            from src.quilt.duplicates import QuiltDuplicateDetector
+
+            self.detector = QuiltDuplicateDetector(self.workspace)
+        return self.detector.run(
+            progress_callback=lambda stats: self._report_progress(job, stats),
+            cancelled=job.cancelled
+        )
+
+    def _report_progress(self, job: QuiltJob, stats) -> None:
+        if not job.cancelled():
+            done = stats.cached + stats.signed
+            job.report(done / stats.total if stats.total else None, f'{done} of {stats.total} documents')
+            self.progress.emit(stats)
+
+    def _job_finished(self, job: QuiltJob) -> None:
+        if job.state == QuiltJob.FAILED:
+            self.failed.emit(str(job.error))
+        elif job.state == QuiltJob.FINISHED:
+            self.finished.emit(job.future.result())
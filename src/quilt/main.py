@@ -1,23 +1,59 @@
+import argparse
+import logging
 import sys
 
-from PySide6.QtGui import QFont, QFontDatabase
-from PySide6.QtWidgets import QApplication
-
-from src.quilt.ui.windows import QuiltApplication
+from src.quilt.profiling import QuiltFirstPaintProbe, startup_profiler
 
 def main():
+    parser = argparse.ArgumentParser(prog="quilt", description="Research Data Management Tool")
+    parser.add_argument("--prerender-icons", action="store_true",
+                        help="render all icons for every palette color into the icon cache and exit")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="report how long each startup phase takes up to the first paint and exit")
+    args, qt_args = parser.parse_known_args()
+
+    # Background work reports its outcome and errors through logging
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+
+    if args.prerender_icons:
+        from src.quilt.ui.theme import prerender_icons
+
+        cached = prerender_icons()
+        print(f"Icon cache holds {cached} rendered icons.")
+        return
+
+    if args.profile_startup:
+        startup_profiler.enable()
+
+    # The UI is imported here rather than at module level, so the other modes stay fast
+    with startup_profiler.phase("imports"):
+        from PySide6.QtGui import QFont, QFontDatabase
+        from PySide6.QtWidgets import QApplication
+
+        from src.quilt.jobs import shutdown_job_runtime
+        from src.quilt.ui.windows import QuiltApplication
+
     # Initialize the application
-    app = QApplication(sys.argv)
+    with startup_profiler.phase("application"):
+        app = QApplication(sys.argv[:1] + qt_args)
+        app.aboutToQuit.connect(shutdown_job_runtime)
 
     # Load the font
-    font_id = QFontDatabase.addApplicationFont("assets/fonts/Roboto-Regular.ttf")
+    with startup_profiler.phase("fonts"):
+        font_id = QFontDatabase.addApplicationFont("assets/fonts/Roboto-Regular.ttf")
     
-    if font_id == -1:
-        print("Failed to load font! Loading default font instead.")
-    else:
-        font_family = QFontDatabase.applicationFontFamilies(font_id)[0]
-        app.setFont(QFont(font_family, 10))
-
-    quilt = QuiltApplication()
-    quilt.show()
-    sys.exit(app.exec())
\ No newline at end of file
+        if font_id == -1:
+            print("Failed to load font! Loading default font instead.")
+        else:
+            font_family = QFontDatabase.applicationFontFamilies(font_id)[0]
+            app.setFont(QFont(font_family, 10))
+
+    # Includes the stylesheet and icon rendering, which are also reported on their own
+    with startup_profiler.phase("main window"):
+        quilt = QuiltApplication()
+        quilt.show()
+
+    if args.profile_startup:
+        QuiltFirstPaintProbe(quilt, startup_profiler, on_report=app.quit)
+
+    sys.exit(app.exec())
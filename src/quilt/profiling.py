@@ -0,0 +1,91 @@
+import sys
+import time
+
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+from PySide6.QtCore import QEvent, QObject, QTimer
+
+# Modules that should stay unloaded until the feature using them is opened
+DEFERRED_MODULES = ('PySide6.QtPdf', 'cairosvg', 'PIL', 'numpy')
+
+
+class QuiltStartupProfiler():
+    """Collects wall-clock timings of the startup phases.
+
+    Phases are timed with `phase`; timing the same phase more than once adds
+    up, so scattered work such as icon rendering is reported as one total.
+    Disabled by default, `phase` then only costs a flag check.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.started = time.perf_counter()
+        self._phases: Dict[str, List[float]] = {}
+
+    def enable(self) -> None:
+        self.enabled = True
+        self.started = time.perf_counter()
+        self._phases.clear()
+
+    @contextmanager
+    def phase(self, name: str):
+        if not self.enabled:
+            yield
+            return
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name: str, elapsed: float) -> None:
+        totals = self._phases.setdefault(name, [0.0, 0])
+        totals[0] += elapsed
+        totals[1] += 1
+
+    def mark(self, name: str) -> None:
+        """Record the time since profiling was enabled, e.g. for the first paint."""
+        self._phases[name] = [time.perf_counter() - self.started, 1]
+
+    def phases(self) -> List[Tuple[str, float, int]]:
+        return [(name, elapsed, count) for name, (elapsed, count) in self._phases.items()]
+
+    def report(self, file=None) -> None:
+        file = file or sys.stderr
+        print("Startup profile", file=file)
+        for name, elapsed, count in self.phases():
+            calls = f" ({count} calls)" if count > 1 else ""
+            print(f"  {name:<24} {elapsed * 1e3:>9.1f} ms{calls}", file=file)
+
+        loaded = [module for module in DEFERRED_MODULES if module in sys.modules]
+        print(f"  deferred modules loaded: {', '.join(loaded) if loaded else 'none'}", file=file)
+
+
+class QuiltFirstPaintProbe(QObject):
+    """Marks the first paint of a widget, then reports the profile and calls `on_report`."""
+
+    def __init__(self, widget, profiler: QuiltStartupProfiler, on_report=None):
+        super().__init__(widget)
+        self.profiler = profiler
+        self.on_report = on_report
+        widget.installEventFilter(self)
+
+    def eventFilter(self, watched, event) -> bool:
+        if event.type() == QEvent.Paint:
+            watched.removeEventFilter(self)
+            self.profiler.mark("first paint")
+
+            # Report once the paint has been flushed
+            QTimer.singleShot(0, self._report)
+        return False
+
+    def _report(self) -> None:
+        self.profiler.report()
+        if self.on_report is not None:
+            self.on_report()
+
+
+startup_profiler = QuiltStartupProfiler()
+
@@ -0,0 +1,355 @@
+import math
+import os
+import re
+import threading
+import time
+
+from array import array
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from src.quilt.index import QuiltWorkspaceChanges
+
+DEFAULT_QUICK_OPEN_LIMIT = 50
+
+# Paths must contain at least this share of the query trigrams
+MIN_SIMILARITY = 0.5
+
+# Longer queries are matched by their first trigrams only, hits are counted in bytes
+MAX_QUERY_TRIGRAMS = 64
+
+# A trigram in the file name counts this much more than one in its folder
+NAME_WEIGHT = 2
+
+# The best candidates by trigram score are ranked again by where the query words occur
+RERANKED_CANDIDATES = 200
+
+# Trigrams in more than this share of the files are stored as bitmaps, which count faster
+BITMAP_SHARE = 1 / 32
+
+# Files added or removed since the last build are costlier to score, past this share
+# of all files the index is built again
+REBUILD_RATIO = 0.25
+REBUILD_MIN_FILES = 1000
+
+_WORD_PATTERN = re.compile(r'[^\W_]+')
+
+
+def word_trigrams(word: str, closed: bool = True) -> List[str]:
+    """Return the trigrams of a folded word, padded so short words and word starts have some.
+
+    An open word, the one still being typed, has no trigram for its end.
+    """
+    padded = f'  {word} ' if closed else f'  {word}'
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+@dataclass
+class QuiltQuickOpenResults:
+    """Best matching file ids of one quick-open query.
+
+    `ready` is unset while the path index is built for the first time, there
+    are no results then. `candidates` counts the paths that share enough
+    trigrams with the query, of `total` paths.
+    """
+    query: str
+    file_ids: List[str] = field(default_factory=list)
+    candidates: int = 0
+    total: int = 0
+    ready: bool = True
+    elapsed: float = 0.0
+
+
+class QuiltPathIndex():
+    """Trigram index over the workspace paths, for the quick-open palette.
+
+    File names and folder paths are split into words, and the padded
+    trigrams of the words are indexed. A query is scored against every file
+    at once with NumPy, by counting the query trigrams in its name and in its
+    folder, so paths with a typo or a word left out still match. The best
+    candidates are then ranked again by where the query words occur whole.
+
+    The index is built in bulk, off the GUI thread, and then kept up to date
+    with `apply_changes`. Changes that arrive while it is built are applied
+    once it is done, until then queries use the previous index.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Optional[_QuiltPathPostings] = None
+        self._building = False
+        self._pending: List[QuiltWorkspaceChanges] = []
+
+    def __len__(self) -> int:
+        postings = self._postings
+        return len(postings.slots) if postings is not None else 0
+
+    def is_ready(self) -> bool:
+        return self._postings is not None
+
+    def needs_rebuild(self) -> bool:
+        """True once enough files were added or removed since the last build that building again pays off."""
+        with self._lock:
+            postings = self._postings
+            if postings is None or self._building:
+                return False
+            changed = postings.dead + len(postings.file_ids) - postings.bulk_size
+            return changed >= REBUILD_MIN_FILES and changed > REBUILD_RATIO * len(postings.file_ids)
+
+    def build(self, load_rows: Callable[[], list], cancelled: Optional[Callable[[], bool]] = None) -> bool:
+        """Index the (file_id, directory, name, ...) rows `load_rows` returns, replacing what is indexed.
+
+        Changes applied while building are applied to the new index as well,
+        so none are lost between loading the rows and indexing them. Returns
+        False if cancelled.
+        """
+        with self._lock:
+            self._building = True
+            self._pending = []
+
+        postings = None
+        try:
+            postings = _QuiltPathPostings(load_rows())
+        finally:
+            with self._lock:
+                self._building = False
+                if postings is not None and not (cancelled and cancelled()):
+                    for changes in self._pending:
+                        postings.apply(changes)
+                    self._postings = postings
+                self._pending = []
+        return self._postings is postings
+
+    def apply_changes(self, changes: QuiltWorkspaceChanges) -> None:
+        """Apply an incremental index refresh."""
+        with self._lock:
+            if self._postings is not None:
+                self._postings.apply(changes)
+            if self._building:
+                self._pending.append(changes)
+
+    def search(self, query: str, limit: int = DEFAULT_QUICK_OPEN_LIMIT) -> QuiltQuickOpenResults:
+        started = time.perf_counter()
+        results = QuiltQuickOpenResults(query)
+        words = list(dict.fromkeys(_WORD_PATTERN.findall(query.casefold())))
+        if not words:
+            return results
+
+        # The last word is still being typed unless the query ends with a space
+        trigrams = {}
+        for position, word in enumerate(words):
+            trigrams.update(dict.fromkeys(word_trigrams(word, closed=position < len(words) - 1 or query[-1:].isspace())))
+        trigrams = list(trigrams)[:MAX_QUERY_TRIGRAMS]
+        needed = max(1, math.ceil(len(trigrams) * MIN_SIMILARITY))
+
+        with self._lock:
+            results.ready = self._postings is not None
+            if not results.ready:
+                return results
+            results.total = len(self._postings.slots)
+            results.candidates, scored = self._postings.score(trigrams, needed)
+
+        # Whole words weigh by their length, most at the start of the name
+        ranked = []
+        for file_id, score in scored:
+            directory, name = os.path.split(file_id.casefold())
+            for word in words:
+                if name.startswith(word):
+                    score += 3 * len(word)
+                elif word in name:
+                    score += NAME_WEIGHT * len(word)
+                elif word in directory:
+                    score += len(word)
+            ranked.append((-score, len(file_id), file_id))
+        ranked.sort()
+
+        results.file_ids = [file_id for _, _, file_id in ranked[:limit]]
+        results.elapsed = time.perf_counter() - started
+        return results
+
+
+class _QuiltPathPostings():
+    """File slots and trigram postings of the indexed paths.
+
+    The files given at construction are indexed in bulk with NumPy; their
+    postings are sorted slot arrays, or bitmaps for trigrams that many files
+    share. Files added later get slots of their own and small postings per
+    trigram, removed files only leave a dead slot behind.
+    """
+
+    def __init__(self, rows: list):
+        self._words: Dict[str, Tuple[str, ...]] = {}
+        self.file_ids: List[Optional[str]] = [row[0] for row in rows]
+        self.slots: Dict[str, int] = {file_id: slot for slot, file_id in enumerate(self.file_ids)}
+        self.alive = bytearray(b'\x01') * len(rows)
+        self.name_lengths = array('i', [len(row[2]) for row in rows])
+        self.dead = 0
+
+        # Folders are few, their postings are built one folder at a time
+        self.directories: Dict[str, int] = {}
+        self.directory_postings: Dict[str, array] = {}
+        self.directory_ids = array('i', [self._directory_id(row[1]) for row in rows])
+
+        self.bulk_size = len(rows)
+        self.bulk_slots = {}
+        self.bulk_bitmaps = {}
+        self.added_slots: Dict[str, array] = {}
+        if rows:
+            self._index_names([row[2] for row in rows])
+
+    def _index_names(self, names: List[str]) -> None:
+        import numpy as np
+
+        # All names as one text, each followed by a newline
+        text = '\n'.join(names)
+        if text.count('\n') != len(names) - 1:
+            text = '\n'.join(name.replace('\n', ' ') for name in names)
+        codes = np.frombuffer((text + '\n').casefold().encode('utf-32-le'), dtype=np.uint32)
+        slots = np.cumsum(codes == ord('\n'), dtype=np.uint64)
+
+        # Characters as small codes, anything but letters and digits as the last one, a space
+        alphabet = np.flatnonzero(np.bincount(codes))
+        alphabet = np.append(alphabet[[chr(code).isalnum() for code in alphabet.tolist()]], ord(' '))
+        size = len(alphabet)
+        slot_bits = max(len(names) - 1, 1).bit_length()
+        if size ** 3 << slot_bits >= 1 << 63:
+            # Too many distinct characters to pack a trigram and a slot into one integer
+            postings = {}
+            for slot, name in enumerate(names):
+                for trigram in self._trigrams(name):
+                    postings.setdefault(trigram, []).append(slot)
+            for trigram, trigram_slots in postings.items():
+                self._store_bulk(trigram, np.array(trigram_slots, dtype=np.int32))
+            return
+
+        dense = np.full(int(codes.max()) + 1, size - 1, dtype=np.uint64)
+        dense[alphabet[:-1]] = np.arange(size - 1, dtype=np.uint64)
+        dense = dense[codes]
+        size = np.uint64(size)
+        space = size - np.uint64(1)
+
+        # Padded word trigrams: two for every word start, then one for every two letters in a row
+        letters = dense != space
+        starts = letters & np.concatenate(([True], ~letters[:-1]))
+        pairs = letters[:-2] & letters[1:-1]
+        first = np.flatnonzero(starts)
+        trigrams = np.concatenate((
+            (space * size + space) * size + dense[first],
+            (space * size + dense[first]) * size + dense[first + 1],
+            ((dense[:-2] * size + dense[1:-1]) * size + dense[2:])[pairs],
+        ))
+        keys = (trigrams << np.uint64(slot_bits)) | np.concatenate((slots[first], slots[first], slots[:-2][pairs]))
+
+        # Distinct (trigram, slot) keys, ordered by trigram and then by slot
+        keys.sort()
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        trigrams = keys >> np.uint64(slot_bits)
+        keys = (keys & np.uint64((1 << slot_bits) - 1)).astype(np.int32)
+        bounds = np.append(np.flatnonzero(np.concatenate(([True], trigrams[1:] != trigrams[:-1]))), len(keys))
+
+        codes = trigrams[bounds[:-1]]
+        characters = [alphabet[codes // (size * size)], alphabet[codes // size % size], alphabet[codes % size]]
+        for position, (a, b, c) in enumerate(zip(*(column.tolist() for column in characters))):
+            self._store_bulk(chr(a) + chr(b) + chr(c), keys[bounds[position]:bounds[position + 1]])
+
+    def _store_bulk(self, trigram: str, slots) -> None:
+        import numpy as np
+
+        if len(slots) > BITMAP_SHARE * self.bulk_size:
+            bitmap = np.zeros(self.bulk_size, dtype=bool)
+            bitmap[slots] = True
+            self.bulk_bitmaps[trigram] = np.packbits(bitmap)
+        else:
+            self.bulk_slots[trigram] = slots
+
+    def apply(self, changes: QuiltWorkspaceChanges) -> None:
+        # Modified files keep their path, nothing to do for them
+        for row in changes.removed:
+            self.remove(row[0])
+        for old_row, new_row in changes.renamed:
+            self.remove(old_row[0])
+            self.add(new_row[0], new_row[1], new_row[2])
+        for row in changes.added:
+            self.add(row[0], row[1], row[2])
+
+    def add(self, file_id: str, directory: str, name: str) -> None:
+        if file_id in self.slots:
+            return
+
+        slot = len(self.file_ids)
+        self.slots[file_id] = slot
+        self.file_ids.append(file_id)
+        self.alive.append(1)
+        self.name_lengths.append(len(name))
+        self.directory_ids.append(self._directory_id(directory))
+        for trigram in self._trigrams(name):
+            self.added_slots.setdefault(trigram, array('i')).append(slot)
+
+    def remove(self, file_id: str) -> None:
+        slot = self.slots.pop(file_id, None)
+        if slot is not None:
+            self.file_ids[slot] = None
+            self.alive[slot] = 0
+            self.dead += 1
+
+    def score(self, trigrams: List[str], needed: int) -> Tuple[int, List[Tuple[str, int]]]:
+        """Return the number of files with `needed` of the trigrams, and the best of them with their score."""
+        # Called with the index lock held. The growing arrays are viewed here
+        # and may not be resized while a view exists, so none outlives the call.
+        import numpy as np
+
+        name_hits = np.zeros(len(self.file_ids), dtype=np.uint8)
+        bulk_hits = name_hits[:self.bulk_size]
+        folder_hits = np.zeros(len(self.directories), dtype=np.uint8)
+        for trigram in trigrams:
+            # Postings never hold a slot twice, so the increments do not collide
+            bitmap = self.bulk_bitmaps.get(trigram)
+            if bitmap is not None:
+                bulk_hits += np.unpackbits(bitmap, count=self.bulk_size)
+            slots = self.bulk_slots.get(trigram)
+            if slots is not None:
+                name_hits[slots] += 1
+            slots = self.added_slots.get(trigram)
+            if slots is not None:
+                name_hits[np.frombuffer(slots, dtype=np.int32)] += 1
+            folders = self.directory_postings.get(trigram)
+            if folders is not None:
+                folder_hits[np.frombuffer(folders, dtype=np.int32)] += 1
+        # A trigram in both the name and the folder only counts once
+        folder_hits = np.minimum(folder_hits[np.frombuffer(self.directory_ids, dtype=np.int32)],
+                                 np.uint8(len(trigrams)) - name_hits)
+
+        alive = np.frombuffer(self.alive, dtype=bool)
+        candidates = np.flatnonzero(alive & (name_hits + folder_hits >= needed))
+        if not len(candidates):
+            return 0, []
+
+        # Shorter names first among equal scores
+        scores = NAME_WEIGHT * name_hits[candidates].astype(np.int32) + folder_hits[candidates]
+        order = scores * 1024 - np.minimum(np.frombuffer(self.name_lengths, dtype=np.int32)[candidates], 1023)
+        if len(candidates) > RERANKED_CANDIDATES:
+            best = np.argpartition(-order, RERANKED_CANDIDATES)[:RERANKED_CANDIDATES]
+        else:
+            best = np.arange(len(candidates))
+
+        file_ids = self.file_ids
+        return len(candidates), [(file_ids[slot], score) for slot, score in
+                                 zip(candidates[best].tolist(), scores[best].tolist())]
+
+    def _directory_id(self, directory: str) -> int:
+        directory_id = self.directories.get(directory)
+        if directory_id is None:
+            directory_id = self.directories[directory] = len(self.directories)
+            for trigram in self._trigrams(directory):
+                self.directory_postings.setdefault(trigram, array('i')).append(directory_id)
+        return directory_id
+
+    def _trigrams(self, text: str) -> Set[str]:
+        trigrams = set()
+        for word in _WORD_PATTERN.findall(text.casefold()):
+            # Words repeat a lot across paths, their trigrams are split once
+            cached = self._words.get(word)
+            if cached is None:
+                cached = self._words[word] = tuple(word_trigrams(word))
+            trigrams.update(cached)
+        return trigrams
@@ -0,0 +1,178 @@
+import os
+import time
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional, Tuple
+
+DEFAULT_SCAN_WORKERS = 16
+
+FILE_KINDS = {
+    '.md': 'markdown',
+    '.pdf': 'pdf',
+    '.png': 'image',
+    '.jpg': 'image',
+    '.jpeg': 'image',
+    '.gif': 'image',
+}
+
+def classify_file(file_name: str) -> Optional[str]:
+    """Return the workspace file kind for a file name, or None if it is not tracked."""
+    return FILE_KINDS.get(os.path.splitext(file_name)[1].lower())
+
+
+@dataclass
+class QuiltDirectoryListing:
+    """Result of visiting a single workspace directory."""
+    directory: str
+    mtime: float
+    subdirectories: List[str]
+    # (file_id, directory, name, kind, size, last_modified) rows, None if the directory was reused
+    files: Optional[list] = None
+
+    @property
+    def reused(self) -> bool:
+        return self.files is None
+
+
+@dataclass
+class QuiltScanProgress:
+    """Snapshot of a running scan, passed to the progress callback."""
+    directories: int
+    files: int
+    pending: int
+    elapsed: float
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class QuiltWorkspaceScanner():
+    """Single-pass, parallel os.scandir walker over a workspace.
+
+    Every directory is listed once and its files are classified by extension in
+    the same pass, using the stat results of the DirEntry objects. Subdirectories
+    are spread over a thread pool, which keeps many requests in flight on
+    high-latency file systems such as NFS.
+    """
+
+    def __init__(self, workspace_dir: str, workers: int = DEFAULT_SCAN_WORKERS,
+                 progress_callback: Optional[Callable[[QuiltScanProgress], None]] = None,
+                 progress_interval: float = 0.5):
+        self.workspace_dir = workspace_dir
+        self.workers = max(1, workers)
+        self.progress_callback = progress_callback
+        self.progress_interval = progress_interval
+
+    def scan(self, reuse: Optional[Callable[[str, float], Optional[List[str]]]] = None,
+             cancelled: Optional[Callable[[], bool]] = None) -> Iterator[QuiltDirectoryListing]:
+        """Walk the workspace and yield one listing per directory as it completes.
+
+        `reuse` is called with a directory and its current mtime; returning a list
+        of subdirectories skips listing that directory and descends into those
+        instead. Listings are yielded on the calling thread. The scan stops early
+        once `cancelled` returns True.
+        """
+        started = time.perf_counter()
+        last_report = started
+        directories = 0
+        files = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='quilt-scan') as executor:
+            pending = {executor.submit(self._visit, '', None, reuse)}
+
+            while pending:
+                if cancelled and cancelled():
+                    for future in pending:
+                        future.cancel()
+                    break
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    if result is None:
+                        continue
+
+                    listing, children = result
+                    for subdirectory, mtime in children:
+                        pending.add(executor.submit(self._visit, subdirectory, mtime, reuse))
+
+                    directories += 1
+                    files += len(listing.files) if listing.files is not None else 0
+                    yield listing
+
+                now = time.perf_counter()
+                if self.progress_callback and now - last_report >= self.progress_interval:
+                    last_report = now
+                    self.progress_callback(QuiltScanProgress(directories, files, len(pending), now - started))
+
+        if self.progress_callback:
+            self.progress_callback(QuiltScanProgress(directories, files, 0, time.perf_counter() - started))
+
+    def list_directory(self, directory: str) -> Optional[QuiltDirectoryListing]:
+        """List and classify a single directory, or return None if it cannot be read."""
+        result = self._visit(directory, None, None)
+        return result[0] if result is not None else None
+
+    def restat_files(self, rows: list) -> Optional[list]:
+        """Return the given index rows whose size or mtime changed on disk, updated.
+
+        Returns None if one of the files can no longer be stat'ed.
+        """
+        modified = []
+        for row in rows:
+            try:
+                stat = os.stat(os.path.join(self.workspace_dir, row[0]))
+            except OSError:
+                return None
+
+            if (stat.st_size, stat.st_mtime) != (row[4], row[5]):
+                modified.append((*row[:4], stat.st_size, stat.st_mtime))
+
+        return modified
+
+    def _absolute(self, directory: str) -> str:
+        return os.path.join(self.workspace_dir, directory) if directory else self.workspace_dir
+
+    def _visit(self, directory: str, mtime: Optional[float], reuse) -> Optional[Tuple[QuiltDirectoryListing, list]]:
+        path = self._absolute(directory)
+
+        if mtime is None:
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                return None
+
+        if reuse is not None:
+            subdirectories = reuse(directory, mtime)
+            if subdirectories is not None:
+                # Unchanged directory, its subdirectories still need a stat of their own
+                children = [(subdirectory, None) for subdirectory in subdirectories]
+                return QuiltDirectoryListing(directory, mtime, subdirectories), children
+
+        files = []
+        children = []
+
+        try:
+            with os.scandir(path) as iterator:
+                for entry in iterator:
+                    relative_path = os.path.join(directory, entry.name) if directory else entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            children.append((relative_path, entry.stat(follow_symlinks=False).st_mtime))
+                            continue
+
+                        kind = classify_file(entry.name)
+                        if kind is None:
+                            continue
+
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+
+                    files.append((relative_path, directory, entry.name, kind, stat.st_size, stat.st_mtime))
+        except OSError:
+            return None
+
+        return QuiltDirectoryListing(directory, mtime, [child for child, _ in children], files), children
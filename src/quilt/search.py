@@ -0,0 +1,235 @@
+import re
+import sqlite3
+import threading
+import time
+
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from src.quilt.extraction import QuiltDocumentStore, fold_term
+
+DEFAULT_RESULT_LIMIT = 50
+SNIPPET_TOKENS = 16
+
+# Matches in a title weigh this much more than matches in the text
+TITLE_WEIGHT = 10.0
+
+# BM25 scores about this many matches of a one-word query within the search
+# latency target, each further word of a query costs about as much again
+MAX_RANKED_MATCHES = 5000
+
+# SQLite takes about this many steps for each match it scores, and checks the
+# scoring of phrases against the bound every PROGRESS_STEPS steps
+STEPS_PER_MATCH = 15
+PROGRESS_STEPS = 1000
+
+# Prefixes shorter than this match too many terms to be useful while typing
+MIN_PREFIX_LENGTH = 2
+
+# Prefixes with more completions are highlighted through the slower prefix query
+MAX_COMPLETIONS = 32
+
+# Marks the matched terms in snippets, control characters never occur in extracted text
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+_QUERY_PATTERN = re.compile(r'"([^"]*)"?|(\S+)')
+_TOKEN_PATTERN = re.compile(r'[^\W_]+')
+
+
+@dataclass
+class QuiltSearchResult:
+    """A workspace file matching a search query."""
+    file_id: str
+    kind: str
+    title: Optional[str]
+    snippet: str
+    score: float
+
+
+@dataclass
+class QuiltSearchResults:
+    """Ranked results of one query."""
+    query: str
+    results: List[QuiltSearchResult] = field(default_factory=list)
+    complete: bool = True
+    elapsed: float = 0.0
+
+
+def parse_query(query: str) -> List[Tuple[str, bool]]:
+    """Split what a user typed into (tokens, is_prefix) terms.
+
+    Words must all occur, "quoted words" must occur as a phrase, and the word
+    being typed last also matches as a prefix. Everything else, FTS5 operators
+    included, is taken literally.
+    """
+    terms = []
+    for match in _QUERY_PATTERN.finditer(query):
+        phrase, word = match.groups()
+        tokens = _TOKEN_PATTERN.findall(phrase if phrase is not None else word)
+        if tokens:
+            terms.append((' '.join(tokens), phrase is None))
+
+    if terms:
+        last_tokens, last_is_word = terms[-1]
+        is_prefix = last_is_word and not query[-1:].isspace() and len(last_tokens) >= MIN_PREFIX_LENGTH
+        terms = [(tokens, False) for tokens, _ in terms[:-1]] + [(last_tokens, is_prefix)]
+    return terms
+
+def build_match_query(terms: List[Tuple[str, bool]], completions: Optional[List[str]] = None) -> str:
+    """Build the FTS5 query of parsed terms. A prefix is spelled out as `completions` when they are given."""
+    parts = []
+    for tokens, is_prefix in terms:
+        if is_prefix and completions:
+            parts.append('(' + ' OR '.join(f'"{completion}"' for completion in completions) + ')')
+        else:
+            parts.append(f'"{tokens}" *' if is_prefix else f'"{tokens}"')
+    return ' AND '.join(parts)
+
+
+class QuiltSearchIndex():
+    """Ranked full-text search over the documents of a QuiltDocumentStore.
+
+    The index itself is the FTS5 table the store maintains while documents
+    are extracted, so it is persistent and updated incrementally. Searches
+    use their own read connection; in WAL mode they neither block nor wait
+    for a running extraction.
+
+    Results are ordered by BM25, title matches weighted above text matches,
+    with statistics of the whole workspace. Scoring costs time per match and
+    word, so at most MAX_RANKED_MATCHES documents per word are scored. A
+    query matching more is made only of words that occur in that many
+    documents, and BM25 weighs words in most documents close to nothing.
+    Those queries rank every title match, then the most recently extracted
+    text matches, and their results are not `complete`. FTS5 also matches
+    every phrase over the whole workspace once per ranking pass, so phrases
+    of very common words stay slow whatever is scored.
+    """
+
+    def __init__(self, store: QuiltDocumentStore):
+        self.store = store
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(f'file:{store.store_path}?mode=ro', uri=True, check_same_thread=False)
+        self._connection.execute('PRAGMA mmap_size = 268435456')
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def interrupt(self) -> None:
+        """Abort the search in progress, it raises sqlite3.OperationalError. Safe from any thread."""
+        self._connection.interrupt()
+
+    def search(self, query: str, limit: int = DEFAULT_RESULT_LIMIT) -> QuiltSearchResults:
+        started = time.perf_counter()
+        results = QuiltSearchResults(query)
+        terms = parse_query(query)
+        if not terms:
+            return results
+
+        match_query = build_match_query(terms)
+        with self._lock:
+            ranked, results.complete = self._rank(terms, match_query, limit)
+
+            # FTS5 expands a prefix over the whole index on every lookup, snippets look up one row at a time
+            snippet_query = match_query
+            if terms[-1][1] and ranked:
+                completions = self._completions(terms[-1][0])
+                if 0 < len(completions) <= MAX_COMPLETIONS:
+                    snippet_query = build_match_query(terms, completions)
+
+            # Snippets and file names only for what is shown
+            for rowid, rank in ranked:
+                snippet = self._snippet(snippet_query, rowid)
+                if snippet is None and snippet_query is not match_query:
+                    snippet = self._snippet(match_query, rowid)
+
+                # Copies of the same contents share a document, each of them is listed
+                files = self._connection.execute(
+                    'SELECT f.path, d.kind, d.title FROM documents d '
+                    'JOIN files f ON f.content_hash = d.content_hash WHERE d.id = ? ORDER BY f.path',
+                    (rowid,)
+                ).fetchall()
+
+                # BM25 ranks are negative, scores are reported the other way round
+                results.results.extend(
+                    QuiltSearchResult(file_id, kind, title, snippet or '', -rank) for file_id, kind, title in files
+                )
+
+        del results.results[limit:]
+        results.elapsed = time.perf_counter() - started
+        return results
+
+    def _rank(self, terms: List[Tuple[str, bool]], match_query: str, limit: int) -> Tuple[List[Tuple[int, float]], bool]:
+        # SQLite keeps only the best `limit` rows while FTS5 scores the matches
+        ranking = f'SELECT rowid, bm25(search, {TITLE_WEIGHT}, 1.0) AS rank FROM search WHERE search MATCH ?'
+        candidates = max(MAX_RANKED_MATCHES // sum(len(tokens.split()) for tokens, _ in terms), limit)
+        if any(' ' in tokens for tokens, _ in terms):
+            # Phrases are matched position by position, walking their matches costs as much as scoring them
+            ranked = self._rank_within(f'{ranking} ORDER BY rank LIMIT ?', (match_query, limit), candidates)
+            if ranked is not None:
+                return ranked, True
+        else:
+            # Walking rowids skips the scoring and is cheap even for the most common words
+            newest = self._connection.execute(
+                'SELECT rowid FROM search WHERE search MATCH ? ORDER BY rowid DESC LIMIT ?',
+                (match_query, candidates + 1)
+            ).fetchall()
+            if len(newest) <= candidates:
+                return self._connection.execute(f'{ranking} ORDER BY rank LIMIT ?', (match_query, limit)).fetchall(), True
+
+        # Title matches are few and outrank text matches by TITLE_WEIGHT
+        ranked = self._connection.execute(
+            f'{ranking} ORDER BY rank LIMIT ?', (f'{{title}} : ({match_query})', limit)
+        ).fetchall()
+        if len(ranked) >= limit:
+            return ranked, False
+
+        # The rest are the best of the most recent text matches
+        cutoff = self._connection.execute(
+            'SELECT rowid FROM search WHERE search MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?',
+            (match_query, candidates - 1)
+        ).fetchone()[0]
+        seen = {rowid for rowid, _ in ranked}
+        rows = self._connection.execute(
+            f'{ranking} AND rowid >= ? ORDER BY rank LIMIT ?', (match_query, cutoff, limit)
+        ).fetchall()
+        ranked.extend(row for row in rows if row[0] not in seen)
+        return ranked[:limit], False
+
+    def _rank_within(self, sql: str, parameters: tuple, candidates: int) -> Optional[List[Tuple[int, float]]]:
+        # SQLite aborts the query when it took the steps of scoring more than `candidates` matches.
+        # Cached statements count their steps across runs, so the handler counts its own calls.
+        calls = []
+
+        def abort() -> bool:
+            calls.append(True)
+            return len(calls) * PROGRESS_STEPS > STEPS_PER_MATCH * candidates
+
+        self._connection.set_progress_handler(abort, PROGRESS_STEPS)
+        try:
+            return self._connection.execute(sql, parameters).fetchall()
+        except sqlite3.OperationalError:
+            # Interrupted by a newer query, which the search loader handles
+            if len(calls) * PROGRESS_STEPS <= STEPS_PER_MATCH * candidates:
+                raise
+            return None
+        finally:
+            self._connection.set_progress_handler(None, 0)
+
+    def _completions(self, prefix: str) -> List[str]:
+        prefix = fold_term(prefix)
+        rows = self._connection.execute(
+            'SELECT term FROM search_terms WHERE term >= ? AND term < ? LIMIT ?',
+            (prefix, prefix + '\U0010ffff', MAX_COMPLETIONS + 1)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def _snippet(self, match_query: str, rowid: int) -> Optional[str]:
+        row = self._connection.execute(
+            f"SELECT snippet(search, 1, '{MATCH_START}', '{MATCH_END}', '…', {SNIPPET_TOKENS}) "
+            'FROM search WHERE search MATCH ? AND rowid = ?',
+            (match_query, rowid)
+        ).fetchone()
+        return row[0] if row else None
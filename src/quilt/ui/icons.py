@@ -0,0 +1,124 @@
+import hashlib
+import os
+import sys
+import tempfile
+
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+DEFAULT_ICON_CACHE_SIZE = 256
+
+def user_cache_dir() -> str:
+    """Return the per-user cache directory for Quilt."""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+        return os.path.join(base, 'Quilt', 'Cache')
+    if sys.platform == 'darwin':
+        return os.path.expanduser('~/Library/Caches/Quilt')
+    return os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'quilt')
+
+
+class QuiltIconCache():
+    """Process-wide, bounded LRU cache for rendered icons.
+
+    Keys are (icon name, color, size, device pixel ratio) tuples, where size
+    also covers the padding of padded icons. Failed renders are cached as well,
+    so a missing icon is not looked up on disk on every paint.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_ICON_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[object]:
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: object) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+class QuiltRasterCache():
+    """Persistent, content-addressed cache of rasterized icons.
+
+    Rendered PNGs are stored in the user cache directory under a hash of the
+    source SVG, the target color, the pixel size and the padding. Editing an
+    icon or changing a palette entry therefore never serves a stale raster.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir or os.path.join(user_cache_dir(), 'icons')
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(svg_content: bytes, color: str, width: int, height: int, padding: int = 0) -> str:
+        digest = hashlib.blake2b(svg_content, digest_size=20)
+        digest.update(f'|{color.lower()}|{width}x{height}|{padding}'.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), 'rb') as file:
+                data = file.read()
+        except OSError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return data
+
+    def put(self, key: str, png_data: bytes) -> None:
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            # Write to a temporary file first so concurrent readers never see a partial PNG
+            fd, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as file:
+                file.write(png_data)
+            os.replace(temporary_path, path)
+        except OSError as e:
+            print(f"Failed to write icon cache entry: {e}")
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def _path(self, key: str) -> str:
+        # Shard by prefix to keep directories small
+        return os.path.join(self.cache_dir, key[:2], f'{key}.png')
+
+
+icon_cache = QuiltIconCache()
+raster_cache = QuiltRasterCache()
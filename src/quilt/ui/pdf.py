@@ -0,0 +1,310 @@
+import bisect
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Hashable, List, Optional
+
+from PySide6.QtCore import QPointF, QRect, QRectF, QSize, QSizeF, Qt, Signal, Slot
+from PySide6.QtGui import QImage, QPainter
+from PySide6.QtPdf import QPdfDocument, QPdfDocumentRenderOptions
+from PySide6.QtWidgets import QAbstractScrollArea, QWidget
+
+DEFAULT_RENDER_WORKERS = 2
+DEFAULT_TILE_CACHE_BYTES = 128 * 1024 * 1024
+
+# Tiles are square, in device pixels
+TILE_SIZE = 512
+
+# Logical pixels between and around pages
+PAGE_SPACING = 12
+
+# Zoom 1.0 shows a page at its printed size on a 96 dpi screen
+POINTS_TO_PIXELS = 96 / 72
+MIN_ZOOM = 0.1
+MAX_ZOOM = 8.0
+
+
+class QuiltTileCache():
+    """Bounded LRU cache of rendered page tiles, limited by image memory.
+
+    Keys are (document generation, page, scaled page width, tile column, tile
+    row) tuples, so tiles of other zoom levels stay cached until evicted and
+    zooming back is instant.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_TILE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[QImage]:
+        image = self._entries.get(key)
+        if image is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return image
+
+    def put(self, key: Hashable, image: QImage) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size_bytes -= previous.sizeInBytes()
+
+        self._entries[key] = image
+        self.size_bytes += image.sizeInBytes()
+
+        while self.size_bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.size_bytes -= evicted.sizeInBytes()
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.size_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+class QuiltPdfView(QAbstractScrollArea):
+    """Continuous, in-process PDF view backed by QtPdf.
+
+    Pages are laid out top to bottom and split into square tiles. Painting
+    only draws tiles of the visible pages at the current zoom; missing tiles
+    are rendered on worker threads and kept in a QuiltTileCache. Requests for
+    tiles that scrolled out of view before a worker got to them are dropped.
+
+    Opening a document only reads the first page size, so large documents
+    show immediately; the other page sizes are read in the background and
+    the layout is corrected once they are known.
+    """
+    _tile_ready = Signal(object, object)
+    _page_sizes_ready = Signal(int, object)
+
+    def __init__(self, parent: Optional[QWidget] = None, workers: int = DEFAULT_RENDER_WORKERS,
+                 tile_cache: Optional[QuiltTileCache] = None):
+        super().__init__(parent)
+        self.setObjectName("pdf-view")
+        self.viewport().setAttribute(Qt.WA_OpaquePaintEvent)
+
+        self.document = None
+        self.tile_cache = tile_cache or QuiltTileCache()
+        self.zoom = 1.0
+        self.fit_width = True
+
+        # Page geometry in points and layout in logical pixels
+        self._page_sizes: List[QSizeF] = []
+        self._page_tops: List[float] = []
+        self._content_width = 0.0
+
+        # Bumped per document, so late tiles of a previous one are ignored
+        self._generation = 0
+        self._pending = set()
+        self._wanted = frozenset()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='quilt-pdf')
+
+        self._tile_ready.connect(self._store_tile, Qt.QueuedConnection)
+        self._page_sizes_ready.connect(self._apply_page_sizes, Qt.QueuedConnection)
+
+    def load(self, pdf_path: str) -> bool:
+        # A fresh document per file, workers may still hold on to the previous one
+        document = QPdfDocument()
+        if document.load(pdf_path) != QPdfDocument.Error.None_ or document.pageCount() == 0:
+            return False
+
+        self.document = document
+        self._generation += 1
+        self._pending.clear()
+        self.tile_cache.clear()
+
+        # Assume every page matches the first one until the real sizes are read
+        first_page = document.pagePointSize(0)
+        self._page_sizes = [first_page] * document.pageCount()
+        self._executor.submit(self._read_page_sizes, document, self._generation)
+
+        self.verticalScrollBar().setValue(0)
+        self._relayout()
+        return True
+
+    def page_count(self) -> int:
+        return len(self._page_sizes)
+
+    def current_page(self) -> int:
+        return max(bisect.bisect_right(self._page_tops, self.verticalScrollBar().value()) - 1, 0)
+
+    def set_zoom(self, zoom: float) -> None:
+        self.fit_width = False
+        self._set_zoom(zoom)
+
+    def _set_zoom(self, zoom: float) -> None:
+        zoom = min(max(zoom, MIN_ZOOM), MAX_ZOOM)
+        if zoom == self.zoom:
+            return
+
+        # Keep the same point of the document at the top of the viewport
+        page = self.current_page()
+        offset = 0.0
+        if self._page_tops:
+            offset = (self.verticalScrollBar().value() - self._page_tops[page]) / self.zoom
+
+        self.zoom = zoom
+        self._relayout()
+        if self._page_tops:
+            self.verticalScrollBar().setValue(round(self._page_tops[page] + offset * zoom))
+
+    def _page_scale(self) -> float:
+        return self.zoom * POINTS_TO_PIXELS
+
+    def _relayout(self) -> None:
+        if self.fit_width and self._page_sizes:
+            widest = max(self._page_sizes, key=QSizeF.width).width()
+            available = max(self.viewport().width() - 2 * PAGE_SPACING, 1)
+            self.zoom = min(max(available / (widest * POINTS_TO_PIXELS), MIN_ZOOM), MAX_ZOOM)
+
+        scale = self._page_scale()
+        tops = []
+        y = PAGE_SPACING
+        width = 0.0
+        for size in self._page_sizes:
+            tops.append(y)
+            y += size.height() * scale + PAGE_SPACING
+            width = max(width, size.width() * scale)
+
+        self._page_tops = tops
+        self._content_width = width + 2 * PAGE_SPACING
+        content_height = y
+
+        viewport = self.viewport().size()
+        self.verticalScrollBar().setRange(0, max(round(content_height) - viewport.height(), 0))
+        self.verticalScrollBar().setPageStep(viewport.height())
+        self.verticalScrollBar().setSingleStep(48)
+        self.horizontalScrollBar().setRange(0, max(round(self._content_width) - viewport.width(), 0))
+        self.horizontalScrollBar().setPageStep(viewport.width())
+        self.viewport().update()
+
+    def _read_page_sizes(self, document: QPdfDocument, generation: int) -> None:
+        sizes = [document.pagePointSize(page) for page in range(document.pageCount())]
+        self._page_sizes_ready.emit(generation, sizes)
+
+    @Slot(int, object)
+    def _apply_page_sizes(self, generation: int, sizes: list) -> None:
+        if generation != self._generation or sizes == self._page_sizes:
+            return
+
+        # Stay on the same page when the real sizes shift the layout
+        page = self.current_page()
+        self._page_sizes = sizes
+        self._relayout()
+        self.verticalScrollBar().setValue(round(self._page_tops[page]))
+
+    def paintEvent(self, event) -> None:
+        painter = QPainter(self.viewport())
+        painter.fillRect(event.rect(), self.palette().window())
+        if self.document is None:
+            return
+
+        ratio = self.devicePixelRatioF()
+        scale = self._page_scale()
+        top = self.verticalScrollBar().value()
+        left = self.horizontalScrollBar().value()
+        viewport = QRectF(self.viewport().rect())
+
+        wanted = set()
+        missing = []
+        page = max(bisect.bisect_right(self._page_tops, top) - 1, 0)
+        while page < len(self._page_sizes) and self._page_tops[page] - top < viewport.height():
+            size = self._page_sizes[page]
+            page_rect = QRectF((self._content_width - size.width() * scale) / 2 - left,
+                               self._page_tops[page] - top, size.width() * scale, size.height() * scale)
+            painter.fillRect(page_rect, Qt.white)
+            self._paint_tiles(painter, page, page_rect, viewport.intersected(page_rect), ratio, wanted, missing)
+            page += 1
+
+        # Workers skip queued tiles that are no longer visible, so publish the set before queueing
+        self._wanted = frozenset(wanted)
+        for key, scaled_size, clip in missing:
+            self._pending.add(key)
+            self._executor.submit(self._render_tile, self.document, key, scaled_size, clip, ratio)
+
+    def _paint_tiles(self, painter: QPainter, page: int, page_rect: QRectF, visible: QRectF, ratio: float,
+                     wanted: set, missing: list) -> None:
+        if visible.isEmpty():
+            return
+
+        scaled_size = QSize(round(page_rect.width() * ratio), round(page_rect.height() * ratio))
+        first_column = int((visible.left() - page_rect.left()) * ratio) // TILE_SIZE
+        last_column = int((visible.right() - page_rect.left()) * ratio) // TILE_SIZE
+        first_row = int((visible.top() - page_rect.top()) * ratio) // TILE_SIZE
+        last_row = int((visible.bottom() - page_rect.top()) * ratio) // TILE_SIZE
+
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                clip = QRect(column * TILE_SIZE, row * TILE_SIZE, TILE_SIZE, TILE_SIZE).intersected(
+                    QRect(0, 0, scaled_size.width(), scaled_size.height()))
+                if clip.isEmpty():
+                    continue
+
+                key = (self._generation, page, scaled_size.width(), column, row)
+                image = self.tile_cache.get(key)
+                if image is not None:
+                    painter.drawImage(QPointF(page_rect.left() + clip.left() / ratio,
+                                              page_rect.top() + clip.top() / ratio), image)
+                    continue
+
+                wanted.add(key)
+                if key not in self._pending:
+                    missing.append((key, scaled_size, clip))
+
+    def _render_tile(self, document: QPdfDocument, key: tuple, scaled_size: QSize, clip: QRect,
+                     ratio: float) -> None:
+        if key not in self._wanted:
+            self._tile_ready.emit(key, None)
+            return
+
+        options = QPdfDocumentRenderOptions()
+        options.setScaledSize(scaled_size)
+        options.setScaledClipRect(clip)
+        image = document.render(key[1], clip.size(), options)
+        image.setDevicePixelRatio(ratio)
+        self._tile_ready.emit(key, image)
+
+    @Slot(object, object)
+    def _store_tile(self, key: tuple, image: Optional[QImage]) -> None:
+        self._pending.discard(key)
+        if image is None or image.isNull() or key[0] != self._generation:
+            return
+
+        self.tile_cache.put(key, image)
+        self.viewport().update()
+
+    def resizeEvent(self, event) -> None:
+        super().resizeEvent(event)
+        self._relayout()
+
+    def scrollContentsBy(self, dx: int, dy: int) -> None:
+        self.viewport().update()
+
+    def wheelEvent(self, event) -> None:
+        if event.modifiers() & Qt.ControlModifier:
+            steps = event.angleDelta().y() / 120
+            self.set_zoom(self.zoom * 1.15 ** steps)
+            event.accept()
+            return
+        super().wheelEvent(event)
@@ -0,0 +1,61 @@
+import re
+
+from functools import lru_cache
+from typing import Dict
+
+# Presentation attributes and CSS properties that carry a color
+COLOR_PROPERTIES = ('fill', 'stroke', 'stop-color', 'flood-color', 'lighting-color', 'color')
+
+# One alternation for every color-bearing context: fill="#abc", stroke='ABCDEF',
+# style="fill: #aabbcc; stroke:currentColor" and rules inside <style> blocks.
+_COLOR_PATTERN = re.compile(
+    r'(?P<prefix>(?<![\w-])(?:' + '|'.join(re.escape(name) for name in COLOR_PROPERTIES) + r')'
+    r'\s*(?:=\s*["\']\s*|:\s*))'
+    r'(?P<value>#?[0-9a-f]{6}|#?[0-9a-f]{3}|currentColor)(?![0-9a-z-])',
+    re.IGNORECASE
+)
+
+def normalize_color(color: str) -> str:
+    """Normalize a color to lowercase 6-digit '#rrggbb', or 'currentcolor'."""
+    color = color.strip().lower()
+    if color == 'currentcolor':
+        return color
+
+    color = color.lstrip('#')
+    if len(color) == 3:
+        color = ''.join(channel * 2 for channel in color)
+    return f'#{color}'
+
+
+class QuiltSvgRecolorer():
+    """Applies a color mapping to SVG markup in a single pass.
+
+    A single precompiled regular expression finds every color value in fill,
+    stroke and related attributes as well as in style attributes and <style>
+    rules. Each match is normalized and looked up in the mapping, so the cost
+    does not depend on the number of mapped colors. 3-digit hex values and
+    `currentColor` are matched as well; map 'currentColor' to resolve it.
+    """
+
+    def __init__(self, color_mapping: Dict[str, str]):
+        self.color_mapping = {normalize_color(old): new for old, new in color_mapping.items()}
+
+    def recolor(self, svg_content: str) -> str:
+        if not self.color_mapping:
+            return svg_content
+        return _COLOR_PATTERN.sub(self._replace, svg_content)
+
+    def _replace(self, match: re.Match) -> str:
+        new_color = self.color_mapping.get(normalize_color(match.group('value')))
+        if new_color is None:
+            return match.group(0)
+        return match.group('prefix') + new_color
+
+
+@lru_cache(maxsize=64)
+def _recolorer(mapping_items: frozenset) -> QuiltSvgRecolorer:
+    return QuiltSvgRecolorer(dict(mapping_items))
+
+def recolor_svg(svg_content: str, color_mapping: Dict[str, str]) -> str:
+    """Recolor SVG markup, reusing the recolorer for mappings seen before."""
+    return _recolorer(frozenset(color_mapping.items())).recolor(svg_content)
@@ -0,0 +1,47 @@
+from PySide6.QtCore import QBuffer, QByteArray, QIODevice, QRectF, Qt
+from PySide6.QtGui import QImage, QPainter, QPixmap
+from PySide6.QtSvg import QSvgRenderer
+
+def render_svg_image(svg_content: str, width: int, height: int, padding: int = 0,
+                     device_pixel_ratio: float = 1.0) -> QImage:
+    """Paint SVG markup straight into a transparent QImage.
+
+    `width`, `height` and `padding` are logical sizes; the image is allocated at
+    device resolution and tagged with the pixel ratio. The icon is drawn at
+    (size - padding) and centered, matching pad_png_data. No intermediate PNG
+    is encoded or decoded. Returns a null image if the SVG cannot be parsed.
+    """
+    renderer = QSvgRenderer(QByteArray(svg_content.encode('utf-8')))
+    if not renderer.isValid():
+        return QImage()
+    renderer.setAspectRatioMode(Qt.KeepAspectRatio)
+
+    pixel_width = round(width * device_pixel_ratio)
+    pixel_height = round(height * device_pixel_ratio)
+    pixel_padding = round(padding * device_pixel_ratio)
+
+    image = QImage(pixel_width, pixel_height, QImage.Format_ARGB32_Premultiplied)
+    image.fill(Qt.transparent)
+
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.Antialiasing)
+    painter.setRenderHint(QPainter.SmoothPixmapTransform)
+    renderer.render(painter, QRectF(pixel_padding // 2, pixel_padding // 2,
+                                    pixel_width - pixel_padding, pixel_height - pixel_padding))
+    painter.end()
+
+    image.setDevicePixelRatio(device_pixel_ratio)
+    return image
+
+def render_svg_pixmap(svg_content: str, width: int, height: int, padding: int = 0,
+                      device_pixel_ratio: float = 1.0) -> QPixmap:
+    """Like render_svg_image, but returns a pixmap ready for a QIcon. GUI thread only."""
+    image = render_svg_image(svg_content, width, height, padding, device_pixel_ratio)
+    return QPixmap.fromImage(image) if not image.isNull() else QPixmap()
+
+def image_png_data(image: QImage) -> bytes:
+    """Encode a QImage as PNG data. Safe off the GUI thread."""
+    buffer = QBuffer()
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, 'PNG')
+    return bytes(buffer.data())
@@ -0,0 +1,62 @@
+import os
+import re
+
+from functools import lru_cache
+from typing import Dict, Optional
+
+from PySide6.QtWidgets import QApplication
+
+from src.quilt.ui.colors import COLORS
+
+# Colors the stylesheets use that are not part of the palette
+STYLE_VARIABLES = {
+    'background': '#eaeaeb',
+    'view-background': '#ffffff',
+    'handle-active': '#b0b0b0',
+}
+
+_COMMENT_PATTERN = re.compile(r'/\*.*?\*/', re.DOTALL)
+_VARIABLE_PATTERN = re.compile(r'@([a-z][a-z0-9_-]*)', re.IGNORECASE)
+
+def stylesheet_variables() -> Dict[str, str]:
+    """Return every variable a stylesheet can reference, palette colors first."""
+    return {**COLORS, **STYLE_VARIABLES}
+
+def resolve_variables(style_sheet: str, variables: Optional[Dict[str, str]] = None) -> str:
+    """Strip comments and replace every @name with its value.
+
+    Raises a ValueError naming the first unknown variable, so a typo fails when
+    the sheet is compiled instead of silently dropping the rule.
+    """
+    variables = stylesheet_variables() if variables is None else variables
+
+    def replace(match: re.Match) -> str:
+        name = match.group(1)
+        if name not in variables:
+            raise ValueError(f"Unknown stylesheet variable: @{name}")
+        return variables[name]
+
+    return _VARIABLE_PATTERN.sub(replace, _COMMENT_PATTERN.sub('', style_sheet))
+
+@lru_cache(maxsize=None)
+def _compile_stylesheet(style_path: str, mtime: float) -> str:
+    with open(style_path, 'r', encoding='utf-8') as file:
+        return resolve_variables(file.read())
+
+def compile_stylesheet(style_name: str) -> str:
+    """Return the compiled stylesheet, cached until the .qss file changes."""
+    style_path = f'styles/{style_name}.qss'
+    return _compile_stylesheet(style_path, os.path.getmtime(style_path))
+
+def apply_stylesheet(style_name: str = 'quilt-style', app: Optional[QApplication] = None) -> str:
+    """Set the compiled stylesheet once on the application.
+
+    Every widget inherits it from there, so it is parsed a single time instead
+    of once per top-level or container widget. Widgets that need extra rules
+    set only those rules on themselves.
+    """
+    app = app or QApplication.instance()
+    style_sheet = compile_stylesheet(style_name)
+    if app.styleSheet() != style_sheet:
+        app.setStyleSheet(style_sheet)
+    return style_sheet
@@ -0,0 +1,206 @@
+import os
+import threading
+
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from PySide6.QtCore import QObject, Qt, Signal, Slot
+from PySide6.QtGui import QIcon, QImage, QPixmap
+
+from src.quilt.jobs import PRIORITY_NORMAL, QuiltJob, QuiltJobCancelled, job_runtime
+from src.quilt.ui import utils
+from src.quilt.ui.colors import COLORS
+from src.quilt.ui.icons import icon_cache
+
+# (width, height, padding) and pixel ratios every theme is rendered at: toolbar icons and tree carets
+THEME_ICON_SIZES = ((64, 64, 0), (32, 32, 12))
+THEME_PIXEL_RATIOS = (1.0, 2.0)
+
+# Icons rendered per job, so a theme is spread over all thread workers of the job runtime
+THEME_CHUNK_SIZE = 4
+
+def bundled_icon_names():
+    return sorted(os.path.splitext(file_name)[0]
+                  for file_name in os.listdir('assets/icons') if file_name.endswith('.svg'))
+
+def render_theme_icons(color_name: str, icon_names: List[str], sizes=THEME_ICON_SIZES,
+                       device_pixel_ratios=THEME_PIXEL_RATIOS) -> Dict[Tuple[str, int, int, int], QImage]:
+    """Recolor and render icons for a palette color, on the calling thread.
+
+    Icons are painted through paint_icon_image, the same path the UI loads
+    them through. Returns images keyed by (icon name, pixel width, pixel
+    height, pixel padding). Safe off the GUI thread.
+    """
+    icons = {}
+    for icon_name in icon_names:
+        for width, height, padding in sizes:
+            for ratio in device_pixel_ratios:
+                image = utils.paint_icon_image(icon_name, color_name, width, height, padding, ratio)
+                if image.isNull():
+                    print(f"Error rendering {icon_name} for theme {color_name}")
+                    continue
+
+                icons[(icon_name, round(width * ratio), round(height * ratio), round(padding * ratio))] = image
+
+    return icons
+
+def _render_theme_chunk(job: QuiltJob, color_name: str, icon_names: List[str], sizes, device_pixel_ratios) -> dict:
+    job.check_cancelled()
+    return render_theme_icons(color_name, icon_names, sizes, device_pixel_ratios)
+
+def submit_theme(color_name: str, sizes=THEME_ICON_SIZES, device_pixel_ratios=THEME_PIXEL_RATIOS,
+                 priority: int = PRIORITY_NORMAL) -> List[QuiltJob]:
+    """Queue the whole icon set of a palette color on the thread lane of the job runtime.
+
+    The icons are split into chunks of THEME_CHUNK_SIZE, one job each, whose
+    futures complete with render_theme_icons results. QSvgRenderer paints
+    without holding the GIL, so the chunks render in parallel.
+    """
+    if color_name not in COLORS:
+        raise ValueError(f"Unknown palette color: {color_name}")
+
+    icon_names = bundled_icon_names()
+    return [
+        job_runtime().submit(f'Rendering {color_name} icons', _render_theme_chunk, color_name,
+                             icon_names[first:first + THEME_CHUNK_SIZE], sizes, device_pixel_ratios,
+                             priority=priority, tracked=False)
+        for first in range(0, len(icon_names), THEME_CHUNK_SIZE)
+    ]
+
+def build_theme(color_name: str, sizes=THEME_ICON_SIZES,
+                device_pixel_ratios=THEME_PIXEL_RATIOS) -> Dict[Tuple[str, int, int, int], QImage]:
+    """Render the whole icon set for a palette color in parallel and wait for it.
+
+    Blocks the calling thread, which must not be a job runtime worker; the UI
+    uses QuiltThemeManager.apply_theme instead.
+    """
+    icons = {}
+    for job in submit_theme(color_name, sizes, device_pixel_ratios):
+        icons.update(job.future.result())
+    return icons
+
+def prerender_icons(color_names=None, sizes=THEME_ICON_SIZES, device_pixel_ratios=THEME_PIXEL_RATIOS) -> int:
+    """Render every palette theme into the persistent raster cache, for the stylesheet icon files.
+
+    Returns the number of icons available in the cache afterwards.
+    """
+    cached = 0
+    for color_name in color_names or COLORS:
+        for icon_name in bundled_icon_names():
+            for width, height, padding in sizes:
+                for ratio in device_pixel_ratios:
+                    if utils.render_icon_png_data(icon_name, color_name, width, height, padding, ratio):
+                        cached += 1
+    return cached
+
+
+class QuiltThemeManager(QObject):
+    """Switches the icon color of the running UI.
+
+    Widgets register their icons with `bind_icon`. `apply_theme` renders the
+    new theme into QImages on the job runtime, in parallel. Once every chunk
+    is done, the GUI thread swaps the current color, primes the icon cache and
+    re-applies every bound icon in a single step before emitting
+    `theme_changed`.
+    """
+    theme_changed = Signal(str)
+    _theme_built = Signal(str, object)
+
+    def __init__(self, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self._bindings = {}
+        self._building = None
+        self._jobs = []
+        self._theme_built.connect(self._swap_theme, Qt.QueuedConnection)
+
+    @property
+    def color_name(self) -> str:
+        """The palette color icons are rendered in, or the one being switched to."""
+        return self._building or utils.CURRENT_COLOR_NAME
+
+    def bind_icon(self, target: QObject, icon_name: str, width: int = 64, height: int = 64) -> QIcon:
+        """Set an icon on `target` through its setIcon method and keep it updated on theme changes."""
+        icon = utils.load_icon(icon_name, width, height)
+        target.setIcon(icon)
+
+        key = id(target)
+        if key not in self._bindings:
+            target.destroyed.connect(lambda *_: self._bindings.pop(key, None))
+        self._bindings[key] = (target, icon_name, width, height)
+        return icon
+
+    def apply_theme(self, color_name: str) -> None:
+        if color_name not in COLORS:
+            raise ValueError(f"Unknown palette color: {color_name}")
+        if color_name == utils.CURRENT_COLOR_NAME or color_name == self._building:
+            return
+
+        # A theme still being rendered is superseded
+        for job in self._jobs:
+            job.cancel()
+
+        self._building = color_name
+        self._jobs = submit_theme(color_name)
+
+        icons = {}
+        remaining = [len(self._jobs)]
+        lock = threading.Lock()
+
+        def chunk_done(future: Future) -> None:
+            # Called on the worker that finished the chunk
+            with lock:
+                error = future.exception() if not future.cancelled() else QuiltJobCancelled()
+                if error is None:
+                    icons.update(future.result())
+                elif not isinstance(error, QuiltJobCancelled):
+                    print(f"Error building theme {color_name}: {error}")
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+
+            # Still switch if chunks failed, their icons are then rendered on demand.
+            # QImage is safe off the GUI thread, QPixmap is not
+            self._theme_built.emit(color_name, icons)
+
+        if not self._jobs:
+            self._theme_built.emit(color_name, icons)
+        for job in self._jobs:
+            job.future.add_done_callback(chunk_done)
+
+    @Slot(str, object)
+    def _swap_theme(self, color_name: str, images: dict) -> None:
+        if color_name != self._building:
+            # Superseded by a later apply_theme call
+            return
+        self._building = None
+        self._jobs = []
+
+        utils.set_current_color(color_name)
+        icon_cache.clear()
+
+        # Prime the icon cache for the current pixel ratio
+        ratio = utils.device_pixel_ratio()
+        icon_names = bundled_icon_names()
+        for width, height, padding in THEME_ICON_SIZES:
+            for icon_name in icon_names:
+                image = images.get((icon_name, round(width * ratio), round(height * ratio), round(padding * ratio)))
+                if image is None:
+                    continue
+
+                icon_cache.put((icon_name, color_name, (width, height, padding), ratio),
+                               QIcon(QPixmap.fromImage(image)))
+
+        for target, icon_name, width, height in list(self._bindings.values()):
+            target.setIcon(utils.load_icon(icon_name, width, height))
+
+        self.theme_changed.emit(color_name)
+
+
+_theme_manager = None
+
+def theme_manager() -> QuiltThemeManager:
+    """Return the process-wide theme manager."""
+    global _theme_manager
+    if _theme_manager is None:
+        _theme_manager = QuiltThemeManager()
+    return _theme_manager
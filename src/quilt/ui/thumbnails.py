@@ -0,0 +1,210 @@
+import hashlib
+import heapq
+import itertools
+import os
+import threading
+
+from typing import Optional
+
+from PySide6.QtCore import QBuffer, QIODevice, QObject, QSize, Qt, Signal, Slot
+from PySide6.QtGui import QIcon, QImage, QPainter, QPixmap
+
+from src.quilt.jobs import PRIORITY_VISIBLE, QuiltJob, QuiltJobRuntime, job_runtime
+from src.quilt.ui.icons import QuiltIconCache, QuiltRasterCache, user_cache_dir
+from src.quilt.workspace import QuiltWorkspace
+
+DEFAULT_THUMBNAIL_SIZE = 64
+DEFAULT_THUMBNAIL_WORKERS = 2
+DEFAULT_MAX_PENDING = 256
+DEFAULT_MEMORY_ENTRIES = 2048
+
+
+def thumbnail_cache_key(path: str, size: int, last_modified: float, pixel_size: int) -> str:
+    """Key a thumbnail by the file's path, size and mtime, so edits never serve a stale preview."""
+    digest = hashlib.blake2b(f'{path}|{size}|{last_modified!r}|{pixel_size}'.encode('utf-8'), digest_size=20)
+    return digest.hexdigest()
+
+def thumbnail_content_key(content_hash: str, pixel_size: int) -> str:
+    """Key a thumbnail by the file's contents, so renamed, moved and copied files share their preview."""
+    return hashlib.blake2b(f'{content_hash}|{pixel_size}'.encode('utf-8'), digest_size=20).hexdigest()
+
+def render_pdf_thumbnail(path: str, pixel_size: int) -> Optional[QImage]:
+    """Render the first page of a PDF, centered on a transparent square of `pixel_size`."""
+    from PySide6.QtPdf import QPdfDocument
+
+    document = QPdfDocument()
+    if document.load(path) != QPdfDocument.Error.None_ or document.pageCount() == 0:
+        return None
+
+    page_size = document.pagePointSize(0)
+    if page_size.isEmpty():
+        return None
+    scale = pixel_size / max(page_size.width(), page_size.height())
+    page = document.render(0, QSize(max(round(page_size.width() * scale), 1),
+                                    max(round(page_size.height() * scale), 1)))
+    document.close()
+    if page.isNull():
+        return None
+
+    image = QImage(pixel_size, pixel_size, QImage.Format_ARGB32_Premultiplied)
+    image.fill(Qt.transparent)
+    painter = QPainter(image)
+    painter.drawImage((pixel_size - page.width()) // 2, (pixel_size - page.height()) // 2, page)
+    painter.end()
+    return image
+
+
+class QuiltThumbnailService(QObject):
+    """Renders first-page previews of the workspace PDFs in the background.
+
+    `icon` never blocks: it answers from an in-memory LRU or returns None and
+    queues the file. Queued files are served most recently requested first,
+    so the rows currently being painted win over rows that scrolled away, and
+    the queue is capped by dropping its oldest requests. The queue is served
+    by at most `workers` jobs on the job runtime, which only run while there
+    are requests. They look in the persistent thumbnail cache before
+    rendering with QtPdf; it is keyed by content hash, so renaming or moving
+    files does not render them again. `thumbnail_ready` is emitted on the GUI
+    thread with the absolute path of the file.
+    """
+    thumbnail_ready = Signal(str)
+    _rendered = Signal(str, object, object)
+
+    def __init__(self, workspace: QuiltWorkspace, parent: Optional[QObject] = None,
+                 size: int = DEFAULT_THUMBNAIL_SIZE, workers: int = DEFAULT_THUMBNAIL_WORKERS,
+                 max_pending: int = DEFAULT_MAX_PENDING, cache: Optional[QuiltRasterCache] = None,
+                 runtime: Optional[QuiltJobRuntime] = None):
+        super().__init__(parent)
+        self.workspace = workspace
+        self.size = size
+        self.workers = workers
+        self.max_pending = max_pending
+        self.runtime = runtime
+        self.cache = cache or QuiltRasterCache(os.path.join(user_cache_dir(), 'thumbnails'))
+        self.memory = QuiltIconCache(DEFAULT_MEMORY_ENTRIES)
+
+        # path -> sequence of its latest request, the heap holds (-sequence, path)
+        self._pending = {}
+        self._queue = []
+        self._in_flight = set()
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._jobs = 0
+        self._stopped = False
+
+        self._rendered.connect(self._store, Qt.QueuedConnection)
+
+    def icon(self, path: str, device_pixel_ratio: float = 1.0) -> Optional[QIcon]:
+        """Return the thumbnail of a PDF if it is ready, otherwise queue it and return None."""
+        entry = self.workspace.find_pdf_from_path(path)
+        if entry is None:
+            return None
+
+        pixel_size = round(self.size * device_pixel_ratio)
+        key = thumbnail_cache_key(str(entry.path), entry.size, entry.last_modified, pixel_size)
+        icon = self.memory.get(key)
+        if icon is not None:
+            return icon if not icon.isNull() else None
+
+        self._request(path, key, pixel_size, device_pixel_ratio, (entry.file_id, entry.size, entry.last_modified))
+        return None
+
+    def stop(self) -> None:
+        # Jobs stop after the thumbnail they are rendering
+        with self._lock:
+            self._stopped = True
+            self._pending.clear()
+            self._queue.clear()
+            self._in_flight.clear()
+
+    def _request(self, path: str, key: str, pixel_size: int, device_pixel_ratio: float, file: tuple) -> None:
+        with self._lock:
+            if self._stopped or path in self._in_flight:
+                return
+
+            sequence = next(self._sequence)
+            self._pending[path] = (sequence, key, pixel_size, device_pixel_ratio, file)
+            heapq.heappush(self._queue, (-sequence, path))
+
+            if len(self._pending) > self.max_pending:
+                # Forget the request that waited longest, its row is most likely off screen
+                oldest = min(self._pending, key=lambda pending: self._pending[pending][0])
+                del self._pending[oldest]
+
+            # Stale heap entries are skipped by the jobs, compact once they pile up
+            if len(self._queue) > 4 * self.max_pending:
+                self._queue = [(-request[0], pending) for pending, request in self._pending.items()]
+                heapq.heapify(self._queue)
+
+            start_job = self._jobs < self.workers
+            if start_job:
+                self._jobs += 1
+
+        if start_job:
+            # Untracked, the jobs panel would only flicker with every row scrolled into view
+            (self.runtime or job_runtime()).submit('Rendering thumbnails', self._work, priority=PRIORITY_VISIBLE,
+                                                   tracked=False)
+
+    def _next_request(self, job: QuiltJob):
+        with self._lock:
+            while self._queue and not self._stopped and not job.cancelled():
+                negative_sequence, path = heapq.heappop(self._queue)
+                request = self._pending.get(path)
+                if request is not None and request[0] == -negative_sequence:
+                    del self._pending[path]
+                    self._in_flight.add(path)
+                    return (path, *request[1:])
+
+            # The queue is empty, the next request starts a new job
+            self._jobs -= 1
+            return None
+
+    def _work(self, job: QuiltJob) -> None:
+        while True:
+            request = self._next_request(job)
+            if request is None:
+                return
+
+            path, key, pixel_size, device_pixel_ratio, file = request
+            try:
+                image = self._load(path, file, pixel_size)
+            except Exception as e:
+                print(f"Error rendering thumbnail for {path}: {e}")
+                image = None
+
+            if image is not None:
+                image.setDevicePixelRatio(device_pixel_ratio)
+            self._rendered.emit(path, key, image)
+
+    def _load(self, path: str, file: tuple, pixel_size: int) -> Optional[QImage]:
+        # The hash is usually known, files are only read when the extraction has not reached them yet
+        digest = self.workspace.hashes.content_hash(*file)
+        key = thumbnail_content_key(digest, pixel_size) if digest else thumbnail_cache_key(path, *file[1:], pixel_size)
+
+        png_data = self.cache.get(key)
+        if png_data:
+            image = QImage.fromData(png_data)
+            if not image.isNull():
+                return image
+
+        image = render_pdf_thumbnail(path, pixel_size)
+        if image is None:
+            return None
+
+        buffer = QBuffer()
+        buffer.open(QIODevice.WriteOnly)
+        image.save(buffer, 'PNG')
+        self.cache.put(key, bytes(buffer.data()))
+        return image
+
+    @Slot(str, object, object)
+    def _store(self, path: str, key: str, image: Optional[QImage]) -> None:
+        with self._lock:
+            self._in_flight.discard(path)
+            if self._stopped:
+                return
+
+        # Failures are remembered as an empty icon, so broken files are not retried on every paint
+        self.memory.put(key, QIcon(QPixmap.fromImage(image)) if image is not None else QIcon())
+        if image is not None:
+            self.thumbnail_ready.emit(path)
@@ -0,0 +1,500 @@
+import os
+
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional
+
+from PySide6.QtCore import QAbstractItemModel, QModelIndex, QObject, Qt, Slot
+
+from src.quilt.filtering import QuiltFilterResult
+from src.quilt.index import QuiltWorkspaceChanges
+from src.quilt.ui.thumbnails import QuiltThumbnailService
+from src.quilt.ui.utils import device_pixel_ratio, load_icon
+from src.quilt.workspace import QuiltWorkspace
+
+# Rows a folder shows per fetchMore, the view asks for more as it scrolls
+FETCH_BATCH = 256
+
+_FILE_ICONS = {
+    '.md': 'file-md',
+    '.pdf': 'file-pdf',
+    '.png': 'file-image',
+    '.jpg': 'file-image',
+    '.jpeg': 'file-image',
+    '.gif': 'file-image',
+}
+
+# Combined once, the view asks for the flags of every row it lays out
+_FOLDER_FLAGS = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+_FILE_FLAGS = _FOLDER_FLAGS | Qt.ItemNeverHasChildren
+
+
+class QuiltTreeDirectory():
+    """A folder of the navigation tree.
+
+    Children are kept as names: subfolders in `directories`, files in `files`.
+    Both are sorted into `folder_rows` and `file_rows` the first time the folder
+    is expanded, folders first and case-insensitively, and only the first
+    `fetched` of those rows are shown, the rest are fetched as the view scrolls.
+    While the tree is filtered or sorted otherwise, the rows are those of the
+    filter result and `positions` finds a name in them.
+    """
+    __slots__ = ('path', 'name', 'parent', 'directories', 'files', 'folder_rows', 'file_rows', 'fetched', 'positions')
+
+    def __init__(self, path: str, name: str, parent: Optional['QuiltTreeDirectory']):
+        self.path = path
+        self.name = name
+        self.parent = parent
+        self.directories: Dict[str, QuiltTreeDirectory] = {}
+        self.files: Dict[str, None] = {}
+
+        # Sorted rows, None until the folder is fetched for the first time
+        self.folder_rows: Optional[List[str]] = None
+        self.file_rows: Optional[List[str]] = None
+        self.fetched = 0
+        self.positions: Optional[Dict[str, int]] = None
+
+
+class QuiltWorkspaceModel(QAbstractItemModel):
+    """Tree model of the workspace, built from the workspace index.
+
+    Unlike QFileSystemModel, nothing is listed or stat'ed here: folders and
+    files come from the index rows the workspace loader and watcher already
+    produce, applied through `apply_changes`. A folder is sorted when it is
+    first expanded and shows its rows in batches of FETCH_BATCH through
+    canFetchMore/fetchMore. Changes to a folder are inserted and removed as
+    contiguous row ranges, changes below the fetched rows are not announced
+    at all.
+
+    A QuiltFilterResult, computed off the GUI thread, replaces the rows of
+    every folder at once through `set_view`, as a single layout change.
+    While it is shown, new files only appear with the next result.
+    """
+
+    def __init__(self, workspace: QuiltWorkspace, parent: Optional[QObject] = None,
+                 thumbnails: Optional[QuiltThumbnailService] = None):
+        super().__init__(parent)
+        self.workspace = workspace
+        self.thumbnails = thumbnails
+
+        self._root = QuiltTreeDirectory('', '', None)
+        self._nodes: Dict[str, QuiltTreeDirectory] = {'': self._root}
+        self._view: Optional[QuiltFilterResult] = None
+
+        if thumbnails is not None:
+            thumbnails.thumbnail_ready.connect(self._thumbnail_ready)
+
+        # The root is always expanded, its first rows show as soon as they arrive
+        self._fetch(self._root, FETCH_BATCH)
+
+        # A workspace loaded up front is shown right away
+        if len(workspace.entries):
+            self.apply_changes(QuiltWorkspaceChanges(added=[entry.row() for entry in workspace.entries]))
+
+    # Qt model interface
+
+    def index(self, row: int, column: int, parent: QModelIndex = QModelIndex()) -> QModelIndex:
+        node = self._node(parent)
+        if node is None or column != 0 or not 0 <= row < node.fetched:
+            return QModelIndex()
+        return self.createIndex(row, 0, node)
+
+    def parent(self, index: QModelIndex = QModelIndex()) -> QModelIndex:
+        if not index.isValid():
+            return QModelIndex()
+        return self._index(index.internalPointer())
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        node = self._node(parent)
+        return node.fetched if node is not None else 0
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 1
+
+    def hasChildren(self, parent: QModelIndex = QModelIndex()) -> bool:
+        # Unfetched folders still show their caret
+        node = self._node(parent)
+        return node is not None and self._count(node) > 0
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        node = self._node(parent)
+        return node is not None and node.fetched < self._count(node)
+
+    def fetchMore(self, parent: QModelIndex) -> None:
+        node = self._node(parent)
+        if node is not None:
+            self._fetch(node, FETCH_BATCH)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        directory = index.internalPointer()
+        name = self._name(directory, index.row())
+        if role == Qt.DisplayRole:
+            return name
+        if role == Qt.DecorationRole:
+            # Icons come from the shared icon cache, nothing is rendered or stat'ed while painting
+            if index.row() < len(directory.folder_rows):
+                return load_icon("folder")
+
+            icon_name = _FILE_ICONS.get(os.path.splitext(name)[1].lower())
+            if icon_name == "file-pdf" and self.thumbnails is not None:
+                # PDF previews render in the background, the generic icon shows until they are ready
+                thumbnail = self.thumbnails.icon(self._absolute(directory.path, name), device_pixel_ratio())
+                if thumbnail is not None:
+                    return thumbnail
+            return load_icon(icon_name) if icon_name else None
+        return None
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        # Files never have children, so the view does not ask them
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return _FOLDER_FLAGS if index.row() < len(index.internalPointer().folder_rows) else _FILE_FLAGS
+
+    # Workspace interface
+
+    def file_path(self, index: QModelIndex) -> str:
+        """Return the absolute path of the file or folder at an index."""
+        if not index.isValid():
+            return self.workspace.workspace_dir
+        directory = index.internalPointer()
+        return self._absolute(directory.path, self._name(directory, index.row()))
+
+    def is_dir(self, index: QModelIndex) -> bool:
+        return index.isValid() and index.row() < len(index.internalPointer().folder_rows)
+
+    def index_for_path(self, path: str) -> QModelIndex:
+        """Return the index of a file or folder, invalid if it is not in the tree or not fetched yet."""
+        file_id = self.workspace.relative_path(path)
+        if file_id == '.':
+            return QModelIndex()
+
+        directory_path, name = os.path.split(file_id)
+        directory = self._nodes.get(directory_path)
+        if directory is None or directory.folder_rows is None:
+            return QModelIndex()
+        return self._locate(directory, name)
+
+    def reveal_path(self, path: str) -> QModelIndex:
+        """Fetch the rows leading to a file or folder and return its index, invalid if the tree does not show it."""
+        file_id = self.workspace.relative_path(path)
+        if file_id == '.':
+            return QModelIndex()
+
+        directory = self._root
+        names = file_id.split(os.sep)
+        for position, name in enumerate(names):
+            if directory.folder_rows is None:
+                self._sort(directory)
+            row = self._row(directory, name)
+            if row is None:
+                return QModelIndex()
+            if row >= directory.fetched:
+                # In whole batches, as if the view had scrolled there
+                self._fetch(directory, (row - directory.fetched) // FETCH_BATCH * FETCH_BATCH + FETCH_BATCH)
+            if position < len(names) - 1:
+                directory = directory.directories.get(name)
+                if directory is None:
+                    return QModelIndex()
+        return self._locate(directory, names[-1])
+
+    @Slot(object)
+    def apply_changes(self, changes: QuiltWorkspaceChanges) -> None:
+        """Apply an incremental index refresh, announcing only rows the view has fetched."""
+        # Folders that were complete before the change keep showing their new rows
+        touched = {}
+
+        removed_files = {}
+        for row in changes.removed + [old_row for old_row, _ in changes.renamed]:
+            removed_files.setdefault(row[1], []).append(row[2])
+        for directory_path, names in removed_files.items():
+            directory = self._nodes.get(directory_path)
+            if directory is not None:
+                touched.setdefault(directory, self._complete(directory))
+                self._remove(directory, (), [name for name in names if name in directory.files])
+
+        self._remove_directories(changes.removed_directories, touched)
+        self._add_directories(changes.added_directories, touched)
+
+        added_files = {}
+        for row in changes.added + [new_row for _, new_row in changes.renamed]:
+            added_files.setdefault(row[1], []).append(row[2])
+        for directory_path, names in added_files.items():
+            directory = self._directory(directory_path, touched)
+            touched.setdefault(directory, self._complete(directory))
+            self._add(directory, (), [name for name in dict.fromkeys(names) if name not in directory.files])
+
+        for row in changes.modified:
+            index = self.index_for_path(row[0])
+            if index.isValid():
+                self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+        # Folders nobody expanded yet stay unsorted
+        for directory, complete in touched.items():
+            if self._nodes.get(directory.path) is not directory or directory.folder_rows is None:
+                continue
+            if complete:
+                self._fetch(directory, FETCH_BATCH)
+            elif directory.fetched < FETCH_BATCH:
+                self._fetch(directory, FETCH_BATCH - directory.fetched)
+
+    @property
+    def view(self) -> Optional[QuiltFilterResult]:
+        return self._view
+
+    def set_view(self, result: Optional[QuiltFilterResult]) -> None:
+        """Show the tree as a filter result leaves it, None shows every file sorted by name.
+
+        Expanded folders that stay visible stay expanded, the others collapse.
+        """
+        if result is not None and result.is_default():
+            result = None
+        if result is None and self._view is None:
+            return
+
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        located = [(index.internalPointer(), self._name(index.internalPointer(), index.row())) for index in persistent]
+
+        self._view = result
+        for directory in self._nodes.values():
+            if directory.folder_rows is not None:
+                self._sort(directory)
+                directory.fetched = min(self._count(directory), max(directory.fetched, FETCH_BATCH))
+
+        self.changePersistentIndexList(persistent, [self._locate(directory, name) for directory, name in located])
+        self.layoutChanged.emit()
+
+    # Structure
+
+    def _node(self, index: QModelIndex) -> Optional[QuiltTreeDirectory]:
+        # The folder an index refers to, None for files
+        if not index.isValid():
+            return self._root
+        directory = index.internalPointer()
+        row = index.row()
+        if row < len(directory.folder_rows):
+            return directory.directories[directory.folder_rows[row]]
+        return None
+
+    def _index(self, directory: QuiltTreeDirectory) -> QModelIndex:
+        if directory.parent is None:
+            return QModelIndex()
+        row = self._find(directory.parent, directory.parent.folder_rows, directory.name)
+        return self.createIndex(row, 0, directory.parent)
+
+    def _locate(self, directory: QuiltTreeDirectory, name: str) -> QModelIndex:
+        # Invalid if the row is gone or not fetched
+        if self._nodes.get(directory.path) is not directory:
+            return QModelIndex()
+        row = self._row(directory, name)
+        if row is None or row >= directory.fetched:
+            return QModelIndex()
+        return self.createIndex(row, 0, directory)
+
+    def _row(self, directory: QuiltTreeDirectory, name: str) -> Optional[int]:
+        # The row among all sorted rows of a folder, fetched or not
+        if name in directory.directories:
+            return self._find(directory, directory.folder_rows, name)
+        row = self._find(directory, directory.file_rows, name)
+        return row + len(directory.folder_rows) if row is not None else None
+
+    def _count(self, directory: QuiltTreeDirectory) -> int:
+        if directory.folder_rows is not None:
+            return len(directory.folder_rows) + len(directory.file_rows)
+        if self._view is not None:
+            folders, files = self._view.children.get(directory.path, ((), ()))
+            return len(folders) + len(files)
+        return len(directory.directories) + len(directory.files)
+
+    def _complete(self, directory: QuiltTreeDirectory) -> bool:
+        return directory.folder_rows is not None and directory.fetched == self._count(directory)
+
+    @staticmethod
+    def _name(directory: QuiltTreeDirectory, row: int) -> str:
+        folders = len(directory.folder_rows)
+        return directory.folder_rows[row] if row < folders else directory.file_rows[row - folders]
+
+    @staticmethod
+    def _find(directory: QuiltTreeDirectory, rows: List[str], name: str) -> Optional[int]:
+        if directory.positions is not None:
+            row = directory.positions.get(name)
+            return row if row is not None and row < len(rows) and rows[row] == name else None
+
+        key = name.casefold()
+        row = bisect_left(rows, key, key=str.casefold)
+        while row < len(rows) and rows[row].casefold() == key:
+            if rows[row] == name:
+                return row
+            row += 1
+        return None
+
+    def _absolute(self, directory_path: str, name: str) -> str:
+        return os.path.join(self.workspace.workspace_dir, directory_path, name)
+
+    def _directory(self, path: str, touched: dict) -> QuiltTreeDirectory:
+        directory = self._nodes.get(path)
+        if directory is None:
+            # Normally announced through added_directories, but never leave a file without its folder
+            self._add_directories([path], touched)
+            directory = self._nodes[path]
+        return directory
+
+    def _add_directories(self, paths: Iterable[str], touched: dict) -> None:
+        added = {}
+        # Parents sort before their children
+        for path in sorted(set(paths)):
+            if path in self._nodes:
+                continue
+            parent_path, name = os.path.split(path)
+            parent = self._nodes.get(parent_path)
+            if parent is None:
+                parent = self._directory(parent_path, touched)
+
+            self._nodes[path] = QuiltTreeDirectory(path, name, parent)
+            added.setdefault(parent, []).append(name)
+
+        for parent, names in added.items():
+            touched.setdefault(parent, self._complete(parent))
+            self._add(parent, names, ())
+
+    def _remove_directories(self, paths: Iterable[str], touched: dict) -> None:
+        removed = set(paths)
+        removed.discard('')
+
+        topmost = {}
+        for path in removed:
+            parent_path, name = os.path.split(path)
+            parent = self._nodes.get(parent_path)
+            if parent_path not in removed and parent is not None and name in parent.directories:
+                topmost.setdefault(parent, []).append(name)
+
+        for parent, names in topmost.items():
+            touched.setdefault(parent, self._complete(parent))
+            self._remove(parent, names, ())
+
+        for path in removed:
+            self._nodes.pop(path, None)
+
+    def _sort(self, directory: QuiltTreeDirectory) -> None:
+        if self._view is None:
+            # Rows arrive from the index in path order, so this is mostly a merge of sorted runs
+            directory.folder_rows = sorted(directory.directories, key=str.casefold)
+            directory.file_rows = sorted(directory.files, key=str.casefold)
+            directory.positions = None
+            return
+
+        # The result may be a little older or newer than the tree, names it does not know are left out
+        folders, files = self._view.children.get(directory.path, ((), ()))
+        directory.folder_rows = [name for name in folders if name in directory.directories]
+        directory.file_rows = [name for name in files if name in directory.files]
+        self._update_positions(directory)
+
+    @staticmethod
+    def _update_positions(directory: QuiltTreeDirectory) -> None:
+        directory.positions = {name: row for row, name in enumerate(directory.folder_rows)}
+        directory.positions.update((name, row) for row, name in enumerate(directory.file_rows))
+
+    def _fetch(self, directory: QuiltTreeDirectory, count: int) -> None:
+        if directory.folder_rows is None:
+            self._sort(directory)
+
+        count = min(count, self._count(directory) - directory.fetched)
+        if count <= 0:
+            return
+
+        self.beginInsertRows(self._index(directory), directory.fetched, directory.fetched + count - 1)
+        directory.fetched += count
+        self.endInsertRows()
+
+    def _add(self, directory: QuiltTreeDirectory, folders: list, files: list) -> None:
+        for name in folders:
+            directory.directories[name] = self._nodes[os.path.join(directory.path, name)]
+        for name in files:
+            directory.files[name] = None
+
+        # Unsorted folders are sorted with their new children once they are fetched,
+        # filtered ones show them with the next filter result
+        if directory.folder_rows is not None and self._view is None:
+            if folders:
+                self._insert_rows(directory, directory.folder_rows, 0, folders)
+            if files:
+                self._insert_rows(directory, directory.file_rows, len(directory.folder_rows), files)
+
+    def _remove(self, directory: QuiltTreeDirectory, folders: list, files: list) -> None:
+        if directory.folder_rows is not None:
+            if folders:
+                self._remove_rows(directory, directory.folder_rows, 0, folders)
+            if files:
+                self._remove_rows(directory, directory.file_rows, len(directory.folder_rows), files)
+            if directory.positions is not None:
+                self._update_positions(directory)
+
+        for name in folders:
+            del directory.directories[name]
+        for name in files:
+            del directory.files[name]
+
+    def _insert_rows(self, directory: QuiltTreeDirectory, rows: List[str], offset: int, names: list) -> None:
+        limit = directory.fetched - offset
+
+        # Names landing among the fetched rows are inserted in groups sharing a position
+        shown = {}
+        hidden = []
+        for name in sorted(names, key=str.casefold):
+            row = bisect_right(rows, name.casefold(), key=str.casefold)
+            if row < limit:
+                shown.setdefault(row, []).append(name)
+            else:
+                hidden.append(name)
+
+        # The unfetched tail is not visible, it is merged without signals
+        if hidden:
+            start = max(limit, 0)
+            tail = rows[start:]
+            tail.extend(hidden)
+            tail.sort(key=str.casefold)
+            rows[start:] = tail
+
+        # Highest positions first, so the lower ones stay valid
+        if shown:
+            parent = self._index(directory)
+            for row in sorted(shown, reverse=True):
+                group = shown[row]
+                self.beginInsertRows(parent, offset + row, offset + row + len(group) - 1)
+                rows[row:row] = group
+                directory.fetched += len(group)
+                self.endInsertRows()
+
+    def _remove_rows(self, directory: QuiltTreeDirectory, rows: List[str], offset: int, names: list) -> None:
+        limit = directory.fetched - offset
+        positions = [self._find(directory, rows, name) for name in names]
+
+        hidden = {names[i] for i, row in enumerate(positions) if row is not None and row >= limit}
+        shown = sorted((row for row in positions if row is not None and row < limit), reverse=True)
+
+        if hidden:
+            start = max(limit, 0)
+            rows[start:] = [name for name in rows[start:] if name not in hidden]
+
+        # Contiguous runs are removed together, highest first
+        if shown:
+            parent = self._index(directory)
+            last = first = shown[0]
+            for row in shown[1:] + [None]:
+                if row is not None and row == first - 1:
+                    first = row
+                    continue
+
+                self.beginRemoveRows(parent, offset + first, offset + last)
+                del rows[first:last + 1]
+                directory.fetched -= last - first + 1
+                self.endRemoveRows()
+                last = first = row
+
+    @Slot(str)
+    def _thumbnail_ready(self, path: str) -> None:
+        index = self.index_for_path(path)
+        if index.isValid():
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
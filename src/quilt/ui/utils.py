@@ -1,128 +1,46 @@
-import io
 import os
-import re
 
-from cairosvg import svg2png
-from PIL import Image
-from PySide6.QtGui import QIcon, QPixmap
+from functools import lru_cache
+
+from PySide6.QtGui import QGuiApplication, QIcon, QImage, QPixmap
 from PySide6.QtWidgets import QLabel
 
+from src.quilt.profiling import startup_profiler
 from src.quilt.ui.colors import COLORS
+from src.quilt.ui.icons import icon_cache, raster_cache, user_cache_dir
+from src.quilt.ui.raster import SVG_COLOR, pad_png_data, rasterize_svg
+from src.quilt.ui.recolor import recolor_svg
+from src.quilt.ui.render import image_png_data, render_svg_image
+from src.quilt.ui.style import compile_stylesheet
 
-SVG_COLOR = '#d9d9d9'
 CURRENT_COLOR_NAME = 'dark-gray'
 CURRENT_COLOR = COLORS[CURRENT_COLOR_NAME]
 
-def modify_svg_colors(svg_content, color_mapping):
-    modified_content = svg_content
-
-    for old_color, new_color in color_mapping.items():
-        # Handle different color formats in SVG
-        patterns = [
-            old_color.lower(),  # #ff0000
-            old_color.upper(),  # #FF0000
-            old_color.lstrip('#').lower(),  # ff0000
-            old_color.lstrip('#').upper(),  # FF0000
-        ]
-        
-        for pattern in patterns:
-            # Replace in fill attributes
-            modified_content = re.sub(
-                rf'fill\s*=\s*["\']#{pattern}["\']',
-                f'fill="{new_color}"',
-                modified_content,
-                flags=re.IGNORECASE
-            )
-            modified_content = re.sub(
-                rf'fill\s*=\s*["\']{pattern}["\']',
-                f'fill="{new_color}"',
-                modified_content,
-                flags=re.IGNORECASE
-            )
-            
-            # Replace in stroke attributes
-            modified_content = re.sub(
-                rf'stroke\s*=\s*["\']#{pattern}["\']',
-                f'stroke="{new_color}"',
-                modified_content,
-                flags=re.IGNORECASE
-            )
-            modified_content = re.sub(
-                rf'stroke\s*=\s*["\']{pattern}["\']',
-                f'stroke="{new_color}"',
-                modified_content,
-                flags=re.IGNORECASE
-            )
-            
-            # Replace in style attributes
-            modified_content = re.sub(
-                rf'fill\s*:\s*#{pattern}',
-                f'fill:{new_color}',
-                modified_content,
-                flags=re.IGNORECASE
-            )
-            modified_content = re.sub(
-                rf'stroke\s*:\s*#{pattern}',
-                f'stroke:{new_color}',
-                modified_content,
-                flags=re.IGNORECASE
-            )
-    
-    return modified_content
-
-def make_target_svg(svg_file_name, target_color_name=None):
-    if not svg_file_name or not target_color_name:
-        return
-
-    svg_file_path = f'assets/icons/{svg_file_name}.svg'
-    target_file_path = f'assets/icons/{target_color_name}/{svg_file_name}.svg' if target_color_name else None
-    target_directory = f'assets/icons/{target_color_name}' if target_color_name else None
-
-    # Make sure the target directory exists
-    if target_directory and not os.path.exists(target_directory):
-        os.makedirs(target_directory)
-
-    try:
-        # Check if a svg to the target already exists
-        if os.path.exists(target_file_path):
-            return
-
-        # Read SVG file
-        with open(svg_file_path, 'r', encoding='utf-8') as file:
-            svg_content = file.read()
-
-        # Apply color modifications if provided
-        if target_color_name:
-            target_color = COLORS[target_color_name]
-            svg_content = modify_svg_colors(svg_content, { "#d9d9d9": target_color })
-
-        # Save the modified SVG to the target path
-        with open(target_file_path, 'w', encoding='utf-8') as file:
-            file.write(svg_content)
-                
-    except Exception as e:
-        print(f"Error converting SVG to PNG: {e}")
-        return None
+def set_current_color(color_name):
+    """Switch the palette color icons are rendered in, see QuiltThemeManager."""
+    global CURRENT_COLOR_NAME, CURRENT_COLOR
+    CURRENT_COLOR_NAME = color_name
+    CURRENT_COLOR = COLORS[color_name]
 
+def modify_svg_colors(svg_content, color_mapping):
+    # Single pass over the SVG, regardless of the number of mapped colors
+    return recolor_svg(svg_content, color_mapping)
 
 def svg_to_png_data(svg_file_name, target_color_name=None, width=64, height=64):
     if not svg_file_name:
         return None
 
-    svg_file_path = f'assets/icons/{svg_file_name}.svg'
-
     try:
-        # If a target color is specified, create the target SVG
-        if target_color_name:
-            make_target_svg(svg_file_name, target_color_name)
-            svg_file_path = f'assets/icons/{target_color_name}/{svg_file_name}.svg'
-
         # Read SVG file
-        with open(svg_file_path, 'r', encoding='utf-8') as file:
+        with open(f'assets/icons/{svg_file_name}.svg', 'r', encoding='utf-8') as file:
             svg_content = file.read()
 
+        # Recolor in memory, nothing is written next to the bundled icons
+        if target_color_name:
+            svg_content = modify_svg_colors(svg_content, { SVG_COLOR: COLORS[target_color_name] })
+
         # Convert SVG to PNG
-        png_data = svg2png(bytestring=svg_content.encode('utf-8'), output_width=width, output_height=height)
+        png_data = rasterize_svg(svg_content, width, height)
         if not png_data:
             print(f"Failed to convert SVG to PNG for {svg_file_name}")
             return None
@@ -137,27 +55,8 @@ def svg_to_padded_png_data(svg_file_name, target_color_name=None, width=64, heig
     icon_png_data = svg_to_png_data(svg_file_name, target_color_name, width - padding, height - padding)    
     if not icon_png_data:
         return None
-    
-    # Load PNG into a Pillow Image
-    image = Image.open(io.BytesIO(icon_png_data)).convert("RGBA")
-
-    # Create a new image with padding
-    canvas = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-
-    # Calculate position to center the icon
-    x = (canvas.size[0] - image.size[0]) // 2
-    y = (canvas.size[1] - image.size[1]) // 2
-
-    # Paste the icon onto the canvas with padding
-    canvas.paste(image, (x, y), image)
 
-    # Save the padded image to a bytes buffer
-    output_buffer = io.BytesIO()
-    canvas.save(output_buffer, format='PNG')
-    output_buffer.seek(0)
-
-    # Return the PNG data as bytes
-    return output_buffer.getvalue()
+    return pad_png_data(icon_png_data, width, height)
 
 def load_favicon():
     label = QLabel()
@@ -165,68 +64,114 @@ def load_favicon():
 
     return label
 
-def load_icon(icon_name, width=64, height=64):
-    svg_content = svg_to_png_data(icon_name, CURRENT_COLOR_NAME, width, height)
-    if not svg_content:
-        return QIcon()
-        
-    pixmap = QPixmap()
-    pixmap.loadFromData(svg_content)
+def device_pixel_ratio():
+    app = QGuiApplication.instance()
+    return app.devicePixelRatio() if app is not None else 1.0
+
+@lru_cache(maxsize=None)
+def read_icon_svg(icon_name):
+    """Return the source markup of a bundled icon, or None if it does not exist."""
+    try:
+        with open(f'assets/icons/{icon_name}.svg', 'r', encoding='utf-8') as file:
+            return file.read()
+    except OSError as e:
+        print(f"Error reading icon {icon_name}: {e}")
+        return None
 
-    return QIcon(pixmap)
+def paint_icon_image(icon_name, color_name=None, width=64, height=64, padding=0, ratio=1.0):
+    """Return an icon recolored in memory and painted with QSvgRenderer at device resolution.
 
-def load_colored_icon(icon_name, color=CURRENT_COLOR_NAME, width=64, height=64):
-    svg_content = svg_to_png_data(icon_name, color, width, height)
+    No PNG is encoded or decoded on the way, so this is what the UI loads
+    icons and builds themes through. Safe off the GUI thread.
+    """
+    svg_content = read_icon_svg(icon_name)
     if not svg_content:
-        return QIcon()
-        
-    pixmap = QPixmap()
-    pixmap.loadFromData(svg_content)
+        return QImage()
 
-    return QIcon(pixmap)
+    color = COLORS[color_name or CURRENT_COLOR_NAME]
+    return render_svg_image(modify_svg_colors(svg_content, { SVG_COLOR: color }), width, height, padding, ratio)
 
-def load_padded_icon(icon_name, width=64, height=64, padding=0):
-    svg_content = svg_to_png_data(icon_name, CURRENT_COLOR_NAME, width, height, padding)
+def render_icon_png_data(icon_name, color_name=None, width=64, height=64, padding=0, ratio=1.0):
+    """Return PNG data for an icon, served from the persistent raster cache when possible.
+
+    Only for consumers that need files, the stylesheet carets and
+    --prerender-icons; painting directly is faster than decoding a cached PNG.
+    """
+    svg_content = read_icon_svg(icon_name)
     if not svg_content:
-        return QIcon()
-        
-    pixmap = QPixmap()
-    pixmap.loadFromData(svg_content)
+        return None
 
-    return QIcon(pixmap)
+    color = COLORS[color_name or CURRENT_COLOR_NAME]
+    key = raster_cache.make_key(svg_content.encode('utf-8'), color, round(width * ratio),
+                                round(height * ratio), round(padding * ratio))
+    png_data = raster_cache.get(key)
+    if png_data:
+        return png_data
 
-def load_and_save_icon(icon_name, width=32, height=32):
-    svg_content = svg_to_png_data(icon_name, CURRENT_COLOR_NAME, width, height)
-    if not svg_content:
+    image = paint_icon_image(icon_name, color_name, width, height, padding, ratio)
+    if image.isNull():
         return None
 
-    icon_path = f'assets/icons/{CURRENT_COLOR_NAME}/{icon_name}.png'
-    
-    # Ensure the directory exists
-    os.makedirs(os.path.dirname(icon_path), exist_ok=True)
+    png_data = image_png_data(image)
+    raster_cache.put(key, png_data)
+    return png_data
 
-    with open(icon_path, 'wb') as file:
-        file.write(svg_content)
+def _load_cached_icon(icon_name, color, width, height, padding=0):
+    ratio = device_pixel_ratio()
+    key = (icon_name, color, (width, height, padding), ratio)
 
-    # Return the path to the saved icon
-    return icon_path
+    icon = icon_cache.get(key)
+    if icon is not None:
+        return icon
 
-def load_and_save_padded_icon(icon_name, width=32, height=32, padding=0):
-    svg_content = svg_to_padded_png_data(icon_name, CURRENT_COLOR_NAME, width, height, padding)
-    if not svg_content:
+    # Rendered at device resolution, so icons stay sharp on HiDPI screens
+    icon = QIcon()
+    with startup_profiler.phase("icon rendering"):
+        image = paint_icon_image(icon_name, color, width, height, padding, ratio)
+        if not image.isNull():
+            icon = QIcon(QPixmap.fromImage(image))
+
+    # Failed renders are cached as an empty icon
+    icon_cache.put(key, icon)
+    return icon
+
+def load_icon(icon_name, width=64, height=64):
+    return _load_cached_icon(icon_name, CURRENT_COLOR_NAME, width, height)
+
+def load_colored_icon(icon_name, color=None, width=64, height=64):
+    return _load_cached_icon(icon_name, color or CURRENT_COLOR_NAME, width, height)
+
+def load_padded_icon(icon_name, width=64, height=64, padding=0):
+    return _load_cached_icon(icon_name, CURRENT_COLOR_NAME, width, height, padding)
+
+def save_icon_png(icon_name, png_data):
+    """Write PNG data for stylesheets that reference icons by path, into the user cache directory."""
+    icon_path = os.path.join(user_cache_dir(), 'stylesheet-icons', CURRENT_COLOR_NAME, f'{icon_name}.png')
+    try:
+        os.makedirs(os.path.dirname(icon_path), exist_ok=True)
+        with open(icon_path, 'wb') as file:
+            file.write(png_data)
+    except OSError as e:
+        print(f"Error saving icon {icon_name}: {e}")
         return None
 
-    icon_path = f'assets/icons/{CURRENT_COLOR_NAME}/{icon_name}.png'
-    
-    # Ensure the directory exists
-    os.makedirs(os.path.dirname(icon_path), exist_ok=True)
+    # Stylesheet urls take forward slashes on every platform
+    return icon_path.replace(os.sep, '/')
+
+def load_and_save_icon(icon_name, width=32, height=32):
+    png_data = render_icon_png_data(icon_name, CURRENT_COLOR_NAME, width, height)
+    if not png_data:
+        return None
 
-    with open(icon_path, 'wb') as file:
-        file.write(svg_content)
+    return save_icon_png(icon_name, png_data)
+
+def load_and_save_padded_icon(icon_name, width=32, height=32, padding=0):
+    png_data = render_icon_png_data(icon_name, CURRENT_COLOR_NAME, width, height, padding)
+    if not png_data:
+        return None
 
-    # Return the path to the saved icon
-    return icon_path
+    return save_icon_png(icon_name, png_data)
 
 def load_stylesheet(style_name):
-    with open(f'styles/{style_name}.qss', 'r') as file:
-        return file.read()
\ No newline at end of file
+    # Compiled with palette variables resolved, cached until the file changes
+    return compile_stylesheet(style_name)
@@ -1,30 +1,55 @@
+import html
+import logging
+import os
+
 from typing import Optional
 
-from PySide6.QtCore import Qt, QSize, QPoint, QUrl, Signal, Slot
-from PySide6.QtGui import QIcon, QMouseEvent
-from PySide6.QtWebEngineWidgets import QWebEngineView
+from PySide6.QtCore import Qt, QEvent, QSize, QPoint, QTimer, Signal, Slot
+from PySide6.QtGui import QActionGroup, QIcon, QKeySequence, QMouseEvent, QShortcut, QTextDocument
 from PySide6.QtWidgets import (
     QDialog, 
-    QFileDialog, QFileSystemModel,
+    QFileDialog,
+    QFrame,
     QHBoxLayout,
     QLabel,
-    QMainWindow,
+    QLineEdit, QListWidget, QListWidgetItem,
+    QMainWindow, QMenu,
     QPushButton,
     QSizePolicy, QSplitter, QSplitterHandle, QStyle, QStyleOptionViewItem,  QStyledItemDelegate,
-    QToolBar, QToolButton, QTreeView,
+    QToolBar, QToolButton, QTreeView, QTreeWidget, QTreeWidgetItem,
     QVBoxLayout,
     QWidget, QWidgetAction
 )
 
+from src.quilt.ui.colors import COLORS
+from src.quilt.ui.theme import theme_manager
+from src.quilt.ui.thumbnails import QuiltThumbnailService
+from src.quilt.ui.tree import QuiltWorkspaceModel
 from src.quilt.ui.utils import (
     load_and_save_padded_icon,
     load_colored_icon, 
-    load_favicon, 
-    load_icon,
-    load_stylesheet
+    load_favicon
+)
+from src.quilt.extraction import QuiltExtractionStats
+from src.quilt.filtering import SORT_MODIFIED, SORT_NAME, SORT_SIZE, QuiltFilterResult
+from src.quilt.index import QuiltWorkspaceChanges
+from src.quilt.jobs import QuiltJob, QuiltJobRuntime, job_runtime
+from src.quilt.loader import (
+    QuiltDuplicatesLoader,
+    QuiltEmbeddingLoader,
+    QuiltExtractionLoader,
+    QuiltQuickOpenLoader,
+    QuiltSearchLoader,
+    QuiltTreeFilterLoader
 )
+from src.quilt.quickopen import QuiltQuickOpenResults
+from src.quilt.scanner import QuiltScanProgress
+from src.quilt.search import MATCH_END, MATCH_START, QuiltSearchResult, QuiltSearchResults
+from src.quilt.watcher import QuiltWorkspaceWatcher
 from src.quilt.workspace import QuiltWorkspace
 
+logger = logging.getLogger(__name__)
+
 class HoverAwareSplitterHandle(QSplitterHandle):
     def __init__(self, orientation, parent):
         super().__init__(orientation, parent)
@@ -141,6 +166,13 @@ class QuiltTitleBar(QWidget):
         self.layout_options.append(self.btn_show_navigation)
         self.layout_options.append(self.btn_show_features)
 
+        # Icon color, applied to the whole UI
+        self.btn_theme = QPushButton(QIcon(), "")
+        theme_manager().bind_icon(self.btn_theme, "gear")
+        self.btn_theme.setObjectName("title-bar-button")
+        self.btn_theme.setToolTip("Icon Color")
+        self.btn_theme.setMenu(self._theme_menu())
+
         # Frame utility buttons
         self.btn_minimize = self._create_button("minus", "Minimize", self.parent.showMinimized)
         self.btn_restore = self._create_button("", "", self._toggle_state)
@@ -154,18 +186,37 @@ class QuiltTitleBar(QWidget):
         layout.addStretch()
         layout.addWidget(self.btn_show_navigation)
         layout.addWidget(self.btn_show_features)
+        layout.addWidget(self.btn_theme)
         layout.addWidget(self.btn_minimize)
         layout.addWidget(self.btn_restore)
         layout.addWidget(self.btn_close)
 
     def _create_button(self, icon_name: str, tooltip: str, callback) -> QPushButton:
-        icon = QIcon(load_icon(icon_name)) if icon_name else QIcon()
-        button = QPushButton(icon, "")
+        button = QPushButton(QIcon(), "")
+        if icon_name:
+            theme_manager().bind_icon(button, icon_name)
         button.setObjectName("title-bar-button")
         button.setToolTip(tooltip)
         button.clicked.connect(callback)
         return button
 
+    def _theme_menu(self) -> QMenu:
+        menu = QMenu(self)
+        colors = QActionGroup(menu)
+        for color_name in COLORS:
+            action = menu.addAction(color_name.replace('-', ' ').replace('_', ' ').title())
+            action.setData(color_name)
+            action.setCheckable(True)
+            colors.addAction(action)
+
+        def sync() -> None:
+            for action in colors.actions():
+                action.setChecked(action.data() == theme_manager().color_name)
+
+        menu.aboutToShow.connect(sync)
+        colors.triggered.connect(lambda action: theme_manager().apply_theme(action.data()))
+        return menu
+
     def _toggle_navigation(self) -> None:
         self.navigation_toggled = not self.navigation_toggled
         self.toggle_navigation.emit(self.navigation_toggled)
@@ -180,7 +231,7 @@ class QuiltTitleBar(QWidget):
         else:
             icon, tooltip = "square", "Maximize"
 
-        self.btn_restore.setIcon(QIcon(load_icon(icon)))
+        theme_manager().bind_icon(self.btn_restore, icon)
         self.btn_restore.setToolTip(tooltip)
 
     def _toggle_state(self) -> None:
@@ -237,21 +288,18 @@ class QuiltTreeView(QTreeView):
     """Custom tree view for displaying file system with custom delegate and model."""
     pdf_selected = Signal(str)
 
-    def __init__(self, parent: Optional[QWidget] = None, model: Optional[QFileSystemModel] = None,
+    def __init__(self, parent: Optional[QWidget] = None, model: Optional[QuiltWorkspaceModel] = None,
                  workspace: Optional[QuiltWorkspace] = None, applied_style_sheet: str = ""):
         super().__init__(parent)
         self.workspace = workspace
         self.setObjectName("navigation-tree")
-        self.setModel(model)
-        self.setRootIndex(model.index(workspace.workspace_dir))
+        self.setModel(model)  # The model's root is the workspace folder
         self.setHeaderHidden(True)
         self.setFocusPolicy(Qt.NoFocus)  # Disable focus outline
-        self.hideColumn(1)  # Size
-        self.hideColumn(2)  # Type
-        self.hideColumn(3)  # Last Modified
+        self.setUniformRowHeights(True)  # Rows are laid out without asking each one for its size
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.setItemDelegate(QuiltTreeItemDelegate())  # Use custom delegate to prevent icon tinting
-        self.setStyleSheet(applied_style_sheet)  # Apply the full stylesheet
+        self.setStyleSheet(applied_style_sheet)  # Only the rules on top of the application stylesheet
 
     def mousePressEvent(self, event: QMouseEvent) -> None:
         if event.button() == Qt.LeftButton:
@@ -259,8 +307,8 @@ class QuiltTreeView(QTreeView):
             if index.isValid():
                 self.setCurrentIndex(index)
                 
-                # Find file and metadata
-                workspace_entry = self.workspace.find_pdf_from_name(index.data())
+                # Find file and metadata, resolved by full path so equally named files do not collide
+                workspace_entry = self.workspace.find_pdf_from_path(self.model().file_path(index))
                 if workspace_entry:
                     raw_path = workspace_entry['path']
                     pdf_path = str(raw_path).strip()  # Ensure it's a clean string
@@ -268,42 +316,34 @@ class QuiltTreeView(QTreeView):
         super().mousePressEvent(event)
 
 
-class QuiltFileSystemModel(QFileSystemModel):
-    """Custom file system model with icons based on file type."""
-
-    def data(self, index, role=Qt.DisplayRole):
-        if role == Qt.DecorationRole and index.column() == 0:
-            file_path = self.filePath(index)
-            if file_path.endswith(".pdf"):
-                return QIcon(load_icon("file-pdf"))
-            elif file_path.endswith(".md"):
-                return QIcon(load_icon("file-markdown"))
-            elif file_path.lower().endswith((".png", ".jpg", ".jpeg", ".gif")):
-                return QIcon(load_icon("file-image"))
-            elif self.isDir(index):
-                return QIcon(load_icon("folder"))
-        return super().data(index, role)
-
-
 class QuiltPDFViewer(QWidget):
+    pdf_loaded = Signal(str)
+
     def __init__(self, parent: Optional[QWidget] = None):
         super().__init__(parent)
         self.setObjectName("pdf-viewer")
     
         self.pdf_layout = QVBoxLayout(self)
-        self.web_view = QWebEngineView()
-        self.web_view.settings().setAttribute(self.web_view.settings().WebAttribute.PluginsEnabled, True)
-        self.web_view.settings().setAttribute(self.web_view.settings().WebAttribute.PdfViewerEnabled, True)
-        self.pdf_layout.addWidget(self.web_view)
+        self.pdf_layout.setContentsMargins(0, 0, 0, 0)
+
+        # QtPdf is only loaded once the first PDF is opened
+        self.pdf_view = None
+
+    def _create_pdf_view(self):
+        from src.quilt.ui.pdf import QuiltPdfView
+
+        self.pdf_view = QuiltPdfView(self)
+        self.pdf_layout.addWidget(self.pdf_view)
 
     @Slot(str)
     def load_pdf(self, pdf_path: str) -> None:
         if pdf_path:
-            pdf_url = QUrl.fromLocalFile(pdf_path)
-            if pdf_url.isValid():
-                self.web_view.setUrl(QUrl.fromLocalFile(pdf_path))
-            else:
-                pass
+            if self.pdf_view is None:
+                self._create_pdf_view()
+            if not self.pdf_view.load(pdf_path):
+                print(f"Failed to open PDF: {pdf_path}")
+                return
+            self.pdf_loaded.emit(pdf_path)
 
 
 class QuiltToggleableWidget(QWidget):
@@ -321,11 +361,495 @@ class QuiltToggleableWidget(QWidget):
             self.hide()
 
 
+class QuiltScanStatus(QWidget):
+    """Progress line shown while a workspace is being scanned, with a cancel button."""
+    cancel_requested = Signal()
+
+    def __init__(self, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.setObjectName("scan-status")
+
+        self.label = QLabel("Scanning workspace...")
+
+        btn_cancel = QToolButton(self)
+        theme_manager().bind_icon(btn_cancel, "x")
+        btn_cancel.setToolTip("Cancel Scan")
+        btn_cancel.setObjectName("toolbar-button")
+        btn_cancel.clicked.connect(self.cancel_requested.emit)
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(10, 0, 0, 0)
+        layout.setSpacing(0)
+        layout.addWidget(self.label)
+        layout.addStretch()
+        layout.addWidget(btn_cancel)
+
+        self.setLayout(layout)
+
+    @Slot(object)
+    def update_progress(self, progress: QuiltScanProgress) -> None:
+        self.label.setText(
+            f"Scanning {progress.directories} folders, {progress.files} files "
+            f"({progress.files_per_second:.0f} files/s)"
+        )
+
+
+class QuiltJobsPanel(QWidget):
+    """Queue depth, throughput and the running jobs of the job runtime.
+
+    Below them, `show_result` keeps the outcome of the last run of each
+    workspace task, such as extraction, until the task runs again.
+    """
+    REFRESH_INTERVAL = 500
+
+    def __init__(self, parent: Optional[QWidget] = None, runtime: Optional[QuiltJobRuntime] = None):
+        super().__init__(parent)
+        self.setObjectName("jobs-panel")
+        self.runtime = runtime or job_runtime()
+
+        self.status = QLabel(self)
+        self.status.setObjectName("jobs-status")
+
+        self.jobs = QLabel(self)
+        self.jobs.setObjectName("jobs-list")
+        self.jobs.setWordWrap(True)
+
+        self.results = QLabel(self)
+        self.results.setObjectName("jobs-results")
+        self.results.setWordWrap(True)
+        self.results.hide()
+        self._results = {}
+
+        # Polled rather than updated per signal, batches finish far more jobs than are worth repainting for
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.REFRESH_INTERVAL)
+        self._timer.timeout.connect(self.refresh)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(10, 6, 10, 6)
+        layout.setSpacing(2)
+        layout.addWidget(self.status)
+        layout.addWidget(self.jobs)
+        layout.addWidget(self.results)
+
+        self.setLayout(layout)
+
+    def show_result(self, task: str, text: str) -> None:
+        """Show the outcome of the last run of a task, replacing that of its previous run."""
+        self._results[task] = text
+        self.results.setText('\n'.join(self._results.values()))
+        self.results.show()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self._timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self._timer.stop()
+
+    @Slot()
+    def refresh(self) -> None:
+        stats = self.runtime.stats()
+        status = f"Jobs: {stats.running} running, {stats.queued} queued, {stats.throughput * 60:.0f}/min"
+        if stats.failed:
+            status += f", {stats.failed} failed"
+        self.status.setText(status)
+
+        lines = [self._describe(job) for job in self.runtime.active_jobs()]
+        self.jobs.setText('\n'.join(lines))
+        self.jobs.setVisible(bool(lines))
+
+    @staticmethod
+    def _describe(job: QuiltJob) -> str:
+        if job.state == QuiltJob.QUEUED:
+            return f"{job.name} (queued)"
+
+        text = job.name
+        if job.progress is not None:
+            text += f" {job.progress:.0%}"
+        if job.message:
+            text += f" - {job.message}"
+        return text
+
+
+class QuiltSearchResultDelegate(QStyledItemDelegate):
+    """Paints a search result as its title above the snippet, with the matched terms in bold.
+
+    The result HTML is taken from the UserRole + 1 data of the item, and
+    `lines` lines of text are reserved for it.
+    """
+
+    def __init__(self, parent=None, lines: int = 3):
+        super().__init__(parent)
+        self.lines = lines
+
+    def paint(self, painter, option, index):
+        style = option.widget.style()
+        if option.state & (QStyle.State_Selected | QStyle.State_MouseOver):
+            style.drawPrimitive(QStyle.PE_PanelItemViewItem, option, painter, option.widget)
+
+        document = QTextDocument()
+        document.setDefaultFont(option.font)
+        document.setDocumentMargin(0)
+        document.setTextWidth(option.rect.width() - 8)
+        document.setHtml(f'<div style="color: {COLORS["dark-gray"]}">{index.data(Qt.UserRole + 1)}</div>')
+
+        painter.save()
+        painter.translate(option.rect.left() + 4, option.rect.top() + 4)
+        painter.setClipRect(0, 0, option.rect.width() - 8, option.rect.height() - 8)
+        document.drawContents(painter)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), option.fontMetrics.lineSpacing() * self.lines + 8)
+
+
+class QuiltSearchPanel(QWidget):
+    """Full-text search field with a ranked result list, answered by a QuiltSearchLoader.
+
+    Queries are sent after a short pause in typing; results of a query that
+    was edited in the meantime never arrive, see QuiltSearchLoader.
+    """
+    pdf_selected = Signal(str)
+    active_changed = Signal(bool)
+
+    # Milliseconds of typing pause before a query is sent
+    DEBOUNCE_INTERVAL = 120
+
+    def __init__(self, parent: Optional[QWidget] = None, workspace: Optional[QuiltWorkspace] = None,
+                 search: Optional[QuiltSearchLoader] = None):
+        super().__init__(parent)
+        self.setObjectName("search-panel")
+        self.workspace = workspace
+        self.search = search
+        self.search.results_ready.connect(self._show_results)
+
+        self.field = QLineEdit(self)
+        self.field.setObjectName("search-field")
+        self.field.setPlaceholderText("Search documents")
+        self.field.setClearButtonEnabled(True)
+        theme_manager().bind_icon(self.field.addAction(QIcon(), QLineEdit.LeadingPosition), "magnifying-glass")
+        self.field.textChanged.connect(self._text_changed)
+
+        self.status = QLabel(self)
+        self.status.setObjectName("search-status")
+        self.status.hide()
+
+        self.results = QListWidget(self)
+        self.results.setObjectName("search-results")
+        self.results.setItemDelegate(QuiltSearchResultDelegate(self.results))
+        self.results.setFocusPolicy(Qt.NoFocus)
+        self.results.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.results.setUniformItemSizes(True)
+        self.results.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.results.itemClicked.connect(self._open_result)
+        self.results.hide()
+
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(self.DEBOUNCE_INTERVAL)
+        self._debounce.timeout.connect(self.refresh)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(6, 0, 6, 4)
+        layout.setSpacing(4)
+        layout.addWidget(self.field)
+        layout.addWidget(self.status)
+        layout.addWidget(self.results)
+        self.setLayout(layout)
+
+    def query(self) -> str:
+        return self.field.text().strip()
+
+    @Slot()
+    def refresh(self) -> None:
+        """Run the current query again, e.g. once more documents are indexed."""
+        if self.query():
+            self.search.search(self.field.text())
+
+    def clear(self) -> None:
+        self.field.clear()
+
+    @Slot(str)
+    def _text_changed(self, text: str) -> None:
+        active = bool(text.strip())
+        if active != self.results.isVisibleTo(self):
+            self.results.setVisible(active)
+            self.status.setVisible(active)
+            self.active_changed.emit(active)
+
+        if active:
+            self._debounce.start()
+        else:
+            self._debounce.stop()
+            self.results.clear()
+
+    @Slot(object)
+    def _show_results(self, results: QuiltSearchResults) -> None:
+        if results.query != self.field.text():
+            return
+
+        self.results.clear()
+        for result in results.results:
+            item = QListWidgetItem()
+            item.setData(Qt.UserRole, result.file_id)
+            item.setData(Qt.UserRole + 1, self._result_html(result))
+            item.setToolTip(result.file_id)
+            self.results.addItem(item)
+
+        found = f"{len(results.results)} result{'s' if len(results.results) != 1 else ''}"
+        if not results.complete:
+            found = f"Best {found} of titles and recent matches"
+        self.status.setText(f"{found} ({results.elapsed * 1e3:.0f} ms)")
+
+    def _result_html(self, result: QuiltSearchResult) -> str:
+        name = result.title or os.path.basename(result.file_id)
+        snippet = ' '.join(result.snippet.split())
+        snippet = html.escape(snippet).replace(MATCH_START, '<b>').replace(MATCH_END, '</b>')
+        return f"<b>{html.escape(name)}</b><br>{snippet}"
+
+    @Slot(QListWidgetItem)
+    def _open_result(self, item: QListWidgetItem) -> None:
+        entry = self.workspace.find_pdf_from_path(item.data(Qt.UserRole))
+        if entry is not None:
+            self.pdf_selected.emit(str(entry.path))
+
+
+class QuiltQuickOpenPalette(QFrame):
+    """Ctrl+P palette that opens any workspace file by a few letters of its path.
+
+    Every keystroke is answered by a QuiltQuickOpenLoader. The arrow keys
+    move through the results, Enter opens the selected one, Escape or a
+    click elsewhere closes the palette.
+    """
+    file_selected = Signal(str)
+
+    def __init__(self, parent: Optional[QWidget] = None, quick_open: Optional[QuiltQuickOpenLoader] = None):
+        super().__init__(parent, Qt.Popup | Qt.FramelessWindowHint)
+        self.setObjectName("quick-open")
+        self.quick_open = quick_open
+        self.quick_open.results_ready.connect(self._show_results)
+
+        self.field = QLineEdit(self)
+        self.field.setObjectName("quick-open-field")
+        self.field.setPlaceholderText("Go to file")
+        theme_manager().bind_icon(self.field.addAction(QIcon(), QLineEdit.LeadingPosition), "magnifying-glass")
+        self.field.textChanged.connect(self.quick_open.search)
+        self.field.installEventFilter(self)
+
+        self.status = QLabel(self)
+        self.status.setObjectName("quick-open-status")
+
+        self.results = QListWidget(self)
+        self.results.setObjectName("quick-open-results")
+        self.results.setItemDelegate(QuiltSearchResultDelegate(self.results, lines=2))
+        self.results.setFocusPolicy(Qt.NoFocus)
+        self.results.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.results.setUniformItemSizes(True)
+        self.results.itemClicked.connect(self._open)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(6, 6, 6, 6)
+        layout.setSpacing(4)
+        layout.addWidget(self.field)
+        layout.addWidget(self.status)
+        layout.addWidget(self.results)
+        self.setLayout(layout)
+
+    @Slot()
+    def popup(self) -> None:
+        """Show the palette at the top of its parent, with the last query selected."""
+        parent = self.parentWidget()
+        width = min(600, parent.width() - 40)
+        self.setGeometry(parent.mapToGlobal(QPoint((parent.width() - width) // 2, 40)).x(),
+                         parent.mapToGlobal(QPoint(0, 40)).y(), width, min(420, parent.height() - 80))
+        self.show()
+        self.field.setFocus()
+        self.field.selectAll()
+        if self.field.text():
+            self.quick_open.search(self.field.text())
+
+    def eventFilter(self, watched, event) -> bool:
+        if watched is self.field and event.type() == QEvent.KeyPress:
+            if event.key() in (Qt.Key_Down, Qt.Key_Up) and self.results.count():
+                step = 1 if event.key() == Qt.Key_Down else -1
+                self.results.setCurrentRow(max(0, min(self.results.currentRow() + step, self.results.count() - 1)))
+                return True
+            if event.key() in (Qt.Key_Return, Qt.Key_Enter):
+                if self.results.currentItem() is not None:
+                    self._open(self.results.currentItem())
+                return True
+            if event.key() == Qt.Key_Escape:
+                self.hide()
+                return True
+        return super().eventFilter(watched, event)
+
+    @Slot(object)
+    def _show_results(self, results: QuiltQuickOpenResults) -> None:
+        if results.query != self.field.text():
+            return
+
+        self.results.clear()
+        for file_id in results.file_ids:
+            directory, name = os.path.split(file_id)
+            item = QListWidgetItem()
+            item.setData(Qt.UserRole, file_id)
+            item.setData(Qt.UserRole + 1, f"<b>{html.escape(name)}</b><br>{html.escape(directory)}")
+            item.setToolTip(file_id)
+            self.results.addItem(item)
+        self.results.setCurrentRow(0)
+
+        if not results.ready:
+            self.status.setText("Indexing file names...")
+        elif results.query.strip():
+            self.status.setText(f"{results.candidates} of {results.total} files ({results.elapsed * 1e3:.0f} ms)")
+        else:
+            self.status.setText("")
+
+    @Slot(QListWidgetItem)
+    def _open(self, item: QListWidgetItem) -> None:
+        self.hide()
+        self.file_selected.emit(item.data(Qt.UserRole))
+
+
+class QuiltTreeFilterBar(QWidget):
+    """Filter field of the navigation tree, answered by a QuiltTreeFilterLoader.
+
+    Every edit is sent right away, the loader drops requests that are
+    overtaken by newer ones. The filter and the sort order are applied to
+    the tree model in one go once a result arrives.
+    """
+
+    def __init__(self, parent: Optional[QWidget] = None, model: Optional[QuiltWorkspaceModel] = None,
+                 tree_filter: Optional[QuiltTreeFilterLoader] = None):
+        super().__init__(parent)
+        self.setObjectName("filter-bar")
+        self.model = model
+        self.tree_filter = tree_filter
+        self.tree_filter.results_ready.connect(self._show_result)
+
+        self.sort_key = SORT_NAME
+        self.descending = False
+
+        self.field = QLineEdit(self)
+        self.field.setObjectName("filter-field")
+        self.field.setPlaceholderText("Filter files: name .pdf >1mb after:2024-01-31")
+        self.field.setClearButtonEnabled(True)
+        theme_manager().bind_icon(self.field.addAction(QIcon(), QLineEdit.LeadingPosition), "funnel")
+        self.field.textChanged.connect(self.refresh)
+
+        self.status = QLabel(self)
+        self.status.setObjectName("filter-status")
+        self.status.hide()
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(6, 0, 6, 4)
+        layout.setSpacing(4)
+        layout.addWidget(self.field)
+        layout.addWidget(self.status)
+        self.setLayout(layout)
+
+    def set_sort(self, sort_key: str, descending: bool) -> None:
+        self.sort_key = sort_key
+        self.descending = descending
+        self.refresh()
+
+    def clear(self) -> None:
+        self.field.clear()
+
+    @Slot()
+    def refresh(self) -> None:
+        """Filter and sort the tree again, e.g. after the workspace changed."""
+        if not self.field.text().strip() and self.sort_key == SORT_NAME and not self.descending:
+            # The unfiltered tree is what the model shows by itself
+            self.tree_filter.cancel()
+            self.model.set_view(None)
+            self.status.hide()
+            return
+        self.tree_filter.request(self.field.text(), self.sort_key, self.descending)
+
+    @Slot(object)
+    def _show_result(self, result: QuiltFilterResult) -> None:
+        self.model.set_view(result)
+        if result.filter.is_empty():
+            self.status.hide()
+            return
+
+        self.status.setText(f"{result.matches} of {result.total} files ({result.elapsed * 1e3:.0f} ms)")
+        self.status.show()
+
+
+class QuiltDuplicatesPanel(QWidget):
+    """Groups of files with the same or nearly the same text, found by a QuiltDuplicatesLoader."""
+    pdf_selected = Signal(str)
+
+    def __init__(self, parent: Optional[QWidget] = None, workspace: Optional[QuiltWorkspace] = None):
+        super().__init__(parent)
+        self.setObjectName("duplicates-panel")
+        self.workspace = workspace
+
+        self.status = QLabel("Looking for duplicates...", self)
+        self.status.setObjectName("duplicates-status")
+
+        self.groups = QTreeWidget(self)
+        self.groups.setObjectName("duplicate-groups")
+        self.groups.setHeaderHidden(True)
+        self.groups.setRootIsDecorated(False)
+        self.groups.setFocusPolicy(Qt.NoFocus)
+        self.groups.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.groups.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.groups.itemClicked.connect(self._open_file)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(6, 4, 6, 4)
+        layout.setSpacing(4)
+        layout.addWidget(self.status)
+        layout.addWidget(self.groups)
+        self.setLayout(layout)
+
+    def set_running(self) -> None:
+        if self.groups.topLevelItemCount() == 0:
+            self.status.setText("Looking for duplicates...")
+
+    def set_failed(self) -> None:
+        # The groups of the previous run stay, they are only out of date
+        if self.groups.topLevelItemCount() == 0:
+            self.status.setText("Could not look for duplicates")
+
+    @Slot(object)
+    def show_report(self, report) -> None:
+        self.groups.clear()
+        for group in report.groups:
+            similarity = "identical" if group.similarity >= 1.0 else f"{group.similarity:.0%} similar"
+            item = QTreeWidgetItem([f"{len(group.files)} copies, {similarity}"])
+            item.setFlags(Qt.ItemIsEnabled)
+            for file_id in group.files:
+                child = QTreeWidgetItem([file_id])
+                child.setData(0, Qt.UserRole, file_id)
+                child.setToolTip(0, file_id)
+                item.addChild(child)
+            self.groups.addTopLevelItem(item)
+        self.groups.expandAll()
+
+        count = len(report.groups)
+        self.status.setText(f"{count} group{'s' if count != 1 else ''} of duplicates" if count else "No duplicates found")
+
+    @Slot(QTreeWidgetItem, int)
+    def _open_file(self, item: QTreeWidgetItem, column: int) -> None:
+        file_id = item.data(0, Qt.UserRole)
+        entry = self.workspace.find_pdf_from_path(file_id) if file_id else None
+        if entry is not None:
+            self.pdf_selected.emit(str(entry.path))
+
+
 class QuiltNavigationPane(QWidget):
     state = True
 
     def __init__(self, parent: Optional[QWidget] = None, workspace: Optional[QuiltWorkspace] = None,
-                 tree: Optional[QuiltTreeView] = None):
+                 tree: Optional[QuiltTreeView] = None, search: Optional[QuiltSearchLoader] = None,
+                 tree_filter: Optional[QuiltTreeFilterLoader] = None):
         super().__init__(parent)
 
         self.parent = parent
@@ -356,18 +880,71 @@ class QuiltNavigationPane(QWidget):
 
         # Add placeholder tool buttons
         btn_bookmark = QToolButton(self)
-        btn_bookmark.setIcon(QIcon(load_icon("bookmarks")))
+        theme_manager().bind_icon(btn_bookmark, "bookmarks")
         btn_bookmark.setToolTip("Bookmarks")
         btn_bookmark.setObjectName("toolbar-button")
 
+        self.btn_search = QToolButton(self)
+        theme_manager().bind_icon(self.btn_search, "magnifying-glass")
+        self.btn_search.setToolTip("Search Documents")
+        self.btn_search.setObjectName("toolbar-button")
+        self.btn_search.setCheckable(True)
+        self.btn_search.toggled.connect(self.toggle_search)
+
+        self.btn_duplicates = QToolButton(self)
+        theme_manager().bind_icon(self.btn_duplicates, "copy-simple")
+        self.btn_duplicates.setToolTip("Duplicate Documents")
+        self.btn_duplicates.setObjectName("toolbar-button")
+        self.btn_duplicates.setCheckable(True)
+        self.btn_duplicates.toggled.connect(self.toggle_duplicates)
+
+        self.btn_filter = QToolButton(self)
+        theme_manager().bind_icon(self.btn_filter, "funnel")
+        self.btn_filter.setToolTip("Filter Files")
+        self.btn_filter.setObjectName("toolbar-button")
+        self.btn_filter.setCheckable(True)
+        self.btn_filter.toggled.connect(self.toggle_filter)
+
+        self.btn_sort = QToolButton(self)
+        theme_manager().bind_icon(self.btn_sort, "sort-ascending")
+        self.btn_sort.setToolTip("Sort Files")
+        self.btn_sort.setObjectName("toolbar-button")
+        self.btn_sort.setPopupMode(QToolButton.InstantPopup)
+        self.btn_sort.setMenu(self._sort_menu())
+
         # Adding tools to the toolbar
         toolbar.addAction(left_action)
         toolbar.addWidget(btn_bookmark)
+        toolbar.addWidget(self.btn_search)
+        toolbar.addWidget(self.btn_duplicates)
+        toolbar.addWidget(self.btn_filter)
+        toolbar.addWidget(self.btn_sort)
         toolbar.addAction(right_action)
 
+        # Search replaces the tree while a query is entered
+        self.search_panel = QuiltSearchPanel(self, workspace, search)
+        self.search_panel.active_changed.connect(self._search_active_changed)
+        self.search_panel.hide()
+        self._search_active = False
+
+        # Duplicate groups replace the tree while shown
+        self.duplicates_panel = QuiltDuplicatesPanel(self, workspace)
+        self.duplicates_panel.hide()
+
+        # Narrows and sorts the tree, computed off the GUI thread
+        self.filter_bar = QuiltTreeFilterBar(self, tree.model(), tree_filter)
+        self.filter_bar.hide()
+
+        # Scan progress, hidden once the workspace is loaded
+        self.scan_status = QuiltScanStatus(self)
+
         # Add widgets to the layout
         layout.addWidget(toolbar)
+        layout.addWidget(self.search_panel)
+        layout.addWidget(self.duplicates_panel)
+        layout.addWidget(self.filter_bar)
         layout.addWidget(tree)
+        layout.addWidget(self.scan_status)
 
         # Set the navigation pane layout
         self.setLayout(layout)
@@ -383,9 +960,63 @@ class QuiltNavigationPane(QWidget):
             self.hide()
             #self.parent.setSizes([0, 1])
 
+    @Slot(bool)
+    def toggle_search(self, visible: bool) -> None:
+        self.search_panel.setVisible(visible)
+        if visible:
+            self.btn_duplicates.setChecked(False)
+            self.search_panel.field.setFocus()
+        else:
+            self.search_panel.clear()
+
+    @Slot(bool)
+    def toggle_duplicates(self, visible: bool) -> None:
+        if visible:
+            self.btn_search.setChecked(False)
+        self.duplicates_panel.setVisible(visible)
+        self._update_tree()
+
+    @Slot(bool)
+    def toggle_filter(self, visible: bool) -> None:
+        self._update_tree()
+        if visible:
+            self.filter_bar.field.setFocus()
+        else:
+            self.filter_bar.clear()
+
+    @Slot(bool)
+    def _search_active_changed(self, active: bool) -> None:
+        self._search_active = active
+        self._update_tree()
+
+    def _update_tree(self) -> None:
+        visible = not (self._search_active or self.btn_duplicates.isChecked())
+        self.tree.setVisible(visible)
+        self.filter_bar.setVisible(visible and self.btn_filter.isChecked())
+
+    def _sort_menu(self) -> QMenu:
+        menu = QMenu(self)
+        keys = QActionGroup(menu)
+        for label, sort_key in (("Name", SORT_NAME), ("Size", SORT_SIZE), ("Last Modified", SORT_MODIFIED)):
+            action = menu.addAction(label)
+            action.setData(sort_key)
+            action.setCheckable(True)
+            action.setChecked(sort_key == SORT_NAME)
+            keys.addAction(action)
+        menu.addSeparator()
+        descending = menu.addAction("Descending")
+        descending.setCheckable(True)
+
+        def sort_changed() -> None:
+            self.filter_bar.set_sort(keys.checkedAction().data(), descending.isChecked())
+
+        keys.triggered.connect(sort_changed)
+        descending.toggled.connect(sort_changed)
+        return menu
+
 
 class QuiltViewPane(QWidget):
-    def __init__(self, parent: Optional[QWidget] = None):
+    def __init__(self, parent: Optional[QWidget] = None, pdf_viewer: Optional[QuiltPDFViewer] = None):
         super().__init__(parent)
         
         self.parent = parent
@@ -395,8 +1026,8 @@ class QuiltViewPane(QWidget):
         layout.setSpacing(0)
 
         # Add widgets to the layout
-        #if pdf_viewer is not None:
-        #    layout.addWidget(pdf_viewer)
+        if pdf_viewer is not None:
+            layout.addWidget(pdf_viewer)
     
         # Set the view pane layout
         self.setLayout(layout)
@@ -413,6 +1044,11 @@ class QuiltFeaturePane(QWidget):
         layout.setContentsMargins(0, 0, 0, 0)
         layout.setSpacing(0)
 
+        # Background work at the bottom of the pane
+        self.jobs_panel = QuiltJobsPanel(self)
+        layout.addStretch()
+        layout.addWidget(self.jobs_panel)
+
         # Set the feature pane layout
         self.setLayout(layout)
         self.setObjectName("feature-pane")
@@ -448,9 +1084,9 @@ class QuiltStartView(QWidget):
         btn_settings.setObjectName("startup-button")
 
         # Set icons for buttons
-        btn_new.setIcon(load_icon("plus"))
-        btn_open.setIcon(load_icon("folder-open"))
-        btn_settings.setIcon(load_icon("gear"))
+        theme_manager().bind_icon(btn_new, "plus")
+        theme_manager().bind_icon(btn_open, "folder-open")
+        theme_manager().bind_icon(btn_settings, "gear")
 
         # Connect buttons to their respective functions
         btn_new.clicked.connect(self._new_workspace)
@@ -501,25 +1137,62 @@ class QuiltStartView(QWidget):
 
 
 class QuiltMainView(QWidget):
-    def __init__(self, parent: Optional[QWidget] = None, workspace: Optional[QuiltWorkspace] = None,
-                 quilt_style = None):
+    def __init__(self, parent: Optional[QWidget] = None, workspace: Optional[QuiltWorkspace] = None):
         super().__init__(parent)
         self.parent = parent
         self.workspace = workspace
-        self.quilt_style = quilt_style
 
         # Build necessary components
         self._build_navigation_tree()
 
+        # Keeps the workspace in sync with the file system once it is loaded
+        self.watcher = QuiltWorkspaceWatcher(self.workspace, self)
+        self.watcher.workspace_changed.connect(self._workspace_changed)
+
+        # Extracts document text in the background once the workspace is loaded
+        self.extractor = QuiltExtractionLoader(self.workspace, self)
+        self.extractor.finished.connect(self._extraction_finished)
+        self.extractor.failed.connect(self._extraction_failed)
+        self._extraction_outdated = False
+
+        # Embeds the extracted documents once an extraction run is done
+        self.embedder = QuiltEmbeddingLoader(self.workspace, self)
+        self.embedder.finished.connect(self._embedding_finished)
+        self.embedder.failed.connect(self._embedding_failed)
+        self._embedding_outdated = False
+
+        # Groups near-duplicate documents once an extraction run is done
+        self.duplicates = QuiltDuplicatesLoader(self.workspace, self)
+        self.duplicates.finished.connect(self._duplicates_finished)
+        self.duplicates.failed.connect(self._duplicates_failed)
+        self._duplicates_outdated = False
+
+        # Answers full-text queries over the extracted documents
+        self.search = QuiltSearchLoader(self.workspace, self)
+
+        # Filters and sorts the navigation tree
+        self.tree_filter = QuiltTreeFilterLoader(self.workspace, self)
+
+        # Finds files by their path, from anywhere with Ctrl+P
+        self.quick_open = QuiltQuickOpenLoader(self.workspace, self)
+        self.quick_open_palette = QuiltQuickOpenPalette(self, self.quick_open)
+        self.quick_open_palette.file_selected.connect(self._open_file)
+        QShortcut(QKeySequence("Ctrl+P"), self, self.quick_open_palette.popup)
+
         # Setup widget signaling
-        #self.tree.pdf_selected.connect(self.pdf_viewer.load_pdf)
+        self.pdf_viewer = QuiltPDFViewer()
+        self.tree.pdf_selected.connect(self.pdf_viewer.load_pdf)
+        self.pdf_viewer.pdf_loaded.connect(self.watcher.watch_file)
 
         # Create horizontal splitter
         self.main_splitter = HoverAwareSplitter(Qt.Horizontal)
 
         # Create panes
-        self.navigation_pane = QuiltNavigationPane(self.main_splitter, self.workspace, self.tree)
-        self.view_pane = QuiltViewPane(self.main_splitter)
+        self.navigation_pane = QuiltNavigationPane(self.main_splitter, self.workspace, self.tree, self.search,
+                                                   self.tree_filter)
+        self.navigation_pane.search_panel.pdf_selected.connect(self.pdf_viewer.load_pdf)
+        self.navigation_pane.duplicates_panel.pdf_selected.connect(self.pdf_viewer.load_pdf)
+        self.view_pane = QuiltViewPane(self.main_splitter, self.pdf_viewer)
         self.feature_pane = QuiltFeaturePane(self.main_splitter)
 
         # Set object names for styling
@@ -558,16 +1231,150 @@ class QuiltMainView(QWidget):
         self.setLayout(layout)
         self.setObjectName("main-view")
     
+    @Slot(object)
+    def apply_changes(self, changes: QuiltWorkspaceChanges) -> None:
+        self.workspace.apply_changes(changes)
+        self.model.apply_changes(changes)
+        self.quick_open.apply_changes(changes)
+        self._filter_outdated()
+
+    @Slot(bool)
+    def loading_finished(self, cancelled: bool) -> None:
+        self.navigation_pane.scan_status.hide()
+        self.watcher.start()
+        if not cancelled:
+            self._extract_documents()
+
+    def close_workspace(self) -> None:
+        self.watcher.stop()
+        self.thumbnails.stop()
+        self.extractor.cancel()
+        self.embedder.cancel()
+        self.duplicates.cancel()
+        self.tree_filter.cancel()
+        self.quick_open.stop()
+        self.search.stop()
+
+    def _extract_documents(self) -> None:
+        # Runs are incremental, changes during a run trigger one more run afterwards
+        if self.extractor.is_running():
+            self._extraction_outdated = True
+            return
+        self._extraction_outdated = False
+        self.extractor.start()
+
+    @Slot(object)
+    def _workspace_changed(self, changes: QuiltWorkspaceChanges) -> None:
+        # The watcher already applied the changes to the workspace
+        self.model.apply_changes(changes)
+        self.quick_open.apply_changes(changes)
+        self._filter_outdated()
+        self._extract_documents()
+
+    @Slot(str)
+    def _open_file(self, file_id: str) -> None:
+        # Shown in the tree, with the folders leading to it expanded, and opened if it is a PDF
+        index = self.model.reveal_path(file_id)
+        if index.isValid():
+            self.tree.setCurrentIndex(index)
+            self.tree.scrollTo(index)
+
+        entry = self.workspace.find_pdf_from_path(file_id)
+        if entry is not None:
+            self.pdf_viewer.load_pdf(str(entry.path))
+
+    def _filter_outdated(self) -> None:
+        # A filtered tree only shows new files with the next filter result
+        self.tree_filter.invalidate()
+        if self.model.view is not None:
+            self.navigation_pane.filter_bar.refresh()
+
+    @Slot(object)
+    def _extraction_finished(self, stats: QuiltExtractionStats) -> None:
+        summary = (f"Extracted {stats.extracted} of {stats.total} documents ({stats.cached} unchanged) "
+                   f"in {stats.elapsed:.1f}s, {stats.files_per_second:.0f} files/s")
+        if stats.failed:
+            # Each failure was logged as it happened
+            summary += f", {stats.failed} failed"
+        self.feature_pane.jobs_panel.show_result("extraction", summary)
+        logger.info(summary)
+
+        # The search index was updated along with the documents
+        self.navigation_pane.search_panel.refresh()
+        self._embed_documents()
+        self._find_duplicates()
+        if self._extraction_outdated:
+            self._extract_documents()
+
+    @Slot(str)
+    def _extraction_failed(self, message: str) -> None:
+        self.feature_pane.jobs_panel.show_result("extraction", f"Extracting documents failed: {message}")
+        logger.error("Error extracting documents: %s", message)
+
+    def _embed_documents(self) -> None:
+        if self.embedder.is_running():
+            self._embedding_outdated = True
+            return
+        self._embedding_outdated = False
+        self.embedder.start()
+
+    @Slot(object)
+    def _embedding_finished(self, stats) -> None:
+        summary = (f"Embedded {stats.embedded} of {stats.total} documents ({stats.cached} cached, "
+                   f"{stats.removed} removed), {stats.chunks} chunks in {stats.elapsed:.1f}s, "
+                   f"{stats.chunks_per_second:.0f} chunks/s")
+        self.feature_pane.jobs_panel.show_result("embedding", summary)
+        logger.info(summary)
+        if self._embedding_outdated:
+            self._embed_documents()
+
+    @Slot(str)
+    def _embedding_failed(self, message: str) -> None:
+        self.feature_pane.jobs_panel.show_result("embedding", f"Embedding documents failed: {message}")
+        logger.error("Error embedding documents: %s", message)
+
+    def _find_duplicates(self) -> None:
+        if self.duplicates.is_running():
+            self._duplicates_outdated = True
+            return
+        self._duplicates_outdated = False
+        self.navigation_pane.duplicates_panel.set_running()
+        self.duplicates.start()
+
+    @Slot(object)
+    def _duplicates_finished(self, report) -> None:
+        stats = report.stats
+        summary = (f"Signed {stats.signed} of {stats.total} documents ({stats.cached} cached, "
+                   f"{stats.removed} removed), {stats.groups} duplicate groups in {stats.elapsed:.1f}s "
+                   f"({stats.clustering * 1e3:.0f} ms clustering)")
+        self.feature_pane.jobs_panel.show_result("duplicates", summary)
+        logger.info(summary)
+        self.navigation_pane.duplicates_panel.show_report(report)
+        if self._duplicates_outdated:
+            self._find_duplicates()
+
+    @Slot(str)
+    def _duplicates_failed(self, message: str) -> None:
+        self.feature_pane.jobs_panel.show_result("duplicates", f"Finding duplicates failed: {message}")
+        logger.error("Error finding duplicates: %s", message)
+        self.navigation_pane.duplicates_panel.set_failed()
+
     def _build_navigation_tree(self):
-        # Navigation tree
-        model = QuiltFileSystemModel(self)
-        model.setRootPath(self.workspace.workspace_dir)
-        model.setNameFilters(["*.pdf", "*.md", "*.png", "*.jpg", "*.jpeg", "*.gif"])
-        model.setNameFilterDisables(False)
+        # Navigation tree, PDFs show a preview of their first page once it is rendered.
+        # The model is filled from the workspace index, the file system is not crawled again.
+        self.thumbnails = QuiltThumbnailService(self.workspace, self)
+        self.model = QuiltWorkspaceModel(self.workspace, self, self.thumbnails)
 
+        # The tree only carries its caret rules, everything else comes from the application
+        self.tree = QuiltTreeView(self, self.model, self.workspace, self._caret_style())
+
+        # Re-render the tree icons and carets when the icon color changes
+        theme_manager().theme_changed.connect(self._theme_changed)
+
+    def _caret_style(self) -> str:
         caret_down_path = load_and_save_padded_icon("caret-down", padding=12)
         caret_right_path = load_and_save_padded_icon("caret-right", padding=12)
-        caret_style = f"""
+        return f"""
             QTreeView#navigation-tree::branch:closed:has-children {{
                 image: url({caret_right_path});
             }}
@@ -576,5 +1383,8 @@ class QuiltMainView(QWidget):
                 image: url({caret_down_path});
             }}
             """
-        full_style_sheet = self.quilt_style + caret_style
-        self.tree = QuiltTreeView(self, model, self.workspace, full_style_sheet)
\ No newline at end of file
+
+    @Slot(str)
+    def _theme_changed(self, color_name: str) -> None:
+        self.tree.setStyleSheet(self._caret_style())
+        self.tree.viewport().update()
@@ -2,10 +2,12 @@ from PySide6.QtCore import Qt, Signal, Slot
 from PySide6.QtGui import QIcon
 from PySide6.QtWidgets import QMainWindow, QVBoxLayout, QWidget, QFileDialog
 
-from src.quilt.ui.widgets import QuiltTitleBar, QuiltStartView, QuiltMainView, QuiltNotImplementedPopup
+from src.quilt.loader import QuiltWorkspaceLoader
+from src.quilt.profiling import startup_profiler
+from src.quilt.ui.widgets import QuiltErrorPopup, QuiltTitleBar, QuiltStartView, QuiltMainView, QuiltNotImplementedPopup
 from src.quilt.workspace import QuiltWorkspace
 
-from src.quilt.ui.utils import load_stylesheet
+from src.quilt.ui.style import apply_stylesheet
 
 class QuiltApplication(QMainWindow):
     toggle_layout_options = Signal(bool)
@@ -23,15 +25,19 @@ class QuiltApplication(QMainWindow):
         self._resize_edge = None
         self.setMouseTracking(True)
 
+        # Open workspace
+        self._main_view = None
+        self._loader = None
+
         # Set window icon
         self.setWindowIcon(QIcon("assets/quilt-nomid.ico"))
 
         # Set window title
         self.setWindowTitle("Quilt")
 
-        # Load stylesheets
-        self.quilt_style = load_stylesheet("quilt-style")
-        self.setStyleSheet(self.quilt_style)
+        # The stylesheet is applied once on the application and inherited by every widget
+        with startup_profiler.phase("stylesheet"):
+            apply_stylesheet("quilt-style")
 
         # Main layout
         layout = QVBoxLayout()
@@ -52,7 +58,6 @@ class QuiltApplication(QMainWindow):
         # Central widget
         central = QWidget()
         central.setLayout(layout)
-        central.setStyleSheet(self.quilt_style)
         self.setCentralWidget(central)
         self._enable_tracking()
 
@@ -65,11 +70,19 @@ class QuiltApplication(QMainWindow):
         # Open a file dialog to select a workspace
         workspace_dir = QFileDialog.getExistingDirectory(self, " Open Workspace")
         if workspace_dir:
-            workspace = QuiltWorkspace(workspace_dir)
+            try:
+                workspace = QuiltWorkspace(workspace_dir, load=False)
+            except (FileNotFoundError, ValueError) as e:
+                QuiltErrorPopup(self, "Error", str(e))
+                return
+
+            # Opening another workspace cancels the scan in progress
+            self._close_workspace()
 
             # Obtain titlebar and layout
             titlebar = QuiltTitleBar(self)
-            view = QuiltMainView(self, workspace, self.quilt_style)
+            view = QuiltMainView(self, workspace)
+            self._main_view = view
 
             layout = QVBoxLayout()
             layout.setContentsMargins(0, 0, 0, 0)
@@ -80,7 +93,6 @@ class QuiltApplication(QMainWindow):
             # Central widget
             central = QWidget()
             central.setLayout(layout)
-            central.setStyleSheet(self.quilt_style)
             self.setCentralWidget(central)
             self._enable_tracking()
 
@@ -91,6 +103,34 @@ class QuiltApplication(QMainWindow):
             titlebar.toggle_navigation.connect(view.navigation_pane.toggle)
             titlebar.toggle_features.connect(view.feature_pane.toggle)
 
+            # Fill the workspace in the background, the view updates as batches arrive
+            self._loader = QuiltWorkspaceLoader(workspace, self)
+            self._loader.batch_loaded.connect(view.apply_changes)
+            self._loader.progress.connect(view.navigation_pane.scan_status.update_progress)
+            self._loader.finished.connect(view.loading_finished)
+            self._loader.failed.connect(self._loading_failed)
+            view.navigation_pane.scan_status.cancel_requested.connect(self._loader.cancel)
+            self._loader.start()
+
+    def _close_workspace(self):
+        if self._loader is not None:
+            # A cancelled scan still winds down, the loader goes once its job is done
+            loader, self._loader = self._loader, None
+            loader.cancel()
+            if loader.is_running():
+                loader.finished.connect(loader.deleteLater)
+                loader.failed.connect(loader.deleteLater)
+            else:
+                loader.deleteLater()
+
+        if self._main_view is not None:
+            self._main_view.close_workspace()
+            self._main_view = None
+
+    @Slot(str)
+    def _loading_failed(self, message):
+        QuiltErrorPopup(self, "Error", f"Failed to load workspace: {message}")
+
     @Slot()
     def _open_settings(self):
         QuiltNotImplementedPopup(self)
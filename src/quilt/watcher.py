@@ -0,0 +1,237 @@
+import os
+import time
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+from PySide6.QtCore import QFileSystemWatcher, QObject, Qt, QTimer, Signal, Slot
+
+from src.quilt.index import QuiltWorkspaceChanges
+from src.quilt.jobs import PRIORITY_BACKGROUND, QuiltJob, job_runtime
+from src.quilt.workspace import QuiltWorkspace
+
+DEFAULT_DEBOUNCE_INTERVAL = 250
+DEFAULT_MAX_LATENCY = 2000
+DEFAULT_POLL_INTERVAL = 5000
+DEFAULT_SWEEP_INTERVAL = 30000
+
+# Files opened last, the sweep stats these and nothing else
+RECENT_FILES = 32
+
+
+class QuiltWorkspaceWatcher(QObject):
+    """Keeps a QuiltWorkspace in sync with the file system while it is open.
+
+    Directories are watched through QFileSystemWatcher, which uses inotify on
+    Linux. When the watch limit is hit, or when `polling` is requested, the
+    watcher instead compares directory mtimes against the index on a timer.
+
+    Change notifications are debounced: every event restarts a short quiet
+    period and all directories touched in the meantime are re-listed together
+    on a worker thread, so a large checkout results in a single coalesced
+    `workspace_changed` emission.
+
+    Writing a file in place leaves its directory untouched, so the file open
+    in the viewer gets a watch of its own through `watch_file`, and is stat'ed
+    against the index when it is opened. The last RECENT_FILES opened files
+    are stat'ed again on a slower sweep timer, which a `sweep_interval` of 0
+    turns off. Those checks run as background jobs on the job runtime, so
+    they never hold up re-listing directories.
+    """
+    workspace_changed = Signal(object)
+    _changes_ready = Signal(object)
+    _files_modified = Signal(object)
+
+    def __init__(self, workspace: QuiltWorkspace, parent: Optional[QObject] = None, polling: bool = False,
+                 debounce_interval: int = DEFAULT_DEBOUNCE_INTERVAL, max_latency: int = DEFAULT_MAX_LATENCY,
+                 poll_interval: int = DEFAULT_POLL_INTERVAL, sweep_interval: int = DEFAULT_SWEEP_INTERVAL):
+        super().__init__(parent)
+        self.workspace = workspace
+        self.polling = polling
+        self.max_latency = max_latency
+
+        self._dirty = set()
+        self._watched_file = None
+        self._recent_files = deque(maxlen=RECENT_FILES)
+        self._checks = []
+        self._first_event = None
+        self._refreshing = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='quilt-watch')
+        self._changes_ready.connect(self._apply_changes, Qt.QueuedConnection)
+        self._files_modified.connect(self._mark_directories_dirty, Qt.QueuedConnection)
+
+        # Debounce timer, restarted on every event
+        self._debounce_timer = QTimer(self)
+        self._debounce_timer.setSingleShot(True)
+        self._debounce_timer.setInterval(debounce_interval)
+        self._debounce_timer.timeout.connect(self._flush)
+
+        # Polling fallback
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setInterval(poll_interval)
+        self._poll_timer.timeout.connect(self._poll)
+
+        # Recently opened files written in place, in every mode
+        self.sweep_interval = sweep_interval
+        self._sweep_timer = QTimer(self)
+        self._sweep_timer.setInterval(sweep_interval)
+        self._sweep_timer.timeout.connect(self._sweep)
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._directory_changed)
+        self._watcher.fileChanged.connect(self._file_changed)
+
+    def start(self) -> None:
+        if not self.polling:
+            self._watch(self.workspace.index.directories())
+
+        if self.polling:
+            self._poll_timer.start()
+        if self.sweep_interval > 0:
+            self._sweep_timer.start()
+
+    def stop(self) -> None:
+        self._debounce_timer.stop()
+        self._poll_timer.stop()
+        self._sweep_timer.stop()
+        if self._watcher.directories():
+            self._watcher.removePaths(self._watcher.directories())
+        if self._watcher.files():
+            self._watcher.removePaths(self._watcher.files())
+        self._watched_file = None
+        for job in self._checks:
+            job.cancel()
+        self._checks = []
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    @Slot(str)
+    def watch_file(self, path: str) -> None:
+        """Watch a single file for in-place writes, such as the document open in the viewer.
+
+        Replaces the previously watched file.
+        """
+        if self._watched_file in self._watcher.files():
+            self._watcher.removePath(self._watched_file)
+
+        file_id = self.workspace.relative_path(path)
+        self._watched_file = os.path.join(self.workspace.workspace_dir, file_id)
+        self._watcher.addPath(self._watched_file)
+
+        if file_id in self._recent_files:
+            self._recent_files.remove(file_id)
+        self._recent_files.append(file_id)
+
+        # It may have been written in place while nobody watched, such as before the workspace was opened
+        self._check_files(('check-file', self.workspace.workspace_dir, file_id), [file_id])
+
+    def _watch(self, directories: Iterable[str]) -> None:
+        paths = [self._absolute(directory) for directory in directories]
+        if not paths:
+            return
+
+        failed = self._watcher.addPaths(paths)
+        if failed:
+            # Most likely out of inotify watches, fall back to polling everything
+            print(f"Could not watch {len(failed)} directories, falling back to polling.")
+            self._watcher.removePaths(self._watcher.directories())
+            self.polling = True
+            self._poll_timer.start()
+
+    def _absolute(self, directory: str) -> str:
+        return os.path.join(self.workspace.workspace_dir, directory) if directory else self.workspace.workspace_dir
+
+    @Slot(str)
+    def _directory_changed(self, path: str) -> None:
+        directory = os.path.relpath(path, self.workspace.workspace_dir)
+        self._mark_dirty('' if directory == os.curdir else directory)
+
+    @Slot(str)
+    def _file_changed(self, path: str) -> None:
+        # Editors that save by replacing the file drop the watch, it is added again
+        if path == self._watched_file and path not in self._watcher.files() and os.path.exists(path):
+            self._watcher.addPath(path)
+        self._directory_changed(os.path.dirname(path))
+
+    @Slot(object)
+    def _mark_directories_dirty(self, directories: list) -> None:
+        for directory in directories:
+            self._mark_dirty(directory)
+
+    def _mark_dirty(self, directory: str) -> None:
+        self._dirty.add(directory)
+        if self._first_event is None:
+            self._first_event = time.monotonic()
+
+        # Flush right away once events have been arriving for longer than the max latency
+        if (time.monotonic() - self._first_event) * 1000 >= self.max_latency:
+            self._flush()
+        else:
+            self._debounce_timer.start()
+
+    @Slot()
+    def _flush(self) -> None:
+        self._debounce_timer.stop()
+        if self._refreshing or not self._dirty:
+            return
+
+        directories = sorted(self._dirty)
+        self._dirty.clear()
+        self._first_event = None
+        self._refreshing = True
+        self._executor.submit(self._refresh, directories)
+
+    @Slot()
+    def _poll(self) -> None:
+        if not self._refreshing:
+            self._refreshing = True
+            self._executor.submit(self._refresh, None)
+
+    @Slot()
+    def _sweep(self) -> None:
+        if self._recent_files:
+            self._check_files(('check-files', self.workspace.workspace_dir), list(self._recent_files))
+
+    def _check_files(self, key: tuple, file_ids: list) -> None:
+        self._checks = [job for job in self._checks if not job.done()]
+        self._checks.append(job_runtime().submit('Checking files', self._find_modified, file_ids, key=key,
+                                                 priority=PRIORITY_BACKGROUND, tracked=False))
+
+    def _find_modified(self, job: QuiltJob, file_ids: list) -> None:
+        # Runs on the job runtime, the directories are re-listed by the usual debounced flush
+        try:
+            directories = self.workspace.index.modified_directories(file_ids)
+        except Exception as e:
+            print(f"Error checking files for changes: {e}")
+            return
+
+        if directories and not job.cancelled():
+            self._files_modified.emit(directories)
+
+    def _refresh(self, directories: Optional[list]) -> None:
+        # Runs on the worker thread, only the index is touched here
+        try:
+            if directories is None:
+                directories = self.workspace.index.stale_directories()
+            changes = self.workspace.index.refresh_directories(directories) if directories else QuiltWorkspaceChanges()
+        except Exception as e:
+            print(f"Error refreshing workspace: {e}")
+            changes = QuiltWorkspaceChanges()
+
+        self._changes_ready.emit(changes)
+
+    @Slot(object)
+    def _apply_changes(self, changes: QuiltWorkspaceChanges) -> None:
+        self._refreshing = False
+
+        if changes:
+            self.workspace.apply_changes(changes)
+
+            if not self.polling:
+                self._watch(changes.added_directories)
+
+            self.workspace_changed.emit(changes)
+
+        # Events that arrived while the refresh was running
+        if self._dirty and not self._debounce_timer.isActive():
+            self._debounce_timer.start()
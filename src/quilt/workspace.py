@@ -1,54 +1,87 @@
 import os
-import yaml
 
-from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
+
+from src.quilt.entries import QuiltEntryRecord, QuiltEntryStore
+from src.quilt.extraction import QuiltDocumentStore
+from src.quilt.hashing import QuiltContentHashStore
+from src.quilt.index import QuiltWorkspaceChanges, QuiltWorkspaceIndex
+from src.quilt.scanner import DEFAULT_SCAN_WORKERS, QuiltScanProgress
 
 class QuiltWorkspace():
-    def __init__(self, workspace_dir: str):
+    def __init__(self, workspace_dir: str, scan_workers: int = DEFAULT_SCAN_WORKERS,
+                 progress_callback: Optional[Callable[[QuiltScanProgress], None]] = None, load: bool = True):
         self.workspace_dir = workspace_dir
 
+        # Columnar entry store, the metadata attributes are read-only views on it
+        self.entries = QuiltEntryStore(self.workspace_dir)
+        self.markdown_metadata = self.entries.view('markdown')
+        self.pdf_metadata = self.entries.view('pdf')
+        self.image_metadata = self.entries.view('image')
+
         # Find .quilt file
         quilt_file = os.path.join(self.workspace_dir, '.quilt')
         if not os.path.exists(quilt_file):
             raise FileNotFoundError(f"No .quilt file found in {self.workspace_dir}")
         
+        # Imported here as it is only needed once a workspace is opened
+        import yaml
+
         with open(quilt_file, 'r') as file:
             # Assuming the .quilt file is in YAML format
             try:
                 self.workspace_data = yaml.safe_load(file)
                 self.workspace_name = self.workspace_data.get('name', 'Untitled Workspace')
-
-                # Load files
-                markdown_entries = list(Path(self.workspace_dir).rglob('**/*.md'))
-                pdf_entries = list(Path(self.workspace_dir).rglob('**/*.pdf'))
-                image_entries = list(Path(self.workspace_dir).rglob('**/*.{png,jpg,jpeg,gif}'))
-
-                self.markdown_metadata = self.extract_file_metadata(markdown_entries)
-                self.pdf_metadata = self.extract_file_metadata(pdf_entries)
-                self.image_metadata = self.extract_file_metadata(image_entries)
             except yaml.YAMLError as e:
                 raise ValueError(f"Error parsing .quilt file: {e}")
-            
-
-    def extract_file_metadata(self, files):
-        metadata = {}
-        for file in files:
-            # Generate unique identifier for the file
-            file_id = os.path.relpath(file, self.workspace_dir)
-            metadata[file_id] = {
-                'name': os.path.basename(file),
-                'path': file,
-                'size': os.path.getsize(file),
-                'last_modified': os.path.getmtime(file)
-            }
-
-        return metadata
-    
-    def find_pdf_from_name(self, file_id: str) -> Optional[dict]:
-        """Find PDF metadata by file name."""
-
-        for pdf_id, pdf_data in self.pdf_metadata.items():
-            if pdf_data['name'] == file_id:
-                return pdf_data
+
+        # Files are loaded from the persistent index, re-listing only changed directories.
+        # Without `load` the metadata starts empty and is filled through apply_changes,
+        # see QuiltWorkspaceLoader.
+        self.index = QuiltWorkspaceIndex(self.workspace_dir)
+
+        # Content hashes of the files, computed on demand and kept across renames
+        self.hashes = QuiltContentHashStore(self.workspace_dir)
+
+        # Extracted text and metadata, filled by QuiltExtractionPipeline
+        self.documents = QuiltDocumentStore(self.workspace_dir)
+        if load:
+            self.index.refresh(scan_workers, progress_callback)
+            self.apply_changes(QuiltWorkspaceChanges(added=self.index.entries()))
+
+    def apply_changes(self, changes: QuiltWorkspaceChanges) -> None:
+        """Apply an incremental index refresh to the metadata views in place."""
+        for row in changes.removed:
+            self.entries.remove(row[0])
+
+        for old_row, new_row in changes.renamed:
+            self.entries.remove(old_row[0])
+            self.entries.add(new_row)
+
+        for row in changes.added + changes.modified:
+            self.entries.add(row)
+
+    def relative_path(self, path: str) -> str:
+        """Return the file id for a path, which may be absolute or relative to the workspace."""
+        if os.path.isabs(path):
+            path = os.path.relpath(path, self.workspace_dir)
+        return os.path.normpath(path)
+
+    def find_entry_from_path(self, path: str) -> Optional[QuiltEntryRecord]:
+        """Find file metadata by its full or workspace-relative path."""
+        return self.entries.get(self.relative_path(path))
+
+    def find_pdf_from_path(self, path: str) -> Optional[QuiltEntryRecord]:
+        """Find PDF metadata by its full or workspace-relative path."""
+        return self.pdf_metadata.get(self.relative_path(path))
+
+    def find_pdf_from_name(self, file_id: str) -> Optional[QuiltEntryRecord]:
+        """Find PDF metadata by file name.
+
+        File names are not unique across folders, the first match is returned.
+        Prefer find_pdf_from_path where the full path is known.
+        """
+        for entry in self.entries.find_by_name(file_id):
+            if entry.kind == 'pdf':
+                return entry
         return None
\ No newline at end of file
@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+def qapp():
+    """The application, whose event loop delivers signals of background work."""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide6.QtWidgets import QApplication
+
+    from src.quilt.jobs import shutdown_job_runtime
+
+    application = QApplication.instance() or QApplication([])
+    yield application
+    shutdown_job_runtime()
+
+
+def wait_for(signal, timeout: int = 5000) -> list:
+    """Run the event loop until `signal` is emitted, and return its arguments."""
+    from PySide6.QtCore import QEventLoop, QTimer
+
+    loop = QEventLoop()
+    emitted = []
+
+    def receive(*args):
+        emitted.extend(args)
+        loop.quit()
+
+    signal.connect(receive)
+    QTimer.singleShot(timeout, loop.quit)
+    loop.exec()
+    signal.disconnect(receive)
+    return emitted
+
+
+def write_pdf(path: str, pages: int = 1) -> None:
+    """Write a PDF of A4 pages with a line of text on each."""
+    from PySide6.QtGui import QPageSize, QPainter, QPdfWriter
+
+    writer = QPdfWriter(path)
+    writer.setPageSize(QPageSize(QPageSize.A4))
+    painter = QPainter(writer)
+    for page in range(pages):
+        if page:
+            writer.newPage()
+        painter.drawText(100, 100, f'Page {page + 1}')
+    painter.end()
@@ -0,0 +1,117 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.quilt.duplicates import QuiltDuplicateDetector, QuiltMinHasher, QuiltSignatureStore, near_duplicate_pairs
+from src.quilt.extraction import QuiltDocument, QuiltDocumentStore
+
+
+def text(words: int, seed: int) -> str:
+    generator = np.random.default_rng(seed)
+    return ' '.join(f'w{value}' for value in generator.integers(0, 5000, words))
+
+
+def reword(source: str, every: int) -> str:
+    words = source.split()
+    return ' '.join('changed' if i % every == 0 else word for i, word in enumerate(words))
+
+
+def test_signature_of_short_text_is_none():
+    assert QuiltMinHasher(min_words=50).signature(text(49, 1)) is None
+
+
+def test_signature_is_deterministic_and_case_insensitive():
+    source = text(200, 1)
+    signature = QuiltMinHasher().signature(source)
+
+    assert signature.dtype == np.uint32
+    assert len(signature) == 128
+    assert np.array_equal(signature, QuiltMinHasher().signature(source.upper()))
+
+
+def test_signatures_estimate_similarity():
+    hasher = QuiltMinHasher()
+    source = text(2000, 1)
+    same = hasher.signature(source)
+    close = hasher.signature(reword(source, 200))
+    other = hasher.signature(text(2000, 2))
+
+    assert (same == close).mean() > 0.8
+    assert (same == other).mean() < 0.1
+
+
+def test_near_duplicate_pairs():
+    hasher = QuiltMinHasher()
+    first, second = text(2000, 1), text(2000, 2)
+    signatures = np.stack([
+        hasher.signature(first),
+        hasher.signature(second),
+        hasher.signature(reword(first, 200)),
+        hasher.signature(first),
+        hasher.signature(reword(second, 4)),
+    ])
+
+    pairs, similarities = near_duplicate_pairs(signatures)
+
+    # Rows are compared with their bucket leader, so the copies of the first text are joined through row 0
+    assert sorted(map(tuple, np.sort(pairs, axis=1).tolist())) == [(0, 2), (0, 3)]
+    assert sorted(similarities.tolist())[-1] == 1.0
+    assert similarities.min() >= 0.8
+
+
+def test_near_duplicate_pairs_of_a_single_row():
+    pairs, similarities = near_duplicate_pairs(np.zeros((1, 128), dtype=np.uint32))
+    assert pairs.shape == (0, 2)
+    assert len(similarities) == 0
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    store = QuiltDocumentStore(str(tmp_path))
+    original = text(600, 1)
+    contents = {'a.md': original, 'b.md': reword(original, 50), 'c.md': text(600, 2), 'short.md': 'too short'}
+    documents = {name: QuiltDocument(f'{i:040x}', 'markdown', body) for i, (name, body) in enumerate(contents.items())}
+
+    files = [(name, 1, 0.0, document.content_hash) for name, document in documents.items()]
+    # A copy shares the document of c.md
+    files.append(('copy-of-c.md', 1, 0.0, documents['c.md'].content_hash))
+    store.store(files, documents.values())
+
+    yield SimpleNamespace(workspace_dir=str(tmp_path), documents=store)
+    store.close()
+
+
+def test_detector_groups_near_and_exact_duplicates(workspace):
+    detector = QuiltDuplicateDetector(workspace)
+    report = detector.run()
+
+    assert (report.stats.total, report.stats.signed, report.stats.cached) == (4, 4, 0)
+    assert [group.files for group in report.groups] == [['a.md', 'b.md'], ['c.md', 'copy-of-c.md']]
+    assert 0.8 < report.groups[0].similarity < 1.0
+    assert report.groups[1].similarity == 1.0
+
+    # Signatures are cached by content, contents no file has anymore are dropped
+    workspace.documents.remove(['b.md'])
+    workspace.documents.prune()
+    report = detector.run()
+    detector.close()
+
+    assert (report.stats.total, report.stats.signed, report.stats.cached, report.stats.removed) == (3, 0, 3, 1)
+    assert [group.files for group in report.groups] == [['c.md', 'copy-of-c.md']]
+
+
+def test_signature_store_starts_over_with_other_settings(tmp_path):
+    store = QuiltSignatureStore(str(tmp_path), 'first')
+    store.add([('a', np.arange(4, dtype=np.uint32)), ('b', None)])
+    store.close()
+
+    store = QuiltSignatureStore(str(tmp_path), 'first')
+    digests, matrix = store.signatures(4)
+    assert store.content_hashes() == {'a', 'b'}
+    assert digests == ['a'] and matrix.tolist() == [[0, 1, 2, 3]]
+    store.close()
+
+    store = QuiltSignatureStore(str(tmp_path), 'second')
+    assert store.content_hashes() == set()
+    store.close()
@@ -0,0 +1,135 @@
+import numpy as np
+import pytest
+
+from src.quilt.embeddings import MIN_CAPACITY, QuiltHashingBackend, QuiltVectorStore, chunk_spans, create_backend
+
+
+def unit(values) -> np.ndarray:
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_chunk_spans_overlap_and_cover_the_text():
+    text = ' '.join(f'word{i}' for i in range(25))
+    spans = chunk_spans(text, words=10, overlap=4)
+
+    assert [text[start:end].split()[0] for start, end in spans] == ['word0', 'word6', 'word12', 'word18']
+    assert spans[-1][1] == len(text)
+    assert all(len(text[start:end].split()) <= 10 for start, end in spans)
+
+
+def test_chunk_spans_of_empty_text():
+    assert chunk_spans('   \n') == []
+
+
+def test_hashing_backend_is_deterministic_and_unit_length():
+    backend = QuiltHashingBackend(dimensions=64)
+    texts = ['Quilt indexes a workspace of notes', 'and papers']
+
+    first = backend.embed(texts)
+    second = QuiltHashingBackend(dimensions=64).embed(texts)
+
+    assert first.shape == (2, 64)
+    assert first.dtype == np.float32
+    assert np.array_equal(first, second)
+    assert np.allclose(np.linalg.norm(first, axis=1), 1.0)
+
+
+def test_hashing_backend_places_similar_texts_closer():
+    backend = QuiltHashingBackend()
+    query, similar, other = backend.embed([
+        'gradient descent on neural networks',
+        'neural networks trained by gradient descent',
+        'a recipe for sourdough bread',
+    ])
+
+    assert query @ similar > query @ other
+
+
+def test_hashing_backend_model_id_depends_on_its_settings():
+    assert QuiltHashingBackend(dimensions=64).model_id != QuiltHashingBackend(dimensions=128).model_id
+
+
+def test_create_backend():
+    assert isinstance(create_backend('hashing', dimensions=32), QuiltHashingBackend)
+    with pytest.raises(ValueError):
+        create_backend('missing')
+
+
+def test_vector_store_add_and_remove(tmp_path):
+    store = QuiltVectorStore(str(tmp_path), 'test', 3)
+    store.add([
+        ('a', np.stack([unit([1, 0, 0]), unit([0, 1, 0])]), [(0, 5), (5, 10)]),
+        ('b', np.stack([unit([0, 0, 1])]), [(0, 4)]),
+    ])
+
+    assert len(store) == 3
+    assert store.content_hashes() == {'a', 'b'}
+    assert np.allclose(store.vectors('a'), [unit([1, 0, 0]), unit([0, 1, 0])])
+
+    assert store.remove(['a']) == 2
+    assert len(store) == 1
+    assert store.content_hashes() == {'b'}
+    assert store.dead_fraction() == pytest.approx(2 / 3)
+    store.close()
+
+
+def test_vector_store_nearest(tmp_path):
+    store = QuiltVectorStore(str(tmp_path), 'test', 3)
+    store.add([
+        ('a', np.stack([unit([1, 0, 0]), unit([1, 1, 0])]), [(0, 5), (5, 10)]),
+        ('b', np.stack([unit([0, 1, 0])]), [(0, 4)]),
+        ('c', np.stack([unit([0, 0, 1])]), [(0, 7)]),
+    ])
+
+    neighbors = store.nearest(unit([1, 0.2, 0]), k=2)
+    assert [(neighbor.content_hash, neighbor.chunk) for neighbor in neighbors] == [('a', 0), ('b', 0)]
+    assert neighbors[0].score > neighbors[1].score
+
+    chunks = store.nearest(unit([1, 0.2, 0]), k=2, per_document=False)
+    assert [(neighbor.content_hash, neighbor.chunk, neighbor.start, neighbor.end) for neighbor in chunks] == [
+        ('a', 0, 0, 5), ('a', 1, 5, 10)
+    ]
+
+    store.remove(['a'])
+    assert [neighbor.content_hash for neighbor in store.nearest(unit([1, 0.5, 0.2]), k=5)] == ['b', 'c']
+    store.close()
+
+
+def test_vector_store_compact_keeps_the_live_vectors(tmp_path):
+    store = QuiltVectorStore(str(tmp_path), 'test', 3)
+    store.add([(f'doc{i}', np.stack([unit([1, i, 0])]), [(0, 1)]) for i in range(10)])
+    store.remove([f'doc{i}' for i in range(0, 10, 2)])
+
+    store.compact()
+    assert store.dead_fraction() == 0.0
+    assert len(store) == 5
+    assert np.allclose(store.vectors('doc3'), [unit([1, 3, 0])])
+    store.close()
+
+    # The compacted file is what a reopened store reads
+    store = QuiltVectorStore(str(tmp_path), 'test', 3)
+    assert store.content_hashes() == {f'doc{i}' for i in range(1, 10, 2)}
+    assert store.nearest(unit([1, 7, 0]), k=1)[0].content_hash == 'doc7'
+    store.close()
+
+
+def test_vector_store_grows_past_its_capacity(tmp_path):
+    store = QuiltVectorStore(str(tmp_path), 'test', 2)
+    vectors = np.tile(unit([1, 0]), (MIN_CAPACITY + 10, 1))
+    store.add([('big', vectors, [(i, i + 1) for i in range(len(vectors))])])
+
+    assert len(store) == MIN_CAPACITY + 10
+    assert store.vectors('big').shape == (MIN_CAPACITY + 10, 2)
+    store.close()
+
+
+def test_vector_store_starts_over_for_another_model(tmp_path):
+    store = QuiltVectorStore(str(tmp_path), 'test', 3)
+    store.add([('a', np.stack([unit([1, 0, 0])]), [(0, 1)])])
+    store.close()
+
+    store = QuiltVectorStore(str(tmp_path), 'other', 3)
+    assert len(store) == 0
+    assert store.content_hashes() == set()
+    store.close()
@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+from src.quilt.entries import QuiltEntryStore
+
+ROWS = [
+    ('a.md', '', 'a.md', 'markdown', 10, 1.0),
+    (os.path.join('papers', 'b.pdf'), 'papers', 'b.pdf', 'pdf', 20, 2.0),
+    (os.path.join('papers', 'c.PDF'), 'papers', 'c.PDF', 'pdf', 30, 3.0),
+    (os.path.join('notes', 'a.md'), 'notes', 'a.md', 'markdown', 40, 4.0),
+]
+
+
+def test_lookups(tmp_path):
+    store = QuiltEntryStore(str(tmp_path), ROWS)
+
+    assert len(store) == 4
+    assert os.path.join('papers', 'b.pdf') in store
+    assert store.get(os.path.join('papers', 'b.pdf')).row() == ROWS[1]
+    assert store.get('missing.md') is None
+    assert sorted(record.file_id for record in store.find_by_name('a.md')) == sorted([ROWS[0][0], ROWS[3][0]])
+    assert sorted(record.name for record in store.find_by_extension('.pdf')) == ['b.pdf', 'c.PDF']
+    assert [record.name for record in store.children('papers')] == ['b.pdf', 'c.PDF']
+    assert [record.name for record in store.children('')] == ['a.md']
+    assert sorted(store.view('markdown')) == sorted([ROWS[0][0], ROWS[3][0]])
+    assert len(store.view('image')) == 0
+
+
+
+def test_record_mapping(tmp_path):
+    store = QuiltEntryStore(str(tmp_path), ROWS)
+    record = store.get(os.path.join('papers', 'b.pdf'))
+
+    assert dict(record) == {'name': 'b.pdf', 'path': tmp_path / 'papers' / 'b.pdf', 'size': 20, 'last_modified': 2.0}
+
+
+def test_add_replaces_an_existing_entry(tmp_path):
+    store = QuiltEntryStore(str(tmp_path), ROWS)
+    store.add(('a.md', '', 'a.md', 'markdown', 11, 5.0))
+
+    assert len(store) == 4
+    assert store.get('a.md').row() == ('a.md', '', 'a.md', 'markdown', 11, 5.0)
+
+
+def test_remove_frees_the_slot_and_its_keys(tmp_path):
+    store = QuiltEntryStore(str(tmp_path), ROWS)
+
+    assert store.remove(os.path.join('papers', 'b.pdf'))
+    assert not store.remove(os.path.join('papers', 'b.pdf'))
+    assert len(store) == 3
+    assert len(store.view('pdf')) == 1
+    assert store.find_by_name('b.pdf') == []
+    assert [record.name for record in store.find_by_extension('.pdf')] == ['c.PDF']
+
+    # The freed slot is reused by the next entry
+    store.add(('d.png', '', 'd.png', 'image', 50, 6.0))
+    assert len(store) == 4
+    assert sorted(record.file_id for record in store) == sorted([ROWS[0][0], ROWS[2][0], ROWS[3][0], 'd.png'])
+
+
+def test_views_follow_the_store(tmp_path):
+    store = QuiltEntryStore(str(tmp_path), ROWS)
+    pdfs = store.view('pdf')
+
+    # A file that changes kind moves between the views
+    store.add(('a.md', '', 'a.md', 'pdf', 10, 1.0))
+    assert len(pdfs) == 3
+    assert len(store.view('markdown')) == 1
+    assert pdfs['a.md'].size == 10
+    with pytest.raises(KeyError):
+        store.view('markdown')['a.md']
+
+
+def test_names_shared_by_several_entries(tmp_path):
+    store = QuiltEntryStore(str(tmp_path), ROWS)
+
+    # The second entry named a.md turns the name key into a set, removing one leaves the other
+    assert store.remove('a.md')
+    assert [record.file_id for record in store.find_by_name('a.md')] == [os.path.join('notes', 'a.md')]
+    assert store.remove(os.path.join('notes', 'a.md'))
+    assert store.find_by_name('a.md') == []
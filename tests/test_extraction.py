@@ -0,0 +1,107 @@
+import os
+import shutil
+
+import pytest
+
+from conftest import write_pdf
+from src.quilt.extraction import QuiltExtractionPipeline, extract_markdown, fold_term, index_terms
+from src.quilt.jobs import QuiltJobRuntime
+from src.quilt.workspace import QuiltWorkspace
+
+
+def write(path, content: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(content)
+
+
+@pytest.fixture
+def runtime():
+    runtime = QuiltJobRuntime(thread_workers=1, process_workers=1)
+    yield runtime
+    runtime.shutdown()
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    write(tmp_path / '.quilt', 'name: Test')
+    write(tmp_path / 'a.md', '# Binding\n\nSew the binding to the edges.')
+    write(tmp_path / 'notes' / 'b.md', 'Cotton batting.')
+    workspace = QuiltWorkspace(str(tmp_path), scan_workers=2)
+    yield workspace
+    workspace.index.close()
+    workspace.hashes.close()
+    workspace.documents.close()
+
+
+def refresh(workspace: QuiltWorkspace) -> None:
+    workspace.apply_changes(workspace.index.refresh_directories(workspace.index.directories()))
+
+
+def test_fold_term():
+    assert fold_term('Quilt') == 'quilt'
+    assert fold_term('Appliqué') == 'applique'
+    assert index_terms('The binding, the EDGES') == {'the', 'binding', 'edges'}
+
+
+def test_extract_markdown_front_matter_and_heading(tmp_path):
+    write(tmp_path / 'a.md', '---\ntitle: Log Cabin\nauthor: Ada\n---\n# Heading\nText')
+    write(tmp_path / 'b.md', 'Intro\n\n# First heading #\n\n# Second')
+
+    assert extract_markdown(str(tmp_path / 'a.md')) == ('# Heading\nText', None, 'Log Cabin', 'Ada')
+    assert extract_markdown(str(tmp_path / 'b.md'))[2] == 'First heading'
+
+
+def test_extract_pdf(qapp, tmp_path):
+    from src.quilt.extraction import extract_pdf
+
+    write_pdf(str(tmp_path / 'paper.pdf'), 2)
+    text, page_count, _, _ = extract_pdf(str(tmp_path / 'paper.pdf'))
+
+    assert page_count == 2
+    assert text.split('\f') == ['Page 1', 'Page 2']
+    with pytest.raises(ValueError):
+        extract_pdf(str(tmp_path / 'missing.pdf'))
+
+
+def test_pipeline_extracts_only_what_changed(workspace, runtime):
+    pipeline = QuiltExtractionPipeline(workspace, runtime=runtime, hash_workers=2)
+    extracted = []
+
+    stats = pipeline.run(result_callback=lambda file_id, document: extracted.append(file_id))
+    assert (stats.total, stats.extracted, stats.cached, stats.failed) == (2, 2, 0, 0)
+    assert sorted(extracted) == ['a.md', os.path.join('notes', 'b.md')]
+    assert workspace.documents.document('a.md').title == 'Binding'
+
+    # Unchanged files are skipped, copies are linked to the document extracted before
+    shutil.copy(os.path.join(workspace.workspace_dir, 'a.md'), os.path.join(workspace.workspace_dir, 'copy.md'))
+    refresh(workspace)
+    stats = pipeline.run()
+    assert (stats.total, stats.extracted, stats.cached) == (3, 0, 3)
+    assert workspace.documents.paths(workspace.documents.document('a.md').content_hash) == ['a.md', 'copy.md']
+
+
+def test_pipeline_drops_removed_and_replaced_documents(workspace, runtime):
+    pipeline = QuiltExtractionPipeline(workspace, runtime=runtime, hash_workers=2)
+    pipeline.run()
+
+    os.remove(os.path.join(workspace.workspace_dir, 'a.md'))
+    write(os.path.join(workspace.workspace_dir, 'notes', 'b.md'), 'Wool batting, a longer note.')
+    refresh(workspace)
+    stats = pipeline.run()
+
+    assert (stats.total, stats.extracted) == (1, 1)
+    assert workspace.documents.document('a.md') is None
+    assert workspace.documents.document(os.path.join('notes', 'b.md')).text == 'Wool batting, a longer note.'
+    assert len(workspace.documents.documents()) == 1
+
+
+def test_pipeline_logs_documents_that_fail(workspace, runtime, caplog):
+    write(os.path.join(workspace.workspace_dir, 'broken.pdf'), 'not a pdf')
+    refresh(workspace)
+    stats = QuiltExtractionPipeline(workspace, runtime=runtime, hash_workers=2).run()
+
+    assert (stats.extracted, stats.failed) == (2, 1)
+    assert [record.getMessage() for record in caplog.records if record.name == 'src.quilt.extraction'] == [
+        'Error extracting broken.pdf: Cannot open PDF: InvalidFileFormat'
+    ]
@@ -0,0 +1,101 @@
+import os
+
+from datetime import datetime
+
+import pytest
+
+from src.quilt.filtering import SORT_SIZE, QuiltTreeFilter, QuiltTreeFilterEngine
+from src.quilt.workspace import QuiltWorkspace
+
+
+def write(path, content: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(content)
+
+
+def test_parse_filter():
+    tree_filter = QuiltTreeFilter.parse('Report .PDF ext:md >2mb <1.5GB after:2024-01-31 report')
+
+    assert tree_filter.terms == ('report',)
+    assert tree_filter.extensions == {'.pdf', '.md'}
+    assert tree_filter.min_size == 2 * 1024 ** 2
+    assert tree_filter.max_size == int(1.5 * 1024 ** 3)
+    assert tree_filter.modified_after == datetime(2024, 1, 31).timestamp()
+    assert tree_filter.modified_before is None
+
+
+def test_parse_filter_keeps_the_tightest_size_bounds():
+    tree_filter = QuiltTreeFilter.parse('size>1kb >4kb <10kb <8kb')
+    assert (tree_filter.min_size, tree_filter.max_size) == (4096, 8192)
+
+
+def test_parse_filter_takes_invalid_dates_as_terms():
+    assert QuiltTreeFilter.parse('before:2024-13-01').terms == ('before:2024-13-01',)
+
+
+def test_empty_filter():
+    assert QuiltTreeFilter.parse('   ').is_empty()
+    assert not QuiltTreeFilter.parse('.pdf').is_empty()
+
+
+def test_narrows():
+    parse = QuiltTreeFilter.parse
+
+    assert parse('report 2024').narrows(parse('repo'))
+    assert parse('report .pdf').narrows(parse('report .pdf .md'))
+    assert parse('>4mb').narrows(parse('>2mb'))
+    assert parse('<1mb after:2024-02-01').narrows(parse('<2mb after:2024-01-01'))
+    assert parse('anything').narrows(parse(''))
+
+    assert not parse('repo').narrows(parse('report'))
+    assert not parse('report').narrows(parse('report .pdf'))
+    assert not parse('.pdf .md').narrows(parse('.pdf'))
+    assert not parse('>2mb').narrows(parse('>4mb'))
+    assert not parse('').narrows(parse('<1mb'))
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    write(tmp_path / '.quilt', 'name: Test')
+    write(tmp_path / 'a.md', 'a')
+    write(tmp_path / 'papers' / 'report.pdf', 'r' * 10)
+    write(tmp_path / 'papers' / 'Big.pdf', 'b' * 1000)
+    write(tmp_path / 'images' / 'c.png', 'cc')
+    workspace = QuiltWorkspace(str(tmp_path))
+    yield workspace
+    workspace.index.close()
+    workspace.hashes.close()
+    workspace.documents.close()
+
+
+def test_engine_filters_and_sorts(workspace):
+    engine = QuiltTreeFilterEngine(workspace)
+
+    result = engine.run(QuiltTreeFilter.parse('.pdf'))
+    assert (result.matches, result.total) == (2, 4)
+    assert result.children == {'': (['papers'], []), 'papers': ([], ['Big.pdf', 'report.pdf'])}
+
+    # Without a filter every folder shows, sorted by name even when files are sorted by size
+    result = engine.run(QuiltTreeFilter.parse(''), SORT_SIZE, descending=True)
+    assert result.children[''] == (['images', 'papers'], ['a.md'])
+    assert result.children['papers'] == ([], ['Big.pdf', 'report.pdf'])
+    assert not result.is_default()
+
+
+def test_engine_narrows_the_previous_result(workspace):
+    engine = QuiltTreeFilterEngine(workspace)
+
+    assert not engine.run(QuiltTreeFilter.parse('.pdf')).reused
+    result = engine.run(QuiltTreeFilter.parse('.pdf rep'))
+    assert result.reused
+    assert result.children['papers'] == ([], ['report.pdf'])
+
+    # A changed workspace is filtered from scratch
+    engine.invalidate()
+    assert not engine.run(QuiltTreeFilter.parse('.pdf report')).reused
+
+
+def test_engine_run_can_be_cancelled(workspace):
+    engine = QuiltTreeFilterEngine(workspace)
+    assert engine.run(QuiltTreeFilter.parse('report'), cancelled=lambda: True) is None
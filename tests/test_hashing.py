@@ -0,0 +1,77 @@
+import hashlib
+import os
+
+import pytest
+
+from src.quilt import hashing
+from src.quilt.hashing import QuiltContentHashStore, content_hash
+
+
+def write(path, content: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(content)
+
+
+def identity(path) -> tuple:
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = QuiltContentHashStore(str(tmp_path))
+    yield store
+    store.close()
+
+
+def test_content_hash_reads_small_and_mapped_files_alike(tmp_path, monkeypatch):
+    data = os.urandom(10000)
+    write(tmp_path / 'a.pdf', data)
+    expected = hashlib.blake2b(data, digest_size=20).hexdigest()
+
+    assert content_hash(str(tmp_path / 'a.pdf')) == expected
+    monkeypatch.setattr(hashing, 'MMAP_THRESHOLD', 0)
+    monkeypatch.setattr(hashing, 'HASH_CHUNK_SIZE', 4096)
+    assert content_hash(str(tmp_path / 'a.pdf')) == expected
+
+
+def test_unchanged_files_are_not_read_again(store, tmp_path, monkeypatch):
+    write(tmp_path / 'a.md', b'first')
+    digest = store.content_hash('a.md', *identity(tmp_path / 'a.md'))
+
+    monkeypatch.setattr(hashing, 'content_hash', lambda path: pytest.fail('read again'))
+    assert store.content_hash('a.md', *identity(tmp_path / 'a.md')) == digest
+    assert store.lookup('a.md', *identity(tmp_path / 'a.md')) == digest
+    assert store.lookup('a.md', 99, 0.0) is None
+
+
+def test_renamed_files_reuse_their_hash(tmp_path, monkeypatch):
+    write(tmp_path / 'a.md', b'first')
+    store = QuiltContentHashStore(str(tmp_path))
+    digest = store.content_hash('a.md', *identity(tmp_path / 'a.md'))
+    store.close()
+
+    # Moved, and the store reopened as on the next start
+    os.makedirs(tmp_path / 'notes')
+    os.rename(tmp_path / 'a.md', tmp_path / 'notes' / 'b.md')
+    monkeypatch.setattr(hashing, 'content_hash', lambda path: pytest.fail('read again'))
+    store = QuiltContentHashStore(str(tmp_path))
+    moved = os.path.join('notes', 'b.md')
+
+    assert store.content_hashes([(moved, *identity(tmp_path / 'notes' / 'b.md'))]) == {moved: digest}
+    assert store.prune([moved]) == 1
+    assert store.lookup(moved, *identity(tmp_path / 'notes' / 'b.md')) == digest
+    store.close()
+
+
+def test_modified_and_unreadable_files(store, tmp_path):
+    write(tmp_path / 'a.md', b'first')
+    first = store.content_hash('a.md', *identity(tmp_path / 'a.md'))
+
+    write(tmp_path / 'a.md', b'second version')
+    hashes = store.content_hashes([('a.md', *identity(tmp_path / 'a.md')), ('missing.md', 1, 0.0)], workers=2)
+
+    assert list(hashes) == ['a.md']
+    assert hashes['a.md'] != first
+    assert hashes['a.md'] == hashlib.blake2b(b'second version', digest_size=20).hexdigest()
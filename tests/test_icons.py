@@ -0,0 +1,50 @@
+from src.quilt.ui.icons import QuiltIconCache, QuiltRasterCache
+
+
+def test_icon_cache_evicts_the_least_recently_used():
+    cache = QuiltIconCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+
+    # Reading 'a' makes 'b' the oldest entry
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+
+    assert len(cache) == 2
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+
+def test_icon_cache_stats():
+    cache = QuiltIconCache(max_entries=1)
+    cache.put('a', 1)
+    cache.get('a')
+    cache.get('missing')
+    cache.put('b', 2)
+
+    assert cache.stats() == {'entries': 1, 'hits': 1, 'misses': 1, 'evictions': 1, 'hit_rate': 0.5}
+
+
+def test_raster_cache_round_trip(tmp_path):
+    cache = QuiltRasterCache(str(tmp_path))
+    key = cache.make_key(b'<svg/>', '#FFFFFF', 16, 16)
+
+    assert cache.get(key) is None
+    cache.put(key, b'png')
+
+    assert key in cache
+    assert cache.get(key) == b'png'
+    assert (cache.hits, cache.misses) == (1, 1)
+    # No temporary files are left next to the entry
+    assert [path.name for path in tmp_path.rglob('*') if path.is_file()] == [f'{key}.png']
+
+
+def test_raster_cache_keys_cover_contents_color_and_size():
+    key = QuiltRasterCache.make_key(b'<svg/>', '#FFFFFF', 16, 16)
+
+    # Colors are compared case-insensitively
+    assert QuiltRasterCache.make_key(b'<svg/>', '#ffffff', 16, 16) == key
+    assert QuiltRasterCache.make_key(b'<svg />', '#FFFFFF', 16, 16) != key
+    assert QuiltRasterCache.make_key(b'<svg/>', '#000000', 16, 16) != key
+    assert QuiltRasterCache.make_key(b'<svg/>', '#FFFFFF', 32, 32) != key
+    assert QuiltRasterCache.make_key(b'<svg/>', '#FFFFFF', 16, 16, padding=2) != key
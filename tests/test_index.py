@@ -0,0 +1,155 @@
+import os
+import shutil
+
+from src.quilt.index import QuiltWorkspaceChanges, QuiltWorkspaceIndex
+
+
+def write(path, content: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(content)
+
+
+def refresh(index: QuiltWorkspaceIndex) -> QuiltWorkspaceChanges:
+    changes = QuiltWorkspaceChanges()
+
+    def collect(batch: QuiltWorkspaceChanges) -> None:
+        changes.added.extend(batch.added)
+        changes.modified.extend(batch.modified)
+        changes.removed.extend(batch.removed)
+
+    index.refresh(workers=2, batch_callback=collect)
+    return changes
+
+
+def append_in_place(path: str, content: str) -> None:
+    # Keep the directory mtime, as writing an existing file does on most file systems
+    directory_stat = os.stat(os.path.dirname(path))
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write(content)
+    os.utime(os.path.dirname(path), ns=(directory_stat.st_atime_ns, directory_stat.st_mtime_ns))
+
+
+def test_refresh_indexes_new_files(tmp_path):
+    write(tmp_path / 'notes' / 'a.md', 'first')
+    write(tmp_path / 'paper.pdf', '%PDF-1.4')
+    write(tmp_path / 'ignored.txt', 'not tracked')
+
+    index = QuiltWorkspaceIndex(str(tmp_path))
+    changes = refresh(index)
+    index.close()
+
+    assert sorted(row[0] for row in changes.added) == [os.path.join('notes', 'a.md'), 'paper.pdf']
+
+
+def test_refresh_without_changes_reports_nothing(tmp_path):
+    write(tmp_path / 'notes' / 'a.md', 'first')
+    index = QuiltWorkspaceIndex(str(tmp_path))
+    refresh(index)
+
+    changes = refresh(index)
+    index.close()
+
+    assert not changes
+
+
+def test_refresh_trusts_directory_mtimes(tmp_path):
+    note = tmp_path / 'notes' / 'a.md'
+    write(note, 'first')
+    index = QuiltWorkspaceIndex(str(tmp_path))
+    refresh(index)
+
+    append_in_place(str(note), ' and more')
+
+    # Files of unchanged directories are not stat'ed on open
+    assert not refresh(index)
+    index.close()
+
+
+def test_files_written_in_place_are_found_per_file(tmp_path):
+    note = tmp_path / 'notes' / 'a.md'
+    write(note, 'first')
+    write(tmp_path / 'notes' / 'b.md', 'second')
+    index = QuiltWorkspaceIndex(str(tmp_path))
+    refresh(index)
+    index.close()
+
+    append_in_place(str(note), ' and more')
+
+    # Reopened, as the workspace is when the application starts again
+    index = QuiltWorkspaceIndex(str(tmp_path))
+    assert index.modified_directories([os.path.join('notes', 'b.md')]) == []
+    assert index.modified_directories([os.path.join('notes', 'a.md')]) == ['notes']
+    assert index.modified_directories() == ['notes']
+
+    changes = index.refresh_directories(['notes'])
+    entries = index.entries()
+    index.close()
+
+    assert [(row[0], row[4]) for row in changes.modified] == [(os.path.join('notes', 'a.md'), note.stat().st_size)]
+    assert entries[0][4:] == (note.stat().st_size, note.stat().st_mtime)
+
+
+def test_vanished_files_are_found_per_file(tmp_path):
+    write(tmp_path / 'notes' / 'a.md', 'first')
+    write(tmp_path / 'notes' / 'b.md', 'second')
+    index = QuiltWorkspaceIndex(str(tmp_path))
+    refresh(index)
+
+    directory_stat = os.stat(tmp_path / 'notes')
+    os.remove(tmp_path / 'notes' / 'b.md')
+    os.utime(tmp_path / 'notes', ns=(directory_stat.st_atime_ns, directory_stat.st_mtime_ns))
+
+    assert index.modified_directories([os.path.join('notes', 'b.md')]) == ['notes']
+    changes = index.refresh_directories(['notes'])
+    index.close()
+
+    assert [row[0] for row in changes.removed] == [os.path.join('notes', 'b.md')]
+
+
+def test_refresh_directories_indexes_new_and_drops_vanished_subtrees(tmp_path):
+    write(tmp_path / 'notes' / 'old' / 'a.md', 'first')
+    index = QuiltWorkspaceIndex(str(tmp_path))
+    refresh(index)
+
+    shutil.rmtree(tmp_path / 'notes' / 'old')
+    write(tmp_path / 'notes' / 'new' / 'deeper' / 'b.md', 'second')
+
+    assert sorted(index.stale_directories()) == ['notes', os.path.join('notes', 'old')]
+    changes = index.refresh_directories(index.stale_directories())
+    directories = index.directories()
+    index.close()
+
+    assert [row[0] for row in changes.added] == [os.path.join('notes', 'new', 'deeper', 'b.md')]
+    assert [row[0] for row in changes.removed] == [os.path.join('notes', 'old', 'a.md')]
+    assert sorted(changes.added_directories) == [os.path.join('notes', 'new'), os.path.join('notes', 'new', 'deeper')]
+    assert changes.removed_directories == [os.path.join('notes', 'old')]
+    assert os.path.join('notes', 'old') not in directories
+
+
+def test_refresh_directories_pairs_moved_files(tmp_path):
+    write(tmp_path / 'a.md', 'first')
+    os.makedirs(tmp_path / 'notes')
+    index = QuiltWorkspaceIndex(str(tmp_path))
+    refresh(index)
+
+    os.rename(tmp_path / 'a.md', tmp_path / 'notes' / 'a.md')
+    changes = index.refresh_directories(['', 'notes'])
+    index.close()
+
+    assert [(old[0], new[0]) for old, new in changes.renamed] == [('a.md', os.path.join('notes', 'a.md'))]
+    assert not changes.added and not changes.removed
+
+
+def test_pair_renames_matches_kind_size_and_mtime():
+    old = ('a.md', '', 'a.md', 'markdown', 5, 1.0)
+    new = (os.path.join('notes', 'b.md'), 'notes', 'b.md', 'markdown', 5, 1.0)
+    gone = ('c.pdf', '', 'c.pdf', 'pdf', 5, 1.0)
+    fresh = ('d.md', '', 'd.md', 'markdown', 6, 1.0)
+
+    changes = QuiltWorkspaceChanges(added=[new, fresh], removed=[old, gone])
+    changes.pair_renames()
+
+    assert changes.renamed == [(old, new)]
+    assert changes.added == [fresh]
+    assert changes.removed == [gone]
@@ -0,0 +1,149 @@
+import math
+import threading
+
+import pytest
+
+from conftest import wait_for
+from src.quilt.jobs import (LANE_PROCESS, PRIORITY_BACKGROUND, PRIORITY_VISIBLE, QuiltJob, QuiltJobCancelled,
+                            QuiltJobRuntime)
+
+
+@pytest.fixture
+def runtime():
+    runtime = QuiltJobRuntime(thread_workers=1, process_workers=1)
+    yield runtime
+    runtime.shutdown()
+
+
+def blocker(runtime: QuiltJobRuntime):
+    """Occupy the only thread worker until the returned event is set."""
+    started = threading.Event()
+    release = threading.Event()
+
+    def block(job):
+        started.set()
+        release.wait(5)
+
+    runtime.submit('block', block, tracked=False)
+    assert started.wait(5)
+    return release
+
+
+def test_submit_returns_the_result(runtime):
+    job = runtime.submit('add', lambda job, a, b: a + b, 2, 3)
+    assert job.future.result(5) == 5
+    assert job.state == QuiltJob.FINISHED
+
+
+def test_failure_is_set_on_the_future(runtime):
+    def fail(job):
+        raise ValueError('broken')
+
+    job = runtime.submit('fail', fail)
+    with pytest.raises(ValueError):
+        job.future.result(5)
+    assert job.state == QuiltJob.FAILED
+    assert runtime.stats().failed == 1
+
+
+def test_jobs_with_the_same_key_are_deduplicated(runtime):
+    release = blocker(runtime)
+    first = runtime.submit('index', lambda job: 'first', key='index', priority=PRIORITY_BACKGROUND)
+    second = runtime.submit('index', lambda job: 'second', key='index')
+    release.set()
+
+    assert second is first
+    assert first.priority < PRIORITY_BACKGROUND
+    assert first.future.result(5) == 'first'
+
+    # Once done, the key is free again
+    assert runtime.submit('index', lambda job: 'third', key='index').future.result(5) == 'third'
+
+
+def test_more_urgent_jobs_run_first(runtime):
+    release = blocker(runtime)
+    order = []
+    late = runtime.submit('late', lambda job: order.append('late'), priority=PRIORITY_BACKGROUND)
+    urgent = runtime.submit('urgent', lambda job: order.append('urgent'), priority=PRIORITY_VISIBLE)
+    release.set()
+
+    late.future.result(5)
+    urgent.future.result(5)
+    assert order == ['urgent', 'late']
+
+
+def test_cancel_a_queued_job(runtime):
+    release = blocker(runtime)
+    ran = []
+    job = runtime.submit('queued', lambda job: ran.append(True), key='queued')
+    job.cancel()
+
+    assert job.state == QuiltJob.CANCELLED
+    assert job.future.cancelled()
+
+    # A cancelled job does not stand in for a new one with its key
+    replacement = runtime.submit('queued', lambda job: 'again', key='queued')
+    assert replacement is not job
+    release.set()
+    assert replacement.future.result(5) == 'again'
+    assert ran == []
+
+
+def test_cancel_a_running_job(runtime):
+    started = threading.Event()
+
+    def poll(job):
+        started.set()
+        while True:
+            job.check_cancelled()
+            started.wait(0.01)
+
+    job = runtime.submit('poll', poll)
+    assert started.wait(5)
+    job.cancel()
+
+    with pytest.raises(QuiltJobCancelled):
+        job.future.result(5)
+    assert job.state == QuiltJob.CANCELLED
+
+
+def test_process_lane_runs_in_a_pool(runtime):
+    job = runtime.submit('factorial', math.factorial, 5, lane=LANE_PROCESS)
+    assert job.future.result(30) == 120
+
+
+def test_tracked_jobs_report_to_the_application(qapp, runtime):
+    from PySide6.QtCore import QTimer
+
+    runtime.moveToThread(qapp.thread())
+    progress = []
+    runtime.job_progress.connect(lambda job: progress.append((job.progress, job.message)))
+
+    # The job runs once the event loop is waiting for it
+    release = blocker(runtime)
+    job = runtime.submit('report', lambda job: job.report(0.5, 'half way'))
+    QTimer.singleShot(0, release.set)
+
+    assert wait_for(runtime.job_finished) == [job]
+    assert progress == [(0.5, 'half way')]
+
+
+def test_submit_after_shutdown_fails():
+    runtime = QuiltJobRuntime(thread_workers=1, process_workers=1)
+    runtime.shutdown()
+
+    with pytest.raises(RuntimeError):
+        runtime.submit('late', lambda job: None)
+
+
+def test_jobs_panel_keeps_the_last_result_of_each_task(qapp, runtime):
+    from src.quilt.ui.widgets import QuiltJobsPanel
+
+    panel = QuiltJobsPanel(runtime=runtime)
+    assert panel.results.isHidden()
+
+    panel.show_result('extraction', 'Extracted 1 of 2 documents')
+    panel.show_result('embedding', 'Embedded 2 of 2 documents')
+    panel.show_result('extraction', 'Extracted 2 of 2 documents')
+    assert panel.results.text() == 'Extracted 2 of 2 documents\nEmbedded 2 of 2 documents'
+    assert not panel.results.isHidden()
@@ -0,0 +1,93 @@
+import os
+
+from typing import Tuple
+
+import pytest
+
+from conftest import wait_for
+from src.quilt.index import QuiltWorkspaceChanges
+from src.quilt.workspace import QuiltWorkspace
+
+
+def write(path, content: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(content)
+
+
+@pytest.fixture
+def workspace_dir(tmp_path):
+    write(tmp_path / '.quilt', 'name: Test')
+    write(tmp_path / 'a.md', 'first')
+    write(tmp_path / 'papers' / 'b.pdf', '%PDF-1.4')
+    return tmp_path
+
+
+def open_workspace(workspace_dir) -> Tuple[QuiltWorkspace, list]:
+    from src.quilt.loader import QuiltWorkspaceLoader
+
+    workspace = QuiltWorkspace(str(workspace_dir), load=False)
+    loader = QuiltWorkspaceLoader(workspace, scan_workers=2)
+    batches = []
+    loader.batch_loaded.connect(batches.append)
+    loader.batch_loaded.connect(workspace.apply_changes)
+    loader.start()
+
+    assert wait_for(loader.finished) == [False]
+    return workspace, batches
+
+
+def close_workspace(workspace: QuiltWorkspace) -> None:
+    workspace.index.close()
+    workspace.hashes.close()
+    workspace.documents.close()
+
+
+def test_loader_fills_an_empty_workspace(qapp, workspace_dir):
+    workspace, batches = open_workspace(workspace_dir)
+    close_workspace(workspace)
+
+    assert all(isinstance(batch, QuiltWorkspaceChanges) for batch in batches)
+    assert sorted(workspace.markdown_metadata) == ['a.md']
+    assert sorted(workspace.pdf_metadata) == [os.path.join('papers', 'b.pdf')]
+
+
+def test_loader_serves_the_index_first_and_then_only_differences(qapp, workspace_dir):
+    close_workspace(open_workspace(workspace_dir)[0])
+    write(workspace_dir / 'papers' / 'c.pdf', '%PDF-1.4')
+
+    workspace, batches = open_workspace(workspace_dir)
+    close_workspace(workspace)
+
+    assert sorted(row[0] for row in batches[0].added) == ['a.md', os.path.join('papers', 'b.pdf')]
+    assert [row[0] for batch in batches[1:] for row in batch.added] == [os.path.join('papers', 'c.pdf')]
+    assert len(workspace.pdf_metadata) == 2
+
+
+def runtime_listeners() -> int:
+    from PySide6.QtCore import SIGNAL
+
+    from src.quilt.jobs import job_runtime
+
+    return job_runtime().receivers(SIGNAL('job_finished(PyObject)'))
+
+
+def test_loader_listens_to_the_runtime_only_while_its_job_runs(qapp, workspace_dir):
+    from src.quilt.loader import QuiltWorkspaceLoader
+
+    before = runtime_listeners()
+    workspace = QuiltWorkspace(str(workspace_dir), load=False)
+    loader = QuiltWorkspaceLoader(workspace, scan_workers=2)
+    ended = []
+    loader.finished.connect(ended.append)
+    assert runtime_listeners() == before
+
+    loader.start()
+    assert runtime_listeners() == before + 1
+    loader.cancel()
+    # Cancelled runs still report that they ended, a queued one right away
+    if not ended:
+        wait_for(loader.finished)
+    assert len(ended) == 1
+    assert runtime_listeners() == before
+    close_workspace(workspace)
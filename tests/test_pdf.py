@@ -0,0 +1,60 @@
+from conftest import write_pdf
+
+
+def image(qapp, width: int, height: int):
+    from PySide6.QtGui import QImage
+
+    return QImage(width, height, QImage.Format_ARGB32_Premultiplied)
+
+
+def test_tile_cache_is_bounded_by_image_memory(qapp):
+    from src.quilt.ui.pdf import QuiltTileCache
+
+    tile = image(qapp, 16, 16)
+    cache = QuiltTileCache(max_bytes=2 * tile.sizeInBytes())
+    cache.put('a', tile)
+    cache.put('b', image(qapp, 16, 16))
+    cache.get('a')
+    cache.put('c', image(qapp, 16, 16))
+
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert cache.size_bytes == 2 * tile.sizeInBytes()
+    assert cache.stats()['evictions'] == 1
+
+
+def test_tile_cache_replaces_and_keeps_one_oversized_tile(qapp):
+    from src.quilt.ui.pdf import QuiltTileCache
+
+    cache = QuiltTileCache(max_bytes=100)
+    cache.put('a', image(qapp, 16, 16))
+    cache.put('a', image(qapp, 8, 8))
+
+    assert len(cache) == 1
+    assert cache.size_bytes == image(qapp, 8, 8).sizeInBytes()
+
+
+def test_view_lays_out_every_page(qapp, tmp_path):
+    from src.quilt.ui.pdf import MAX_ZOOM, MIN_ZOOM, QuiltPdfView
+
+    path = str(tmp_path / 'paper.pdf')
+    write_pdf(path, 3)
+    view = QuiltPdfView()
+    view.resize(600, 400)
+
+    assert not view.load(str(tmp_path / 'missing.pdf'))
+    assert view.load(path)
+    assert view.page_count() == 3
+    assert view.current_page() == 0
+
+    view.set_zoom(100)
+    assert view.zoom == MAX_ZOOM
+    view.set_zoom(0)
+    assert view.zoom == MIN_ZOOM
+
+    view.set_zoom(1.0)
+    view.verticalScrollBar().setValue(view.verticalScrollBar().maximum())
+    assert view.current_page() == 2
+
+    # Workers emit to the view, they finish before it is deleted
+    view._executor.shutdown(wait=True)
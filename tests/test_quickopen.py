@@ -0,0 +1,109 @@
+import os
+
+from src.quilt import quickopen
+from src.quilt.index import QuiltWorkspaceChanges
+from src.quilt.quickopen import QuiltPathIndex, word_trigrams
+
+
+def row(file_id: str) -> tuple:
+    directory, name = os.path.split(file_id)
+    return (file_id, directory, name, 'markdown', 1, 1.0)
+
+
+ROWS = [row(file_id) for file_id in (
+    'meeting-notes.md',
+    os.path.join('projects', 'quilt', 'roadmap.md'),
+    os.path.join('projects', 'garden', 'planting-schedule.md'),
+    os.path.join('archive', 'notes-2023.md'),
+)]
+
+
+def built_index(rows=ROWS) -> QuiltPathIndex:
+    index = QuiltPathIndex()
+    assert index.build(lambda: rows)
+    return index
+
+
+def test_word_trigrams():
+    assert word_trigrams('ab') == ['  a', ' ab', 'ab ']
+    assert word_trigrams('ab', closed=False) == ['  a', ' ab']
+
+
+def test_search_before_build_is_not_ready():
+    results = QuiltPathIndex().search('notes')
+    assert not results.ready
+    assert results.file_ids == []
+
+
+def test_search_ranks_names_starting_with_the_word_first():
+    index = built_index()
+    results = index.search('notes')
+
+    assert results.total == 4
+    assert results.file_ids[:2] == [os.path.join('archive', 'notes-2023.md'), 'meeting-notes.md']
+
+
+def test_search_tolerates_typos_and_folder_words():
+    index = built_index()
+
+    assert index.search('roadmpa ').file_ids[0] == ROWS[1][0]
+    assert index.search('garden plant').file_ids[0] == ROWS[2][0]
+
+
+def test_apply_changes():
+    index = built_index()
+    changes = QuiltWorkspaceChanges(
+        added=[row(os.path.join('projects', 'quilt', 'release-notes.md'))],
+        removed=[row('meeting-notes.md')],
+        renamed=[(ROWS[1], row(os.path.join('projects', 'quilt', 'milestones.md')))],
+    )
+    index.apply_changes(changes)
+
+    assert len(index.search('notes').file_ids) == 2
+    assert 'meeting-notes.md' not in index.search('meeting notes').file_ids
+    assert index.search('release').file_ids[0] == os.path.join('projects', 'quilt', 'release-notes.md')
+    assert index.search('milestones').file_ids[0] == os.path.join('projects', 'quilt', 'milestones.md')
+    assert ROWS[1][0] not in index.search('roadmap').file_ids
+
+
+def test_changes_during_a_build_are_not_lost():
+    index = QuiltPathIndex()
+    added = row('late-notes.md')
+
+    def load_rows() -> list:
+        # Arrives after the rows were loaded, but before they are indexed
+        index.apply_changes(QuiltWorkspaceChanges(added=[added]))
+        return ROWS
+
+    assert index.build(load_rows)
+    assert len(index) == 5
+    assert index.search('late').file_ids[0] == 'late-notes.md'
+
+
+def test_search_limit():
+    index = built_index()
+    results = index.search('notes', limit=1)
+
+    assert results.file_ids == [os.path.join('archive', 'notes-2023.md')]
+    assert (results.candidates, results.total) == (2, 4)
+
+
+def test_cancelled_build_keeps_the_previous_index():
+    index = built_index()
+
+    assert not index.build(lambda: [row('other.md')], cancelled=lambda: True)
+    assert len(index) == 4
+    assert index.search('roadmap').file_ids[0] == ROWS[1][0]
+
+
+def test_needs_rebuild_after_many_changes(monkeypatch):
+    monkeypatch.setattr(quickopen, 'REBUILD_MIN_FILES', 2)
+    index = built_index()
+
+    index.apply_changes(QuiltWorkspaceChanges(added=[row('extra-1.md')]))
+    assert not index.needs_rebuild()
+    index.apply_changes(QuiltWorkspaceChanges(added=[row('extra-2.md')], removed=[row('meeting-notes.md')]))
+    assert index.needs_rebuild()
+
+    assert index.build(lambda: ROWS)
+    assert not index.needs_rebuild()
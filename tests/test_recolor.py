@@ -0,0 +1,33 @@
+from src.quilt.ui.recolor import QuiltSvgRecolorer, normalize_color, recolor_svg
+
+
+def test_normalize_color():
+    assert normalize_color(' #ABC ') == '#aabbcc'
+    assert normalize_color('D9D9D9') == '#d9d9d9'
+    assert normalize_color('currentColor') == 'currentcolor'
+
+
+def test_recolor_attributes_and_styles():
+    svg = ('<svg><style>.a { fill: #D9D9D9 }</style>'
+           '<path fill="#d9d9d9" stroke=\'#DDD\' style="stop-color:#d9d9d9;color: #123456"/></svg>')
+
+    recolored = QuiltSvgRecolorer({'#d9d9d9': '#ff0000', '#ddd': '#00ff00'}).recolor(svg)
+
+    assert recolored == ('<svg><style>.a { fill: #ff0000 }</style>'
+                         '<path fill="#ff0000" stroke=\'#00ff00\' style="stop-color:#ff0000;color: #123456"/></svg>')
+
+
+def test_recolor_current_color():
+    svg = '<path fill="currentColor" stroke="none"/>'
+    assert recolor_svg(svg, {'currentColor': '#112233'}) == '<path fill="#112233" stroke="none"/>'
+
+
+def test_recolor_leaves_other_attributes_alone():
+    # Ids and class names that look like colors are not colors
+    svg = '<path id="fill-d9d9d9" class="abc" data-fill="#d9d9d9" fill="#d9d9d9"/>'
+    assert recolor_svg(svg, {'#d9d9d9': '#000000'}) == '<path id="fill-d9d9d9" class="abc" data-fill="#d9d9d9" fill="#000000"/>'
+
+
+def test_recolor_without_mapping():
+    svg = '<path fill="#d9d9d9"/>'
+    assert recolor_svg(svg, {}) is svg
@@ -0,0 +1,90 @@
+import os
+
+from src.quilt.scanner import QuiltWorkspaceScanner, classify_file
+
+
+def write(path, content: str = '') -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(content)
+
+
+def make_workspace(root) -> None:
+    write(os.path.join(root, 'a.md'), 'a')
+    write(os.path.join(root, 'notes.txt'), 'not tracked')
+    write(os.path.join(root, 'papers', 'b.PDF'), 'bb')
+    write(os.path.join(root, 'papers', 'figures', 'c.png'), 'ccc')
+    os.makedirs(os.path.join(root, 'empty'))
+
+
+def test_classify_file():
+    assert classify_file('a.md') == 'markdown'
+    assert classify_file('b.PDF') == 'pdf'
+    assert classify_file('c.jpeg') == 'image'
+    assert classify_file('notes.txt') is None
+    assert classify_file('README') is None
+
+
+def test_scan_lists_every_directory_once(tmp_path):
+    make_workspace(tmp_path)
+    listings = {listing.directory: listing for listing in QuiltWorkspaceScanner(str(tmp_path), workers=2).scan()}
+
+    figures = os.path.join('papers', 'figures')
+    assert sorted(listings) == sorted(['', 'empty', 'papers', figures])
+    assert sorted(listings[''].subdirectories) == ['empty', 'papers']
+    assert listings['papers'].subdirectories == [figures]
+
+    # Untracked files are left out, kinds are classified by extension
+    assert [row[:5] for row in listings[''].files] == [('a.md', '', 'a.md', 'markdown', 1)]
+    assert [row[:5] for row in listings['papers'].files] == [
+        (os.path.join('papers', 'b.PDF'), 'papers', 'b.PDF', 'pdf', 2)
+    ]
+    assert listings['empty'].files == []
+    assert not any(listing.reused for listing in listings.values())
+
+
+def test_scan_descends_into_the_subdirectories_of_reused_directories(tmp_path):
+    make_workspace(tmp_path)
+    visited = []
+
+    def reuse(directory, mtime):
+        visited.append(directory)
+        # The root is unchanged and only 'papers' is known below it
+        return ['papers'] if directory == '' else None
+
+    listings = {listing.directory: listing for listing in QuiltWorkspaceScanner(str(tmp_path)).scan(reuse)}
+
+    assert listings[''].reused
+    assert listings[''].subdirectories == ['papers']
+    assert sorted(listings) == sorted(['', 'papers', os.path.join('papers', 'figures')])
+    assert sorted(visited) == sorted(listings)
+
+
+def test_scan_stops_when_cancelled(tmp_path):
+    make_workspace(tmp_path)
+    listings = list(QuiltWorkspaceScanner(str(tmp_path)).scan(cancelled=lambda: True))
+
+    assert listings == []
+
+
+def test_scan_reports_progress(tmp_path):
+    make_workspace(tmp_path)
+    reports = []
+    list(QuiltWorkspaceScanner(str(tmp_path), progress_callback=reports.append).scan())
+
+    assert reports[-1].directories == 4
+    assert reports[-1].files == 3
+    assert reports[-1].pending == 0
+
+
+def test_restat_files(tmp_path):
+    make_workspace(tmp_path)
+    scanner = QuiltWorkspaceScanner(str(tmp_path))
+    row = scanner.list_directory('').files[0]
+
+    assert scanner.restat_files([row]) == []
+    write(os.path.join(tmp_path, 'a.md'), 'longer')
+    assert [modified[4] for modified in scanner.restat_files([row])] == [6]
+
+    os.remove(os.path.join(tmp_path, 'a.md'))
+    assert scanner.restat_files([row]) is None
@@ -0,0 +1,83 @@
+import pytest
+
+from src.quilt import search
+from src.quilt.extraction import QuiltDocument, QuiltDocumentStore
+from src.quilt.search import MATCH_END, MATCH_START, QuiltSearchIndex, build_match_query, parse_query
+
+
+def test_parse_query_words_and_prefix():
+    assert parse_query('neural netw') == [('neural', False), ('netw', True)]
+    assert parse_query('neural network ') == [('neural', False), ('network', False)]
+
+
+def test_parse_query_short_last_word_is_no_prefix():
+    assert parse_query('vitamin c') == [('vitamin', False), ('c', False)]
+
+
+def test_parse_query_phrases():
+    assert parse_query('"gradient descent" rate') == [('gradient descent', False), ('rate', True)]
+    # An unterminated phrase is still a phrase
+    assert parse_query('"gradient desc') == [('gradient desc', False)]
+
+
+def test_parse_query_takes_operators_literally():
+    assert parse_query('a* OR (b) NEAR') == [('a', False), ('OR', False), ('b', False), ('NEAR', True)]
+    assert parse_query('"" ** ') == []
+
+
+def test_build_match_query():
+    terms = [('gradient descent', False), ('rat', True)]
+    assert build_match_query(terms) == '"gradient descent" AND "rat" *'
+    assert build_match_query(terms, ['rate', 'ratio']) == '"gradient descent" AND ("rate" OR "ratio")'
+
+
+@pytest.fixture
+def index(tmp_path):
+    store = QuiltDocumentStore(str(tmp_path))
+    # The oldest note has the word in its title, the others only in their text
+    titles = ['Wool and batting'] + [f'Note {i}' for i in range(1, 10)]
+    documents = [QuiltDocument(f'{i:040x}', 'markdown', f'wool and cotton note {i}', title=title)
+                 for i, title in enumerate(titles)]
+    store.store([(f'note-{i}.md', 10, 0.0, document.content_hash) for i, document in enumerate(documents)],
+                documents)
+    index = QuiltSearchIndex(store)
+    yield index
+    index.close()
+    store.close()
+
+
+def test_search_ranks_every_match(index):
+    results = index.search('wool', limit=3)
+    assert results.complete
+    assert [result.file_id for result in results.results][0] == 'note-0.md'
+    assert len(results.results) == 3
+
+
+def test_search_over_many_matches_ranks_titles_first(index, monkeypatch):
+    monkeypatch.setattr(search, 'MAX_RANKED_MATCHES', 4)
+    results = index.search('wool', limit=3)
+    assert not results.complete
+    # The title match is older than the text matches that are scored
+    file_ids = [result.file_id for result in results.results]
+    assert file_ids[0] == 'note-0.md'
+    assert len(file_ids) == 3 and set(file_ids[1:]) <= {'note-6.md', 'note-7.md', 'note-8.md', 'note-9.md'}
+
+
+def test_search_bounds_phrase_scoring(index, monkeypatch):
+    monkeypatch.setattr(search, 'MAX_RANKED_MATCHES', 4)
+    monkeypatch.setattr(search, 'PROGRESS_STEPS', 1)
+    results = index.search('"wool and"', limit=3)
+    assert not results.complete
+    assert [result.file_id for result in results.results][0] == 'note-0.md'
+    assert len(results.results) == 3
+
+
+def test_search_snippets_and_copies(index):
+    # Copies of a document are listed one by one
+    index.store.store([('copy.md', 10, 0.0, f'{0:040x}')])
+    results = index.search('batting')
+
+    assert [result.file_id for result in results.results] == ['copy.md', 'note-0.md']
+    assert results.results[0].title == 'Wool and batting'
+    snippet = index.search('cotton note 3 ').results[0].snippet
+    assert snippet == f'wool and {MATCH_START}cotton{MATCH_END} {MATCH_START}note{MATCH_END} {MATCH_START}3{MATCH_END}'
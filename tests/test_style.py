@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+from src.quilt.ui.style import compile_stylesheet, resolve_variables
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_resolve_variables():
+    style_sheet = '/* @unknown in a comment */ QLabel { color: @text; border: 1px solid @line-2; }'
+    resolved = resolve_variables(style_sheet, {'text': '#111111', 'line-2': '#222222'})
+
+    assert resolved == ' QLabel { color: #111111; border: 1px solid #222222; }'
+
+
+def test_unknown_variables_fail():
+    with pytest.raises(ValueError, match='@missing'):
+        resolve_variables('QLabel { color: @missing; }', {})
+
+
+def test_shipped_stylesheet_compiles(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    style_sheet = compile_stylesheet('quilt-style')
+
+    assert '@' not in style_sheet
+    assert '/*' not in style_sheet
+
+
+def test_compiled_stylesheet_follows_the_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('styles')
+    path = os.path.join('styles', 'test.qss')
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('QLabel { color: @light-red; }')
+    first = compile_stylesheet('test')
+
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('QLabel { color: @dark-red; }')
+    os.utime(path, (0, os.path.getmtime(path) + 1))
+
+    assert compile_stylesheet('test') != first
+
+
+def test_apply_stylesheet_sets_the_application_sheet(qapp, monkeypatch):
+    from src.quilt.ui.style import apply_stylesheet
+
+    monkeypatch.chdir(ROOT)
+    qapp.setStyleSheet('')
+    style_sheet = apply_stylesheet('quilt-style', qapp)
+
+    assert qapp.styleSheet() == style_sheet
@@ -0,0 +1,96 @@
+import os
+import time
+
+import pytest
+
+from conftest import wait_for, write_pdf
+from src.quilt.jobs import QuiltJobRuntime
+from src.quilt.ui.icons import QuiltRasterCache
+from src.quilt.ui.thumbnails import thumbnail_cache_key, thumbnail_content_key
+from src.quilt.workspace import QuiltWorkspace
+
+
+@pytest.fixture
+def workspace(qapp, tmp_path):
+    directory = tmp_path / 'workspace'
+    os.makedirs(directory)
+    with open(directory / '.quilt', 'w', encoding='utf-8') as file:
+        file.write('name: Test')
+    write_pdf(str(directory / 'paper.pdf'))
+
+    workspace = QuiltWorkspace(str(directory), scan_workers=2)
+    yield workspace
+    workspace.index.close()
+    workspace.hashes.close()
+    workspace.documents.close()
+
+
+def thumbnail(service, path: str):
+    icon = service.icon(path)
+    if icon is None:
+        assert wait_for(service.thumbnail_ready) == [path]
+        icon = service.icon(path)
+    return icon
+
+
+def test_cache_keys():
+    key = thumbnail_cache_key('a.pdf', 10, 1.0, 64)
+
+    # Edits change the key, so a stale preview is never served
+    assert thumbnail_cache_key('a.pdf', 10, 2.0, 64) != key
+    assert thumbnail_cache_key('a.pdf', 10, 1.0, 128) != key
+    assert thumbnail_content_key('hash', 64) == thumbnail_content_key('hash', 64)
+    assert thumbnail_content_key('hash', 64) != thumbnail_content_key('hash', 128)
+
+
+def test_render_pdf_thumbnail(qapp, tmp_path):
+    from src.quilt.ui.thumbnails import render_pdf_thumbnail
+
+    path = str(tmp_path / 'paper.pdf')
+    write_pdf(path)
+    image = render_pdf_thumbnail(path, 48)
+
+    assert (image.width(), image.height()) == (48, 48)
+    assert render_pdf_thumbnail(str(tmp_path / 'missing.pdf'), 48) is None
+
+
+def test_service_renders_on_the_job_runtime(workspace, tmp_path):
+    from src.quilt.ui.thumbnails import QuiltThumbnailService
+
+    runtime = QuiltJobRuntime(thread_workers=1, process_workers=1)
+    service = QuiltThumbnailService(workspace, cache=QuiltRasterCache(str(tmp_path / 'cache')), runtime=runtime)
+    path = os.path.join(workspace.workspace_dir, 'paper.pdf')
+
+    assert service.icon(path) is None
+    assert wait_for(service.thumbnail_ready) == [path]
+    assert not service.icon(path).isNull()
+    assert service.icon(os.path.join(workspace.workspace_dir, 'missing.pdf')) is None
+    service.stop()
+
+    # One job served the queue and ends once it is empty
+    deadline = time.monotonic() + 5
+    while runtime.stats().finished < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert (runtime.stats().finished, runtime.stats().running) == (1, 0)
+    runtime.shutdown()
+
+
+def test_moved_files_reuse_the_persistent_thumbnail(workspace, tmp_path, monkeypatch):
+    from src.quilt.ui import thumbnails
+    from src.quilt.ui.thumbnails import QuiltThumbnailService
+
+    cache = QuiltRasterCache(str(tmp_path / 'cache'))
+    service = QuiltThumbnailService(workspace, cache=cache)
+    thumbnail(service, os.path.join(workspace.workspace_dir, 'paper.pdf'))
+    service.stop()
+
+    # Move the file, a fresh service finds its preview by content without rendering
+    os.rename(os.path.join(workspace.workspace_dir, 'paper.pdf'), os.path.join(workspace.workspace_dir, 'moved.pdf'))
+    workspace.apply_changes(workspace.index.refresh_directories(['']))
+    monkeypatch.setattr(thumbnails, 'render_pdf_thumbnail', lambda path, pixel_size: None)
+
+    service = QuiltThumbnailService(workspace, cache=cache)
+    icon = thumbnail(service, os.path.join(workspace.workspace_dir, 'moved.pdf'))
+    service.stop()
+
+    assert not icon.isNull()
@@ -0,0 +1,119 @@
+import os
+
+import pytest
+
+from src.quilt.index import QuiltWorkspaceChanges
+
+
+def write(path, content: str = '') -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(content)
+
+
+def file_row(file_id: str, size: int = 1, mtime: float = 1.0) -> tuple:
+    directory, name = os.path.split(file_id)
+    kind = {'.md': 'markdown', '.pdf': 'pdf'}.get(os.path.splitext(name)[1], 'image')
+    return (file_id, directory, name, kind, size, mtime)
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    from src.quilt.workspace import QuiltWorkspace
+
+    write(tmp_path / '.quilt', 'name: Test')
+    workspace = QuiltWorkspace(str(tmp_path), load=False)
+    yield workspace
+    workspace.index.close()
+    workspace.hashes.close()
+    workspace.documents.close()
+
+
+@pytest.fixture
+def model(qapp, workspace):
+    from src.quilt.ui.tree import QuiltWorkspaceModel
+
+    model = QuiltWorkspaceModel(workspace)
+    model.apply_changes(QuiltWorkspaceChanges(
+        added=[file_row('b.md'), file_row('A.pdf'), file_row(os.path.join('papers', 'c.pdf'))],
+        added_directories=['papers', 'Notes'],
+    ))
+    return model
+
+
+def names(model, parent=None) -> list:
+    from PySide6.QtCore import QModelIndex
+
+    parent = parent or QModelIndex()
+    return [model.index(row, 0, parent).data() for row in range(model.rowCount(parent))]
+
+
+def test_rows_sort_folders_first_and_case_insensitively(model):
+    assert names(model) == ['Notes', 'papers', 'A.pdf', 'b.md']
+    assert model.is_dir(model.index(1, 0))
+    assert not model.is_dir(model.index(2, 0))
+    assert model.file_path(model.index(2, 0)) == os.path.join(model.workspace.workspace_dir, 'A.pdf')
+
+    # Folders are sorted when they are revealed
+    papers = model.reveal_path(os.path.join('papers', 'c.pdf'))
+    assert papers.data() == 'c.pdf'
+    assert papers.parent() == model.index(1, 0)
+
+
+def test_apply_changes_announces_fetched_rows(model):
+    inserted = []
+    removed = []
+    model.rowsInserted.connect(lambda parent, first, last: inserted.append((parent.data(), first, last)))
+    model.rowsRemoved.connect(lambda parent, first, last: removed.append((parent.data(), first, last)))
+
+    model.apply_changes(QuiltWorkspaceChanges(added=[file_row('c.md')], removed=[file_row('b.md')]))
+
+    assert names(model) == ['Notes', 'papers', 'A.pdf', 'c.md']
+    assert removed == [(None, 3, 3)]
+    assert inserted == [(None, 3, 3)]
+
+    # Folders nobody expanded change without signals
+    inserted.clear()
+    model.apply_changes(QuiltWorkspaceChanges(added=[file_row(os.path.join('Notes', 'd.md'))]))
+    assert inserted == []
+    assert model.hasChildren(model.index(0, 0))
+
+
+def test_apply_changes_moves_renamed_files(model):
+    old = file_row(os.path.join('papers', 'c.pdf'))
+    new = file_row(os.path.join('Notes', 'c.pdf'))
+    model.reveal_path(old[0])
+    model.apply_changes(QuiltWorkspaceChanges(renamed=[(old, new)]))
+
+    assert not model.index_for_path(old[0]).isValid()
+    assert model.reveal_path(new[0]).data() == 'c.pdf'
+    assert model.index_for_path(new[0]) == model.reveal_path(new[0])
+
+
+def test_apply_changes_removes_folders_with_their_rows(model):
+    model.reveal_path(os.path.join('papers', 'c.pdf'))
+    model.apply_changes(QuiltWorkspaceChanges(removed=[file_row(os.path.join('papers', 'c.pdf'))],
+                                              removed_directories=['papers']))
+
+    assert names(model) == ['Notes', 'A.pdf', 'b.md']
+    assert not model.index_for_path('papers').isValid()
+
+
+def test_folders_fetch_their_rows_in_batches(qapp, workspace, monkeypatch):
+    from PySide6.QtCore import QModelIndex
+
+    from src.quilt.ui import tree
+
+    monkeypatch.setattr(tree, 'FETCH_BATCH', 2)
+    model = tree.QuiltWorkspaceModel(workspace)
+    model.apply_changes(QuiltWorkspaceChanges(added=[file_row(f'{i}.md') for i in range(5)]))
+
+    assert model.rowCount() == 2
+    assert model.canFetchMore(QModelIndex())
+    model.fetchMore(QModelIndex())
+    assert names(model) == ['0.md', '1.md', '2.md', '3.md']
+
+    # Unfetched rows are fetched in whole batches when they are revealed
+    assert not model.index_for_path('4.md').isValid()
+    assert model.reveal_path('4.md').row() == 4
+    assert not model.canFetchMore(QModelIndex())
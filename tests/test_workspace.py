@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from src.quilt.index import QuiltWorkspaceChanges
+from src.quilt.workspace import QuiltWorkspace
+
+
+def write(path, content: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(content)
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    write(tmp_path / '.quilt', 'name: Test')
+    write(tmp_path / 'a.md', 'first')
+    write(tmp_path / 'papers' / 'b.pdf', '%PDF-1.4')
+    workspace = QuiltWorkspace(str(tmp_path), scan_workers=2)
+    yield workspace
+    workspace.index.close()
+    workspace.hashes.close()
+    workspace.documents.close()
+
+
+def test_open_loads_the_index(workspace):
+    assert workspace.workspace_name == 'Test'
+    assert sorted(workspace.markdown_metadata) == ['a.md']
+    assert sorted(workspace.pdf_metadata) == [os.path.join('papers', 'b.pdf')]
+
+
+def test_apply_changes_updates_the_views_in_place(workspace):
+    old = workspace.entries.get('a.md').row()
+    new = (os.path.join('notes', 'a.md'), 'notes', 'a.md', 'markdown', old[4], old[5])
+    gone = workspace.entries.get(os.path.join('papers', 'b.pdf')).row()
+    added = ('c.png', '', 'c.png', 'image', 3, 1.0)
+
+    markdown = workspace.markdown_metadata
+    workspace.apply_changes(QuiltWorkspaceChanges(added=[added], removed=[gone], renamed=[(old, new)]))
+
+    assert workspace.markdown_metadata is markdown
+    assert sorted(markdown) == [os.path.join('notes', 'a.md')]
+    assert len(workspace.pdf_metadata) == 0
+    assert sorted(workspace.image_metadata) == ['c.png']
+
+
+def test_find_by_path_and_name(workspace, tmp_path):
+    pdf = os.path.join('papers', 'b.pdf')
+
+    assert workspace.find_pdf_from_path(pdf).file_id == pdf
+    assert workspace.find_pdf_from_path(str(tmp_path / 'papers' / 'b.pdf')).file_id == pdf
+    assert workspace.find_pdf_from_path('a.md') is None
+    assert workspace.find_entry_from_path('a.md').kind == 'markdown'
+    assert workspace.find_pdf_from_name('b.pdf').file_id == pdf
+    assert workspace.find_pdf_from_name('a.md') is None